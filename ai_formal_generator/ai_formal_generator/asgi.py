@@ -13,4 +13,7 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'ai_formal_generator.settings')
 
+# Non-blocking Gemini calls for the drafting endpoints (see generator.views)
+os.environ.setdefault('AI_ASYNC_VIEWS', '1')
+
 application = get_asgi_application()
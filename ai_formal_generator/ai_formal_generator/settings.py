@@ -47,6 +47,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'generator.profiling.ProfilingMiddleware',
 ]
 
 # --------------------------------------------------
@@ -66,8 +67,6 @@ TEMPLATES = [
             BASE_DIR / 'templates',
         ],
 
-        'APP_DIRS': True,
-
         'OPTIONS': {
             'context_processors': [
                 'django.template.context_processors.debug',
@@ -75,6 +74,15 @@ TEMPLATES = [
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
             ],
+            # Templates are parsed once per process (the runserver autoreloader
+            # still picks up edits). Static blocks of the PDF templates are
+            # also pre-rendered, see generator/templatetags/fragments.py.
+            'loaders': [
+                ('django.template.loaders.cached.Loader', [
+                    'django.template.loaders.filesystem.Loader',
+                    'django.template.loaders.app_directories.Loader',
+                ]),
+            ],
         },
     },
 ]
@@ -87,13 +95,35 @@ WSGI_APPLICATION = 'ai_formal_generator.wsgi.application'
 # --------------------------------------------------
 # DATABASE
 # --------------------------------------------------
+# Writers take the SQLite lock when their transaction starts (IMMEDIATE) and
+# wait up to "timeout" seconds for it, so concurrent reference number
+# reservations queue up instead of failing with "database is locked". Tests
+# use a file database so threaded tests share it across connections.
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        'OPTIONS': {
+            'timeout': 20,
+            'transaction_mode': 'IMMEDIATE',
+        },
+        'TEST': {
+            'NAME': BASE_DIR / 'test_db.sqlite3',
+        },
     }
 }
 
+# PostgreSQL instead, when POSTGRES_DB is set (needs psycopg)
+if os.getenv("POSTGRES_DB"):
+    DATABASES['default'] = {
+        'ENGINE': 'django.db.backends.postgresql',
+        'NAME': os.getenv("POSTGRES_DB"),
+        'USER': os.getenv("POSTGRES_USER", "postgres"),
+        'PASSWORD': os.getenv("POSTGRES_PASSWORD", ""),
+        'HOST': os.getenv("POSTGRES_HOST", "localhost"),
+        'PORT': os.getenv("POSTGRES_PORT", "5432"),
+    }
+
 # --------------------------------------------------
 # PASSWORD VALIDATION
 # --------------------------------------------------
@@ -128,6 +158,107 @@ STATICFILES_DIRS = [
     BASE_DIR / "static",
 ]
 
+# --------------------------------------------------
+# AI DRAFTING (GEMINI)
+# --------------------------------------------------
+GEMINI_API_KEY = os.getenv("GEMINI_API_KEY", "")
+
+# Drafting provider (generator/llm.py): "gemini", or "stub" for offline
+# deterministic drafts in load tests and benchmarks
+AI_PROVIDER = os.getenv("AI_PROVIDER", "gemini")
+AI_MODEL = os.getenv("AI_MODEL", "models/gemini-2.5-flash")
+
+# Extra attempts after a rate limit / overload / dropped connection
+AI_RETRIES = int(os.getenv("AI_RETRIES", "3"))
+
+# Simulated model latency of the stub provider, in seconds
+AI_STUB_LATENCY = float(os.getenv("AI_STUB_LATENCY", "0"))
+
+# Seconds before an async Gemini call is abandoned
+AI_TIMEOUT = float(os.getenv("AI_TIMEOUT", "30"))
+
+# Serve the generate_* endpoints with their async variants (asgi.py turns this on)
+AI_ASYNC_VIEWS = os.getenv("AI_ASYNC_VIEWS", "0") == "1"
+
+# Cache of generated drafts (generator/draft_cache.py), stored in the
+# CACHES alias below. regenerate=1 on a drafting request bypasses it.
+AI_DRAFT_CACHE = {
+    "ENABLED": os.getenv("AI_DRAFT_CACHE", "1") == "1",
+    "ALIAS": "ai_drafts",
+}
+
+# --------------------------------------------------
+# CACHES
+# --------------------------------------------------
+# "ai_drafts" is per process (locmem, LRU) by default. To share drafts
+# between workers use django.core.cache.backends.filebased.FileBasedCache
+# with a directory LOCATION, or db.DatabaseCache with a table name
+# (python manage.py createcachetable).
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+    },
+    "ai_drafts": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "ai-drafts",
+        "TIMEOUT": int(os.getenv("AI_DRAFT_CACHE_TTL", str(7 * 24 * 3600))),
+        "OPTIONS": {"MAX_ENTRIES": 5000},
+    },
+}
+
+# --------------------------------------------------
+# RENDERED DOCUMENT CACHE
+# --------------------------------------------------
+# Content-addressed PDF/DOCX cache. BACKEND "disk" keeps files under
+# LOCATION (LRU, bounded by MAX_BYTES); "django" uses CACHE_ALIAS instead.
+RENDER_CACHE = {
+    "ENABLED": True,
+    "BACKEND": "disk",
+    "LOCATION": BASE_DIR / "render_cache",
+    "MAX_BYTES": 256 * 1024 * 1024,
+    "CACHE_ALIAS": "default",
+}
+
+# Background PDF/DOCX rendering (generator/render_pool.py). With ENABLED
+# False jobs are rendered inline in the request. PRERENDER lets the preview
+# pages queue their PDF and DOCX as soon as they are shown; downloads wait
+# up to WAIT_TIMEOUT seconds for a render already in flight (served by the
+# same web process). Finished job rows are deleted after JOB_RETENTION seconds.
+RENDER_POOL = {
+    "ENABLED": True,
+    "WORKERS": int(os.getenv("RENDER_WORKERS", "2")),
+    "PRERENDER": os.getenv("RENDER_PRERENDER", "1") == "1",
+    "WAIT_TIMEOUT": float(os.getenv("RENDER_WAIT_TIMEOUT", "60")),
+    "JOB_RETENTION": int(os.getenv("RENDER_JOB_RETENTION", "3600")),
+}
+
+# Letterhead / people lookups (generator/registry.py). Sources are checked
+# for changes every RELOAD_INTERVAL seconds, so edits to circular.json,
+# policy.json and office_order.json need no restart. PEOPLE_SOURCE
+# "database" takes circular recipients from the Person table (admin).
+REGISTRY = {
+    "RELOAD_INTERVAL": float(os.getenv("REGISTRY_RELOAD_INTERVAL", "2")),
+    "PEOPLE_SOURCE": os.getenv("REGISTRY_PEOPLE_SOURCE", "file"),
+}
+
+# Per-stage timing histograms (generator/metrics.py), scraped from /metrics.
+# Off unless METRICS_ENABLED=1; set TOKEN as well to require
+# "Authorization: Bearer <token>" on scrapes, or /metrics is public.
+METRICS = {
+    "ENABLED": os.getenv("METRICS_ENABLED", "0") == "1",
+    "TOKEN": os.getenv("METRICS_TOKEN", ""),
+}
+
+# Sampling request profiler (generator/profiling.py): profiles SAMPLE_RATE
+# of requests, and any request with a signed X-Profile-Request header
+# (python manage.py profile_token), into DIRECTORY; staff see /profiles/.
+PROFILING = {
+    "ENABLED": os.getenv("PROFILING_ENABLED", "0") == "1",
+    "SAMPLE_RATE": float(os.getenv("PROFILING_SAMPLE_RATE", "0")),
+    "DIRECTORY": BASE_DIR / "profiles",
+    "MAX_FILES": 50,
+}
+
 # --------------------------------------------------
 # DEFAULT PRIMARY KEY
 # --------------------------------------------------
@@ -1,15 +1,32 @@
 from django.contrib import admin
-from .models import DocumentLog, OfficeOrderCounter
+from .models import DocumentLog, OfficeOrderCounter, Person, RenderJob
 
 @admin.register(DocumentLog)
 class DocumentLogAdmin(admin.ModelAdmin):
-    list_display = ("document_type", "language", "reference_id", "created_at")
-    search_fields = ("reference_id", "content")
+    list_display = ("document_type", "language", "reference_id", "user", "created_at")
+    search_fields = ("reference_id", "subject")
     list_filter = ("document_type", "language", "created_at")
+    raw_id_fields = ("user",)
 
 
 @admin.register(OfficeOrderCounter)
 class OfficeOrderCounterAdmin(admin.ModelAdmin):
-    list_display = ("year", "counter")
+    list_display = ("document_type", "year", "counter")
+    list_filter = ("document_type",)
     search_fields = ("year",)
-    ordering = ("-year",)
+    ordering = ("-year", "document_type")
+
+
+@admin.register(Person)
+class PersonAdmin(admin.ModelAdmin):
+    list_display = ("name_en", "designation_en", "position", "active", "updated_at")
+    list_editable = ("position", "active")
+    list_filter = ("active",)
+    search_fields = ("name_en", "name_hi", "designation_en")
+
+
+@admin.register(RenderJob)
+class RenderJobAdmin(admin.ModelAdmin):
+    list_display = ("id", "document_type", "format", "status", "created_at", "finished_at")
+    list_filter = ("status", "document_type", "format")
+    ordering = ("-created_at",)
@@ -4,3 +4,10 @@ from django.apps import AppConfig
 class GeneratorConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'generator'
+
+    def ready(self):
+        # Designation and people lookups are built once here, not on the first
+        # request (from the database only once it is in use, on first access)
+        from . import registry
+        if registry.registry_settings()["PEOPLE_SOURCE"] != "database":
+            registry.current()
@@ -0,0 +1,97 @@
+"""
+Letterhead images prepared once per process.
+
+The logo is 638x469 px but printed 0.9 in high at most, and WeasyPrint
+(with optimize_images) decoded and re-compressed the full file for every
+PDF while python-docx embedded it as is. Here each image is scaled once to
+its largest printed size at DPI, saved as an optimised PNG (lossless) and
+kept in memory as bytes and as a data: URI:
+
+* PDF templates use {% asset_uri "logo" %} (templatetags/assets.py); the
+  PDF engine also keeps WeasyPrint's image cache between renders, so the
+  decoded image is reused rather than rebuilt per document
+* the DOCX skeletons embed the prepared bytes
+
+Without Pillow the original file is used unchanged.
+"""
+
+import base64
+import hashlib
+import os
+import threading
+from io import BytesIO
+
+from django.conf import settings
+
+
+# Print resolution the images are scaled for
+DPI = 300
+
+# name -> (image file, largest printed height in inches); resolved here, like
+# docx_engine.LOGO_PATH, so later BASE_DIR overrides do not move them
+IMAGES = {
+    "logo": (os.path.join(settings.BASE_DIR, "static", "generator", "bisag_logo.png"), 0.9),
+}
+
+
+class Asset:
+    """A prepared image: PNG bytes, their data: URI and pixel size"""
+
+    def __init__(self, data, width, height, mime_type="image/png"):
+        self.data = data
+        self.width = width
+        self.height = height
+        self.mime_type = mime_type
+        self.data_uri = f"data:{mime_type};base64,{base64.b64encode(data).decode('ascii')}"
+        self.version = hashlib.sha256(data).hexdigest()
+
+    def stream(self):
+        return BytesIO(self.data)
+
+
+def prepare(path, height_in):
+    """Asset for an image file, scaled down to height_in inches at DPI"""
+    with open(path, "rb") as f:
+        original = f.read()
+
+    try:
+        from PIL import Image
+    except ImportError:
+        return Asset(original, 0, 0)
+
+    image = Image.open(BytesIO(original))
+    image.load()
+    target = round(height_in * DPI)
+    resized = image.height > target
+    if resized:
+        width = max(1, round(image.width * target / image.height))
+        image = image.resize((width, target), Image.LANCZOS)
+
+    buffer = BytesIO()
+    image.save(buffer, format="PNG", optimize=True, dpi=(DPI, DPI))
+    data = buffer.getvalue()
+    if not resized and len(data) >= len(original):
+        data = original  # already as small as we can make it
+    return Asset(data, image.width, image.height)
+
+
+# ---------------- ACCESS ----------------
+_assets = {}
+_lock = threading.Lock()
+
+
+def get(name):
+    """The prepared image, built on first use"""
+    asset = _assets.get(name)
+    if asset is None:
+        with _lock:
+            asset = _assets.get(name)
+            if asset is None:
+                path, height_in = IMAGES[name]
+                asset = _assets[name] = prepare(path, height_in)
+    return asset
+
+
+def version():
+    """Hash over all prepared images (part of the render cache key)"""
+    return hashlib.sha256("".join(get(name).version for name in sorted(IMAGES)).encode("ascii")).hexdigest()
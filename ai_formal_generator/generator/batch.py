@@ -0,0 +1,230 @@
+"""
+Batch document generation.
+
+A batch is a list of document specs, as CSV or JSON, one per document:
+
+    type      office_order | circular | policy
+    language  en | hi
+    from      sender designation (a DESIGNATION_MAP key)
+    to        designations (office_order, policy) or people ids (circular),
+              a JSON list or a ";" separated CSV cell
+    subject   circular and policy only
+    body      document text
+    date      optional, YYYY-MM-DD (today when empty)
+
+Specs are validated up front, reference numbers are reserved with one
+counter update per document type and the documents are logged to the
+history in bulk. They are then rendered on the worker pool and streamed
+out as a ZIP as each file completes.
+"""
+
+import csv
+import io
+import json
+import zipfile
+from collections import Counter
+
+from django.utils import timezone
+
+from . import history, registry, render_pool, renderers
+from .documents import (
+    format_date_ddmmyyyy,
+    document_reference, office_order_data, circular_data, policy_data,
+)
+from .models import OfficeOrderCounter
+
+
+LANGUAGES = ("en", "hi")
+MAX_DOCUMENTS = 500
+
+
+class SpecError(ValueError):
+    """Invalid batch input; ``errors`` lists every problem found"""
+
+    def __init__(self, errors):
+        super().__init__("; ".join(errors))
+        self.errors = errors
+
+
+# ---------------- PARSING ----------------
+def parse_specs(content, fmt=None):
+    """List of spec dicts from CSV or JSON text (format guessed when not given)"""
+    content = content.lstrip("\ufeff")
+    if fmt is None:
+        fmt = "json" if content.lstrip()[:1] in ("[", "{") else "csv"
+
+    if fmt == "json":
+        try:
+            specs = json.loads(content)
+        except ValueError as e:
+            raise SpecError([f"Invalid JSON: {e}"])
+        if isinstance(specs, dict):
+            specs = specs.get("documents", [])
+        if not isinstance(specs, list) or not all(isinstance(s, dict) for s in specs):
+            raise SpecError(["JSON must be a list of document objects"])
+        return specs
+
+    reader = csv.DictReader(io.StringIO(content))
+    return [
+        {(k or "").strip().lower(): (v or "").strip() for k, v in row.items()}
+        for row in reader
+    ]
+
+
+def _recipients(value):
+    if isinstance(value, list):
+        return [str(v).strip() for v in value if str(v).strip()]
+    return [v.strip() for v in str(value or "").split(";") if v.strip()]
+
+
+def validate(specs):
+    """Normalised specs, or SpecError listing every invalid row"""
+    errors, documents = [], []
+    if not specs:
+        errors.append("No documents given")
+    if len(specs) > MAX_DOCUMENTS:
+        errors.append(f"At most {MAX_DOCUMENTS} documents per batch")
+
+    reg = registry.current()
+    designations = reg.designations["en"]
+
+    for row, spec in enumerate(specs, start=1):
+        doc_type = str(spec.get("type", "")).strip()
+        lang = str(spec.get("language", "en")).strip() or "en"
+        sender = str(spec.get("from", "")).strip()
+        to = _recipients(spec.get("to"))
+        subject = str(spec.get("subject", "") or "").strip()
+        body = str(spec.get("body", "") or "").strip()
+
+        problems = []
+        if doc_type not in renderers.DOCUMENTS:
+            problems.append(f"unknown type '{doc_type}'")
+        if lang not in LANGUAGES:
+            problems.append(f"unknown language '{lang}'")
+        if sender not in designations:
+            problems.append(f"unknown sender '{sender}'")
+        valid_to = reg.people_by_id if doc_type == "circular" else designations
+        unknown = [t for t in to if t not in valid_to]
+        if unknown:
+            problems.append(f"unknown recipients {', '.join(unknown)}")
+        if doc_type in ("circular", "policy") and not subject:
+            problems.append("subject is required")
+        if not body:
+            problems.append("body is required")
+
+        if problems:
+            errors.append(f"Row {row}: {'; '.join(problems)}")
+            continue
+
+        documents.append({
+            "type": doc_type,
+            "language": lang,
+            "from": sender,
+            "to": to,
+            "subject": subject,
+            "body": body,
+            "date": str(spec.get("date", "") or "").strip(),
+        })
+
+    if errors:
+        raise SpecError(errors)
+    return documents
+
+
+# ---------------- BUILDING ----------------
+def build_documents(specs, year=None, user=None):
+    """(doc_type, data) per validated spec, each type numbered as one block and logged"""
+    year = year or timezone.now().year
+    today = timezone.now().strftime("%d-%m-%Y")
+
+    counts = Counter(spec["type"] for spec in specs)
+    numbers = {
+        doc_type: iter(OfficeOrderCounter.reserve(year, n, doc_type))
+        for doc_type, n in counts.items()
+    }
+
+    documents = []
+    for spec in specs:
+        doc_type, lang = spec["type"], spec["language"]
+        date = format_date_ddmmyyyy(spec["date"]) if spec["date"] else today
+        reference = document_reference(doc_type, lang, year, next(numbers[doc_type]))
+
+        if doc_type == "office_order":
+            data = office_order_data(lang, date, spec["body"], spec["from"], spec["to"], reference)
+        elif doc_type == "circular":
+            data = circular_data(lang, date, spec["subject"], spec["body"], spec["from"], spec["to"], reference)
+        else:
+            data = policy_data(lang, date, spec["subject"], spec["body"], spec["from"], spec["to"], reference)
+        documents.append((doc_type, data))
+
+    history.record_many(documents, user)
+    return documents
+
+
+# ---------------- ZIP STREAM ----------------
+class _ZipBuffer:
+    """Write-only file object zipfile streams into; drained after each entry"""
+
+    def __init__(self):
+        self.chunks = []
+        self.offset = 0
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        self.offset += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.offset
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b"".join(self.chunks)
+        self.chunks = []
+        return data
+
+
+def entry_name(index, doc_type, fmt, data):
+    name = renderers.DOCUMENTS[doc_type]["filename"]
+    return f"{index + 1:03d}_{name}_{data['language']}.{fmt}"
+
+
+def iter_zip(documents, formats=("pdf",)):
+    """
+    ZIP archive bytes for built documents, yielded as each file is rendered.
+
+    PDF and DOCX are already compressed, so entries are stored as-is. A
+    manifest.csv at the end lists every file, with any render errors. If
+    the client goes away mid-stream, the renders still queued are cancelled.
+    """
+    items, names = [], []
+    for index, (doc_type, data) in enumerate(documents):
+        for fmt in formats:
+            items.append((doc_type, fmt, data))
+            names.append(entry_name(index, doc_type, fmt, data))
+
+    buffer = _ZipBuffer()
+    results = {}
+    rendered = render_pool.render_many(items)
+    try:
+        with zipfile.ZipFile(buffer, "w", compression=zipfile.ZIP_STORED) as archive:
+            for index, content, error in rendered:
+                results[index] = error
+                if content is not None:
+                    archive.writestr(names[index], content)
+                    yield buffer.drain()
+
+            manifest = io.StringIO()
+            writer = csv.writer(manifest)
+            writer.writerow(["file", "type", "language", "reference", "status"])
+            for index, (doc_type, fmt, data) in enumerate(items):
+                writer.writerow([
+                    names[index], doc_type, data["language"], data.get("reference", ""),
+                    f"failed: {results[index]}" if results.get(index) else "ok",
+                ])
+            archive.writestr("manifest.csv", manifest.getvalue(), compress_type=zipfile.ZIP_DEFLATED)
+        yield buffer.drain()
+    finally:
+        rendered.close()  # cancels what is still queued when the client went away
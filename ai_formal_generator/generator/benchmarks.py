@@ -0,0 +1,239 @@
+"""
+End-to-end benchmarks of the document flows, offline.
+
+A case is one document type and language with a given body length
+(paragraphs) and recipient count. Each case drives the real views through
+the Django test client, step by step:
+
+    draft   AI body draft (stub provider, draft cache bypassed)
+    submit  form submit to the result_* preview, which issues the document
+    pdf     PDF download of the issued document
+    docx    DOCX download of the issued document
+
+and records per step the median and p95 latency over the timed iterations,
+then the peak Python memory allocated during one more, traced, iteration
+(tracemalloc; memory WeasyPrint and Pango allocate in C is not seen).
+
+The render cache is off so every download renders; the process-level
+caches (templates, fragments, DOCX skeletons, fonts) are warmed by one
+untimed iteration first, as in a running server.
+
+Results are plain JSON. compare() checks them against a baseline saved
+from an earlier run; `python manage.py benchmark_suite` ties it together.
+"""
+
+import math
+import platform
+import statistics
+import time
+import tracemalloc
+
+import django
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.test import Client, override_settings
+from django.urls import reverse
+
+from . import registry, renderers
+from .samples import DOC_TYPES, LANGUAGES, sample_body
+
+
+STEPS = ("draft", "submit", "pdf", "docx")
+
+DRAFT_URLS = {
+    "office_order": "generate_body",
+    "circular": "generate_circular_body",
+    "policy": "generate_policy_body",
+}
+RESULT_URLS = {
+    "office_order": "result",
+    "circular": "result_circular",
+    "policy": "result_policy",
+}
+
+# Run with the stub model, no render cache and everything inline
+SETTINGS = {
+    "AI_PROVIDER": "stub",
+    "AI_STUB_LATENCY": 0,
+    "RENDER_CACHE": {"ENABLED": False},
+    "RENDER_POOL": {"ENABLED": False},
+}
+
+# A step regresses when it is slower (or uses more memory) than the
+# baseline by more than the tolerance AND by more than these amounts,
+# so sub-millisecond noise on fast steps does not fail a run
+MIN_REGRESSION_MS = 2.0
+MIN_REGRESSION_KB = 256
+
+
+class BenchmarkError(Exception):
+    pass
+
+
+class Case:
+    def __init__(self, doc_type, lang, paragraphs=3, recipients=5):
+        self.doc_type = doc_type
+        self.lang = lang
+        self.paragraphs = paragraphs
+        self.recipients = recipients
+
+    @property
+    def name(self):
+        return f"{self.doc_type}/{self.lang}/p{self.paragraphs}/r{self.recipients}"
+
+
+def cases(doc_types=DOC_TYPES, langs=LANGUAGES, paragraphs=(3,), recipients=(5,)):
+    return [
+        Case(doc_type, lang, p, r)
+        for doc_type in doc_types
+        for lang in langs
+        for p in paragraphs
+        for r in recipients
+    ]
+
+
+def percentile(values, q):
+    """Nearest-rank percentile (q in 0..100)"""
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(q / 100 * len(ordered)) - 1)]
+
+
+# ---------------- FORMS ----------------
+def form_data(doc_type, lang, paragraphs=3, recipients=5):
+    """POST data for a result_* view, as the form sends it"""
+    reg = registry.current()
+    designations = list(reg.designation_options)
+    data = {
+        "language": lang,
+        "date": "2026-01-20",
+        "body": sample_body(lang, paragraphs),
+        "from_position": designations[0],
+    }
+    if doc_type == "circular":
+        data["subject"] = reg.circular["header"]["hindi" if lang == "hi" else "english"]["title"]
+        data["to[]"] = [str(person["id"]) for person in reg.people[:recipients]]
+    else:
+        data["to_recipients[]"] = (designations * recipients)[:recipients]
+        if doc_type == "policy":
+            data["subject"] = "Leave Policy" if lang == "en" else "अवकाश नीति"
+    return data
+
+
+def draft_data(lang):
+    return {"language": lang, "body_prompt": "Office timings during the monsoon", "regenerate": "1"}
+
+
+# ---------------- FLOW ----------------
+class Flow:
+    """One user's pass through a document flow on a logged-in client"""
+
+    def __init__(self, client, case):
+        self.client = client
+        self.case = case
+        self.public_id = None
+
+    def check(self, step, response):
+        if response.status_code != 200:
+            raise BenchmarkError(f"{self.case.name} {step}: HTTP {response.status_code}")
+        return response
+
+    def draft(self):
+        url = reverse(DRAFT_URLS[self.case.doc_type])
+        return self.check("draft", self.client.post(url, draft_data(self.case.lang)))
+
+    def submit(self):
+        case = self.case
+        data = form_data(case.doc_type, case.lang, case.paragraphs, case.recipients)
+        response = self.check("submit", self.client.post(reverse(RESULT_URLS[case.doc_type]), data))
+        self.public_id = self.client.session[renderers.DOCUMENTS[case.doc_type]["session_key"]]
+        return response
+
+    def download(self, fmt):
+        if self.public_id is None:
+            self.submit()
+        return self.check(fmt, self.client.get(reverse("download_document", args=[self.public_id, fmt])))
+
+    def pdf(self):
+        return self.download("pdf")
+
+    def docx(self):
+        return self.download("docx")
+
+    def step(self, name):
+        return getattr(self, name)()
+
+
+# ---------------- RUN ----------------
+def measure(client, case, steps=STEPS, iterations=5, memory=True):
+    """{step: {median_ms, p95_ms[, peak_kb]}} for one case"""
+    flow = Flow(client, case)
+    for step in steps:  # warm-up
+        flow.step(step)
+
+    timings = {step: [] for step in steps}
+    for _ in range(iterations):
+        for step in steps:
+            start = time.perf_counter()
+            flow.step(step)
+            timings[step].append((time.perf_counter() - start) * 1000)
+
+    results = {
+        step: {"median_ms": round(statistics.median(t), 3), "p95_ms": round(percentile(t, 95), 3)}
+        for step, t in timings.items()
+    }
+
+    if memory:
+        tracemalloc.start()
+        try:
+            for step in steps:
+                tracemalloc.reset_peak()
+                base = tracemalloc.get_traced_memory()[0]
+                flow.step(step)
+                results[step]["peak_kb"] = round((tracemalloc.get_traced_memory()[1] - base) / 1024, 1)
+        finally:
+            tracemalloc.stop()
+    return results
+
+
+def run(case_list, steps=STEPS, iterations=5, memory=True, progress=None):
+    """Benchmark every case; returns the JSON-ready report"""
+    report = {
+        "meta": {
+            "python": platform.python_version(),
+            "django": django.get_version(),
+            "machine": platform.machine(),
+            "iterations": iterations,
+            "steps": list(steps),
+        },
+        "results": {},
+    }
+    # The test client's host, which only `manage.py test` allows by itself
+    with override_settings(**SETTINGS, ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, "testserver"]):
+        user, _ = User.objects.get_or_create(username="benchmark")
+        client = Client()
+        client.force_login(user)
+        for case in case_list:
+            report["results"][case.name] = measure(client, case, steps, iterations, memory)
+            if progress:
+                progress(case, report["results"][case.name])
+    return report
+
+
+def compare(report, baseline, tolerance=0.25):
+    """Regressions of report against baseline, as readable lines (empty when none)"""
+    regressions = []
+    for name, steps in sorted(baseline.get("results", {}).items()):
+        for step, before in steps.items():
+            after = report["results"].get(name, {}).get(step)
+            if after is None:
+                continue
+            checks = [("median_ms", MIN_REGRESSION_MS, "ms")]
+            if "peak_kb" in before and "peak_kb" in after:
+                checks.append(("peak_kb", MIN_REGRESSION_KB, "KB"))
+            for field, minimum, unit in checks:
+                old, new = before[field], after[field]
+                if new > old * (1 + tolerance) and new - old > minimum:
+                    regressions.append(
+                        f"{name} {step} {field}: {old:.1f} -> {new:.1f} {unit} (+{(new / old - 1) if old else 1:.0%})"
+                    )
+    return regressions
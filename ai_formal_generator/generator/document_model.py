@@ -0,0 +1,215 @@
+"""
+Format-neutral model of an issued document.
+
+build() turns the data a result_* view stores into an ordered list of
+blocks (letterhead, title, reference, date, subject, body paragraphs,
+sender, recipients or the circular's signature table) with every label
+already in the document's language. It is built once per render and
+handed to every format renderer (renderers.render_model), which all walk
+the same blocks:
+
+* HTML is rendered here (export_document.html, with styles/export.css
+  inlined and the logo as a data: URI, so the file stands alone)
+* PDF: each pdf_*.html template loops over the blocks with its own
+  markup and stylesheet
+* DOCX: docx_engine fills its per-layout skeletons from the blocks
+
+The result_* previews print the same LABELS, passed to them as `labels`.
+
+The model is plain data, so it pickles to the render pool's workers.
+"""
+
+import hashlib
+import json
+import os
+import re
+
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
+
+from . import metrics, render_cache
+
+
+EXPORT_TEMPLATE = "generator/export_document.html"
+STYLESHEET = os.path.join(os.path.dirname(os.path.abspath(__file__)), "styles", "export.css")
+
+# Bump when build() changes the blocks it produces (part of every render cache key)
+MODEL_VERSION = "2"
+
+# Labels printed on each document, in every format and the preview
+LABELS = {
+    "office_order": {
+        "en": {"reference": "Ref:", "date": "Date:", "to": "To:"},
+        "hi": {"reference": "सं :", "date": "दिनांक :", "to": "प्रति :"},
+    },
+    "circular": {
+        "en": {"title": "Circular", "reference": "Ref :", "date": "Date :", "subject": "Subject :",
+               "columns": ("Sr. No.", "Name", "Sign")},
+        "hi": {"title": "परिपत्र", "reference": "सं :", "date": "दिनांक :", "subject": "विषय :",
+               "columns": ("क्र.", "नाम", "हस्ताक्षर")},
+    },
+    "policy": {
+        "en": {"title": "POLICY", "reference": "Ref:", "date": "Date:", "subject": "Subject:", "to": "To:"},
+        "hi": {"title": "नीति", "reference": "सं:", "date": "दिनांक:", "subject": "विषय:", "to": "प्रति:"},
+    },
+}
+
+_labels_version = None
+
+
+def labels(doc_type, lang):
+    """Printed labels of a document type in a language"""
+    return LABELS[doc_type]["hi" if lang == "hi" else "en"]
+
+
+def labels_version():
+    """Hash of LABELS (part of the PDF / DOCX render cache keys)"""
+    global _labels_version
+    if _labels_version is None:
+        _labels_version = hashlib.sha256(
+            json.dumps(LABELS, sort_keys=True, ensure_ascii=False).encode("utf-8")
+        ).hexdigest()
+    return _labels_version
+
+
+# Circular letterheads are stored as a dict; this is their printed order
+HEADER_FIELDS = ("org_name", "ministry", "government")
+
+PARAGRAPH_BREAK = re.compile(r"\n\s*\n")
+
+
+class Block:
+    """
+    One part of a document.
+
+    kind is one of logo, header, title, reference, date, subject, body,
+    from, to, signatures; text / label / lines / columns / rows are
+    filled in as that kind needs. The body keeps its text as written
+    (PDF, DOCX) and its paragraphs as lines (HTML).
+    """
+
+    def __init__(self, kind, text="", label="", lines=(), columns=(), rows=()):
+        self.kind = kind
+        self.text = text
+        self.label = label
+        self.lines = tuple(lines)
+        self.columns = tuple(columns)
+        self.rows = tuple(rows)
+
+    def __repr__(self):
+        return f"Block({self.kind!r})"
+
+
+class DocumentModel:
+    """A document's blocks plus the data and labels they were built from"""
+
+    def __init__(self, doc_type, language, blocks, data):
+        self.doc_type = doc_type
+        self.language = language
+        self.blocks = tuple(blocks)
+        self.data = data
+        self.labels = labels(doc_type, language)
+
+    def block(self, kind):
+        return next((b for b in self.blocks if b.kind == kind), None)
+
+    @property
+    def title(self):
+        block = self.block("title")
+        return block.text if block else ""
+
+
+# ---------------- BUILD ----------------
+def _header_lines(header):
+    if isinstance(header, dict):
+        return [header[field] for field in HEADER_FIELDS if header.get(field)]
+    return list(header)
+
+
+def _paragraphs(body):
+    return [p.strip() for p in PARAGRAPH_BREAK.split(body.strip()) if p.strip()]
+
+
+def _reference_and_date(data, labels, required=False):
+    blocks = []
+    if required or data.get("reference"):
+        blocks.append(Block("reference", data.get("reference", ""), labels["reference"]))
+    blocks.append(Block("date", data["date"], labels["date"]))
+    return blocks
+
+
+def build(doc_type, data):
+    """DocumentModel for one document's stored data"""
+    lang = data.get("language", "en")
+    printed = labels(doc_type, lang)
+    header = Block("header", lines=_header_lines(data["header"]))
+    body = Block("body", data.get("body") or "", lines=_paragraphs(data.get("body") or ""))
+    sender = Block("from", data.get("from") or "")
+
+    if doc_type == "office_order":
+        blocks = [
+            header,
+            *_reference_and_date(data, printed, required=True),
+            Block("title", data["title"]),
+            body,
+            sender,
+            Block("to", label=printed["to"], lines=data["to"]),
+        ]
+    elif doc_type == "circular":
+        name = "name_hi" if lang == "hi" else "name_en"
+        rows = [(str(i), person.get(name) or "", "") for i, person in enumerate(data.get("to_people", []), 1)]
+        blocks = [
+            Block("logo", "logo"),
+            header,
+            Block("title", printed["title"]),
+            *_reference_and_date(data, printed),
+            Block("subject", data.get("subject") or "", printed["subject"]),
+            body,
+            sender,
+        ]
+        if rows:
+            blocks.append(Block("signatures", columns=printed["columns"], rows=rows))
+    elif doc_type == "policy":
+        blocks = [
+            header,
+            Block("title", printed["title"]),
+            *_reference_and_date(data, printed),
+            Block("subject", data.get("subject") or "", printed["subject"]),
+            body,
+            sender,
+            Block("to", label=printed["to"], lines=data.get("to_list") or [data["to"]]),
+        ]
+    else:
+        raise ValueError(f"Unknown document type: {doc_type}")
+
+    return DocumentModel(doc_type, lang, blocks, data)
+
+
+# ---------------- HTML ----------------
+_stylesheet = None
+
+
+def stylesheet():
+    global _stylesheet
+    if _stylesheet is None:
+        with open(STYLESHEET, encoding="utf-8") as f:
+            _stylesheet = f.read()
+    return _stylesheet
+
+
+def version():
+    """Everything the HTML output depends on besides the data (render cache key)"""
+    return hashlib.sha256("\0".join((
+        MODEL_VERSION,
+        render_cache.template_version(EXPORT_TEMPLATE),
+        stylesheet(),
+    )).encode("utf-8")).hexdigest()
+
+
+def render_html(model):
+    """A standalone HTML file for the document"""
+    with metrics.timer("html_render", model.doc_type, model.language):
+        return render_to_string(EXPORT_TEMPLATE, {
+            "document": model,
+            "stylesheet": mark_safe(stylesheet()),
+        }).encode("utf-8")
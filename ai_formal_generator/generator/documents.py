@@ -0,0 +1,96 @@
+"""
+Document data builders.
+
+The dicts built here are what the result_* views store (DocumentLog.payload)
+and what renderers.py renders from. The forms and batch generation both go
+through these, so a document looks the same however it was requested.
+"""
+
+from datetime import datetime
+
+from . import registry
+from .registry import thaw
+
+
+# ---------------- HELPERS ----------------
+def format_date_ddmmyyyy(date_str):
+    try:
+        return datetime.strptime(date_str, "%Y-%m-%d").strftime("%d-%m-%Y")
+    except Exception:
+        return date_str
+
+
+# Reference number prefixes; each document type is numbered separately per year
+REFERENCE_PREFIXES = {
+    "office_order": {"en": "BISAG-N/Office Order", "hi": "बायसेग-एन/कार्यालय आदेश"},
+    "circular": {"en": "BISAG-N/Circular", "hi": "बायसेग-एन/परिपत्र"},
+    "policy": {"en": "BISAG-N/Policy", "hi": "बायसेग-एन/नीति"},
+}
+
+
+def document_reference(doc_type, lang, year, number):
+    prefix = REFERENCE_PREFIXES[doc_type]["hi" if lang == "hi" else "en"]
+    return f"{prefix}/{year}/{number:03d}"
+
+
+# ---------------- BUILDERS ----------------
+# Lookups go through the live registry (generator/registry.py), so edits to
+# the JSON files are picked up without a restart.
+def office_order_data(lang, date, body, from_position, to_positions, reference):
+    reg = registry.current()
+    office_order = reg.office_order
+    return {
+        "language": lang,
+        "header": thaw(office_order["header"][lang]),
+        "title": office_order["title_hi"] if lang == "hi" else office_order["title_en"],
+        "reference": reference,
+        "date": date,
+        "body": body,
+        "from": reg.designation(from_position, lang),
+        "to": [reg.designation(x, lang) for x in to_positions],
+    }
+
+
+def circular_data(lang, date, subject, body, from_position, to_ids, reference=""):
+    reg = registry.current()
+    from_designation = reg.designation(from_position, lang) if from_position else ""
+    to_people = reg.resolve_people(to_ids)
+
+    header = reg.circular["header"]["hindi" if lang == "hi" else "english"]
+    return {
+        "language": lang,
+        "header": {
+            "org_name": header["org_name"],
+            "ministry": header["ministry"],
+            "government": header["government"],
+        },
+        "reference": reference,
+        "date": date,
+        "subject": subject,
+        "body": body,
+        "from": from_designation,
+        "to_people": to_people,
+    }
+
+
+def policy_data(lang, date, subject, body, from_position, to_positions, reference=""):
+    reg = registry.current()
+    to_list = reg.designation_labels(to_positions, lang)
+
+    # Format recipients based on language (for PDF/DOCX download)
+    if lang == "hi":
+        to_str = ", ".join(to_list) if to_list else "सभी संबंधित"
+    else:
+        to_str = ", ".join(to_list) if to_list else "All Concerned"
+
+    return {
+        "language": lang,
+        "header": thaw(reg.policy["header"][lang]),
+        "reference": reference,
+        "date": date,
+        "subject": subject,
+        "body": body,
+        "from": reg.designation(from_position, lang),
+        "to": to_str,
+        "to_list": to_list,  # Pass list for template to display one per line
+    }
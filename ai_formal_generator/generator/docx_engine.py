@@ -0,0 +1,366 @@
+"""
+DOCX engine built on in-memory skeletons.
+
+Everything in a document that depends only on its type and language
+(margins, styles, the header block, the embedded logo, titles and labels,
+the latter from document_model.LABELS) is laid out once per process into a skeleton .docx and kept in memory.
+Each request parses only the skeleton's word/document.xml, fills its
+{{placeholders}} from the blocks of the document model
+(generator/document_model.py: reference, date, subject, body, sender and
+the recipient lines / signature rows) and appends it to the other,
+unchanged package parts, which are already zipped.
+
+Skeletons are keyed on (document type, language, header lines, title),
+so a document with a different header still gets a matching skeleton.
+When the letterhead JSON changes (generator/registry.py) the skeletons are
+dropped; stored documents rebuild theirs from their own header on next use.
+"""
+
+import copy
+import os
+import re
+import threading
+import zipfile
+from io import BytesIO
+
+from django.conf import settings
+from django.dispatch import receiver
+
+from . import assets, document_model, metrics, registry
+
+
+LOGO_PATH = os.path.join(settings.BASE_DIR, "static", "generator", "bisag_logo.png")
+
+# Word sets Devanagari with the complex-script font and reads its size and
+# weight from w:szCs / w:bCs, not w:sz / w:b; same face as the PDFs
+COMPLEX_SCRIPT_FONT = "Noto Serif Devanagari"
+
+PLACEHOLDER = re.compile(r"\{\{(\w+)\}\}")
+
+# The only part of the package that differs between documents of one layout
+DOCUMENT_PART = "word/document.xml"
+
+
+def placeholder(name):
+    return "{{" + name + "}}"
+
+
+# ---------------- PARAGRAPH HELPERS ----------------
+def _add(doc, text, size=None, bold=False, underline=False, align=None):
+    from docx.shared import Pt
+
+    p = doc.add_paragraph(text)
+    if align is not None:
+        p.alignment = align
+    if p.runs:
+        if bold:
+            _bold(p.runs[0])
+        if underline:
+            p.runs[0].underline = True
+        if size:
+            p.runs[0].font.size = Pt(size)
+            _complex_script_size(p.runs[0])
+    return p
+
+
+def _bold(run):
+    run.bold = True
+    run.font.cs_bold = True
+
+
+def _complex_script_size(run):
+    """Repeat the run's w:sz as w:szCs (python-docx only writes the former)"""
+    from docx.oxml import OxmlElement
+    from docx.oxml.ns import qn
+
+    sz = run._r.get_or_add_rPr().get_or_add_sz()
+    sz_cs = OxmlElement("w:szCs")
+    sz_cs.set(qn("w:val"), sz.get(qn("w:val")))
+    sz.addnext(sz_cs)
+
+
+def _set_fonts(doc):
+    from docx.oxml.ns import qn
+
+    fonts = doc.styles["Normal"].element.get_or_add_rPr().get_or_add_rFonts()
+    fonts.set(qn("w:cs"), COMPLEX_SCRIPT_FONT)
+
+
+def _set_margins(doc):
+    from docx.shared import Inches
+
+    for section in doc.sections:
+        section.top_margin = Inches(1)
+        section.bottom_margin = Inches(1)
+        section.left_margin = Inches(1)
+        section.right_margin = Inches(1)
+
+
+def _placeholders(doc):
+    """{name: paragraph} for every paragraph holding a {{name}} placeholder"""
+    found = {}
+    for p in doc.paragraphs:
+        match = PLACEHOLDER.search(p.text)
+        if match:
+            found[match.group(1)] = p
+    return found
+
+
+def _fill(paragraph, name, value):
+    # Skeleton paragraphs are a single run, so its formatting is kept
+    value = "" if value is None else str(value)
+    paragraph.runs[0].text = paragraph.text.replace(placeholder(name), value)
+
+
+def _remove(paragraph):
+    element = paragraph._element
+    element.getparent().remove(element)
+
+
+def _fill_lines(paragraph, lines, prefix=""):
+    """Repeat a formatted placeholder paragraph once per line"""
+    from docx.text.paragraph import Paragraph
+
+    for line in lines:
+        clone = copy.deepcopy(paragraph._element)
+        paragraph._element.addprevious(clone)
+        Paragraph(clone, paragraph._parent).runs[0].text = f"{prefix}{line}"
+    _remove(paragraph)
+
+
+# ---------------- OFFICE ORDER ----------------
+def office_order_skeleton(lang, header, title):
+    from docx import Document
+    from docx.enum.text import WD_ALIGN_PARAGRAPH as ALIGN
+
+    doc = Document()
+    _set_margins(doc)
+    _set_fonts(doc)
+
+    for line in header:
+        _add(doc, line, 14, bold=True, align=ALIGN.CENTER)
+
+    labels = document_model.labels("office_order", lang)
+    _add(doc, f"{labels['reference']} {placeholder('reference')}", 12, bold=True)
+    _add(doc, f"{labels['date']} {placeholder('date')}", 12, bold=True, align=ALIGN.RIGHT)
+
+    _add(doc, title, 16, bold=True, underline=True, align=ALIGN.CENTER)
+    _add(doc, placeholder("body"), 12, align=ALIGN.JUSTIFY)
+    _add(doc, placeholder("from"), 12, bold=True, align=ALIGN.RIGHT)
+
+    _add(doc, labels["to"], 12, bold=True)
+    _add(doc, placeholder("to"), 12, bold=True)
+    return doc
+
+
+def fill_office_order(doc, model):
+    fields = _placeholders(doc)
+    for name in ("reference", "date", "body", "from"):
+        _fill(fields[name], name, model.block(name).text)
+    _fill_lines(fields["to"], model.block("to").lines)
+
+
+# ---------------- CIRCULAR ----------------
+def _fill_common(doc, model):
+    """Reference (dropped when absent), date, subject, body and sender"""
+    fields = _placeholders(doc)
+    reference = model.block("reference")
+    if reference and reference.text:
+        _fill(fields["reference"], "reference", reference.text)
+    else:
+        _remove(fields["reference"])
+    for name in ("date", "subject", "body", "from"):
+        _fill(fields[name], name, model.block(name).text)
+    return fields
+
+
+def circular_skeleton(lang, header, title=None):
+    from docx import Document
+    from docx.enum.text import WD_ALIGN_PARAGRAPH as ALIGN
+    from docx.shared import Inches
+
+    doc = Document()
+    _set_margins(doc)
+    _set_fonts(doc)
+
+    if os.path.exists(LOGO_PATH):
+        logo_paragraph = doc.add_paragraph()
+        logo_paragraph.alignment = ALIGN.CENTER
+        logo_paragraph.add_run().add_picture(assets.get("logo").stream(), height=Inches(0.9))
+        doc.add_paragraph()  # Add space after logo
+
+    for line in header:
+        _add(doc, line, 14, bold=True, align=ALIGN.CENTER)
+
+    labels = document_model.labels("circular", lang)
+    _add(doc, labels["title"], 16, bold=True, underline=True, align=ALIGN.CENTER)
+
+    _add(doc, f"{labels['reference']} {placeholder('reference')}", 12, bold=True, align=ALIGN.RIGHT)
+    _add(doc, f"{labels['date']} {placeholder('date')}", 12, bold=True, align=ALIGN.RIGHT)
+    _add(doc, f"{labels['subject']} {placeholder('subject')}", 12, bold=True)
+
+    _add(doc, placeholder("body"), 12, align=ALIGN.JUSTIFY)
+    _add(doc, placeholder("from"), 12, bold=True, align=ALIGN.RIGHT)
+    doc.add_paragraph()  # space before table
+
+    # Recipients table: header row here, one row per person on fill
+    table = doc.add_table(rows=1, cols=3)
+    table.style = "Table Grid"
+    for cell, label in zip(table.rows[0].cells, labels["columns"]):
+        cell.text = label
+        _bold(cell.paragraphs[0].runs[0])
+        cell.paragraphs[0].alignment = ALIGN.CENTER
+    for column, width in zip(table.columns, (1.0, 3.5, 1.5)):
+        column.width = Inches(width)
+    return doc
+
+
+def fill_circular(doc, model):
+    from docx.enum.text import WD_ALIGN_PARAGRAPH as ALIGN
+
+    _fill_common(doc, model)
+
+    table = doc.tables[0]
+    signatures = model.block("signatures")
+    if signatures is None:
+        table._tbl.getparent().remove(table._tbl)
+        return
+
+    for row in signatures.rows:
+        for cell, text in zip(table.add_row().cells, row):
+            cell.text = text
+            cell.paragraphs[0].alignment = ALIGN.CENTER
+
+
+# ---------------- POLICY ----------------
+def policy_skeleton(lang, header, title=None):
+    from docx import Document
+    from docx.enum.text import WD_ALIGN_PARAGRAPH as ALIGN
+
+    doc = Document()
+    _set_fonts(doc)
+
+    for line in header:
+        _add(doc, line, 12, bold=True, align=ALIGN.CENTER)
+    doc.add_paragraph()  # spacing
+
+    labels = document_model.labels("policy", lang)
+    _add(doc, labels["title"], 16, bold=True, underline=True, align=ALIGN.CENTER)
+    doc.add_paragraph()  # spacing
+
+    _add(doc, f"{labels['reference']} {placeholder('reference')}", bold=True, align=ALIGN.RIGHT)
+    _add(doc, f"{labels['date']} {placeholder('date')}", bold=True, align=ALIGN.RIGHT)
+    _add(doc, f"{labels['subject']} {placeholder('subject')}", bold=True)
+    doc.add_paragraph()  # spacing
+
+    _add(doc, placeholder("body"), 12, align=ALIGN.JUSTIFY)
+    doc.add_paragraph()  # spacing
+
+    _add(doc, placeholder("from"), bold=True, align=ALIGN.RIGHT)
+    _add(doc, labels["to"], bold=True)
+    _add(doc, placeholder("to"))
+    return doc
+
+
+def fill_policy(doc, model):
+    fields = _fill_common(doc, model)
+    _fill_lines(fields["to"], model.block("to").lines, prefix="    ")  # indented
+
+
+# ---------------- ENGINE ----------------
+LAYOUTS = {
+    "office_order": (office_order_skeleton, fill_office_order),
+    "circular": (circular_skeleton, fill_circular),
+    "policy": (policy_skeleton, fill_policy),
+}
+
+
+def skeleton_key(model):
+    return (model.doc_type, model.language, model.block("header").lines, model.title)
+
+
+class Skeleton:
+    """
+    A laid-out .docx split for filling: the parsed-once package minus its
+    main document part (as ready-made ZIP bytes), and that part's XML.
+    """
+
+    def __init__(self, content):
+        prefix = BytesIO()
+        with zipfile.ZipFile(BytesIO(content)) as package, \
+                zipfile.ZipFile(prefix, "w", zipfile.ZIP_DEFLATED) as out:
+            for info in package.infolist():
+                if info.filename == DOCUMENT_PART:
+                    self.document_xml = package.read(info)
+                else:
+                    out.writestr(info, package.read(info), compress_type=info.compress_type)
+        self.prefix = prefix.getvalue()
+
+    def fill(self, fill, model):
+        """New .docx bytes: a fresh copy of the document part, filled, appended to the prefix"""
+        from docx.document import Document
+        from docx.oxml import parse_xml
+        from docx.opc.oxml import serialize_part_xml
+
+        element = parse_xml(self.document_xml)
+        fill(Document(element, None), model)
+
+        buffer = BytesIO(self.prefix)
+        with zipfile.ZipFile(buffer, "a", zipfile.ZIP_DEFLATED) as package:
+            package.writestr(DOCUMENT_PART, serialize_part_xml(element))
+        return buffer.getvalue()
+
+
+class DocxEngine:
+    """Skeletons per document layout, built on first use"""
+
+    def __init__(self):
+        self._skeletons = {}
+        self._lock = threading.Lock()
+
+    def skeleton(self, model):
+        key = skeleton_key(model)
+        skeleton = self._skeletons.get(key)
+        if skeleton is None:
+            with self._lock:
+                skeleton = self._skeletons.get(key)
+                if skeleton is None:
+                    build, _ = LAYOUTS[model.doc_type]
+                    buffer = BytesIO()
+                    build(*key[1:]).save(buffer)
+                    skeleton = self._skeletons[key] = Skeleton(buffer.getvalue())
+        return skeleton
+
+    def clear(self):
+        with self._lock:
+            self._skeletons = {}
+
+    def render(self, model, cached=True):
+        """
+        DOCX bytes for a built document model.
+
+        cached=False lays the whole document out from scratch with
+        python-docx, which is what every download used to cost.
+        """
+        build, fill = LAYOUTS[model.doc_type]
+        with metrics.timer("docx_build", model.doc_type, model.language):
+            if cached:
+                return self.skeleton(model).fill(fill, model)
+
+            doc = build(*skeleton_key(model)[1:])
+            fill(doc, model)
+            buffer = BytesIO()
+            doc.save(buffer)
+            return buffer.getvalue()
+
+
+engine = DocxEngine()
+
+
+@receiver(registry.changed)
+def _registry_changed(**kwargs):
+    engine.clear()
+
+
+def render_docx(model):
+    return engine.render(model)
@@ -0,0 +1,135 @@
+"""
+Response cache for AI drafting.
+
+Many prompts differ only in wording noise ("Holiday on 26th Jan." vs
+"holiday on 26 January"), so the key is built from a normalised prompt
+together with the document type, field, language and a hash of the system
+prompt. Editing a system prompt therefore starts a fresh set of entries.
+
+Entries live in a Django cache alias (``settings.AI_DRAFT_CACHE["ALIAS"]``),
+so the backend is chosen in CACHES: locmem (per process, LRU), file or
+database (shared between workers). TTL and size limits are the alias'
+TIMEOUT and MAX_ENTRIES.
+"""
+
+import hashlib
+import re
+import unicodedata
+
+from django.conf import settings
+from django.core.cache import caches
+
+
+STATS_KEYS = {"hits": "ai_draft:stats:hits", "misses": "ai_draft:stats:misses"}
+
+# Only politeness and filler: prepositions and conjunctions carry meaning
+# ("to Ahmedabad" / "from Ahmedabad", "Monday and Tuesday" / "or Tuesday")
+STOPWORDS = frozenset("""
+    a an the please kindly write draft generate prepare create make
+    about regarding content body text
+    कृपया लिखें लिखिए बनाएं तैयार करें संबंध संबंधी बारे
+""".split())
+
+MONTHS = {
+    "jan": "january", "feb": "february", "mar": "march", "apr": "april",
+    "jun": "june", "jul": "july", "aug": "august", "sep": "september",
+    "sept": "september", "oct": "october", "nov": "november", "dec": "december",
+}
+
+ORDINAL = re.compile(r"^(\d+)(st|nd|rd|th)$")
+
+
+def cache_settings():
+    conf = getattr(settings, "AI_DRAFT_CACHE", {})
+    return {
+        "ENABLED": conf.get("ENABLED", True),
+        "ALIAS": conf.get("ALIAS", "default"),
+    }
+
+
+def get_cache():
+    conf = cache_settings()
+    if not conf["ENABLED"]:
+        return None
+    return caches[conf["ALIAS"]]
+
+
+# ---------------- KEYS ----------------
+def _token(word):
+    match = ORDINAL.match(word)
+    if match:
+        return match.group(1)
+    return MONTHS.get(word, word)
+
+
+def normalise_prompt(prompt):
+    """Prompt reduced to its meaningful words, in order"""
+    text = unicodedata.normalize("NFKC", prompt).casefold()
+    # Drop punctuation and symbols (incl. the danda) but keep Devanagari vowel signs
+    text = "".join(
+        " " if unicodedata.category(ch)[0] in "PS" else ch
+        for ch in text
+    )
+    tokens = [_token(word) for word in text.split()]
+    return " ".join(word for word in tokens if word not in STOPWORDS)
+
+
+def draft_key(doc_type, field, lang, system_prompt, prompt):
+    version = hashlib.sha256(system_prompt.encode("utf-8")).hexdigest()[:16]
+    digest = hashlib.sha256(normalise_prompt(prompt).encode("utf-8")).hexdigest()
+    return f"ai_draft:{doc_type}:{field}:{lang}:{version}:{digest}"
+
+
+# ---------------- LOOKUPS ----------------
+def _count(cache, outcome):
+    key = STATS_KEYS[outcome]
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.add(key, 1, timeout=None) or cache.incr(key)
+
+
+async def _acount(cache, outcome):
+    key = STATS_KEYS[outcome]
+    try:
+        await cache.aincr(key)
+    except ValueError:
+        await cache.aadd(key, 1, timeout=None) or await cache.aincr(key)
+
+
+def lookup(key):
+    """Cached draft for a key, or None (counted as a hit or a miss)"""
+    cache = get_cache()
+    if cache is None:
+        return None
+    text = cache.get(key)
+    _count(cache, "misses" if text is None else "hits")
+    return text
+
+
+async def alookup(key):
+    cache = get_cache()
+    if cache is None:
+        return None
+    text = await cache.aget(key)
+    await _acount(cache, "misses" if text is None else "hits")
+    return text
+
+
+def store(key, text):
+    cache = get_cache()
+    if cache is not None and text:
+        cache.set(key, text)
+
+
+async def astore(key, text):
+    cache = get_cache()
+    if cache is not None and text:
+        await cache.aset(key, text)
+
+
+def stats():
+    cache = get_cache()
+    if cache is None:
+        return {"hits": 0, "misses": 0}
+    return {outcome: cache.get(key, 0) for outcome, key in STATS_KEYS.items()}
@@ -0,0 +1,168 @@
+"""
+Issued document history.
+
+Every document that gets a reference number (the result_* views and batch
+generation) is recorded as a DocumentLog row, with the data it renders from
+as payload. Sessions and download URLs refer to it by its short public_id
+instead of carrying the whole document. History pages are read newest
+first with keyset pagination on (created_at, id): a page is one index range
+scan from the last row of the previous page, so page 1000 costs the same as
+page 1 and no COUNT(*) is needed. Subject and body are searched through the
+full-text index from migration 0006 (FTS5 on SQLite, a GIN tsvector index
+on PostgreSQL).
+"""
+
+from datetime import datetime, timedelta, timezone
+
+from django.db import connections
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+
+from .models import DocumentLog
+
+
+PAGE_SIZE = 25
+
+# DocumentLog.document_type values for the renderers' document types
+LOG_TYPES = {
+    "office_order": "Office Order",
+    "circular": "Circular",
+    "policy": "Policy",
+}
+DOC_TYPES = {label: doc_type for doc_type, label in LOG_TYPES.items()}
+
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+
+# ---------------- RECORDING ----------------
+def recipients(doc_type, data):
+    """Recipient lines of session data, as shown on the document"""
+    if doc_type == "circular":
+        key = "name_hi" if data.get("language") == "hi" else "name_en"
+        return [p.get(key) or "" for p in data.get("to_people", [])]
+    if doc_type == "policy":
+        return data.get("to_list") or [data.get("to", "")]
+    return list(data.get("to", []))
+
+
+def log_entry(doc_type, data, user=None):
+    return DocumentLog(
+        user=user if user is not None and user.is_authenticated else None,
+        document_type=LOG_TYPES[doc_type],
+        language=data.get("language", "en"),
+        reference_id=data.get("reference", ""),
+        date_issued=data.get("date", ""),
+        subject=data.get("subject") or "",
+        body=data.get("body") or "",
+        from_designation=data.get("from") or "",
+        to_recipients="\n".join(recipients(doc_type, data)),
+        payload=data,
+    )
+
+
+def record(doc_type, data, user=None):
+    entry = log_entry(doc_type, data, user)
+    entry.save()
+    return entry
+
+
+def record_many(documents, user=None):
+    """Log (doc_type, data) pairs with batched INSERTs"""
+    return DocumentLog.objects.bulk_create(
+        [log_entry(doc_type, data, user) for doc_type, data in documents], batch_size=500
+    )
+
+
+def load(public_id, doc_type=None):
+    """(doc_type, data) of a stored document, None when there is none (of that type)"""
+    documents = DocumentLog.objects.filter(public_id=public_id)
+    if doc_type is not None:
+        documents = documents.filter(document_type=LOG_TYPES[doc_type])
+    row = documents.values_list("document_type", "payload").first()
+    if row is None or row[0] not in DOC_TYPES:
+        return None
+    return DOC_TYPES[row[0]], row[1]
+
+
+# ---------------- SEARCH ----------------
+FTS_TABLE = "generator_documentlog_fts"
+
+
+def fts5_query(query):
+    """Each word as a quoted FTS5 string (so no operators leak in), the last one as a prefix"""
+    terms = ['"' + word.replace('"', '""') + '"' for word in query.split()]
+    terms[-1] += "*"
+    return " ".join(terms)
+
+
+def search(queryset, query):
+    """
+    Documents with query as their reference number or, failing that, with
+    every word of query in their subject or body.
+
+    On SQLite the FTS5 table is joined in and its rowid (the log id) kept as
+    fts_rowid; page() then walks the matches newest first straight out of
+    the full-text index instead of collecting and sorting all of them.
+    """
+    query = query.strip()
+    if not query:
+        return queryset
+
+    by_reference = queryset.filter(reference_id=query)
+    if by_reference.exists():
+        return by_reference
+
+    vendor = connections[queryset.db].vendor
+    if vendor == "sqlite":
+        return queryset.extra(
+            tables=[FTS_TABLE],
+            where=[f"{FTS_TABLE}.rowid = generator_documentlog.id", f"{FTS_TABLE} MATCH %s"],
+            params=[fts5_query(query)],
+        ).annotate(fts_rowid=RawSQL(f"{FTS_TABLE}.rowid", []))
+    if vendor == "postgresql":
+        # Same expression as the documentlog_search GIN index
+        return queryset.filter(id__in=RawSQL(
+            "SELECT id FROM generator_documentlog "
+            "WHERE to_tsvector('simple', subject || ' ' || body) @@ plainto_tsquery('simple', %s)",
+            [query],
+        ))
+    for word in query.split():
+        queryset = queryset.filter(Q(subject__icontains=word) | Q(body__icontains=word))
+    return queryset
+
+
+# ---------------- PAGINATION ----------------
+def cursor_for(entry):
+    micros = (entry.created_at - EPOCH) // timedelta(microseconds=1)
+    return f"{micros}.{entry.pk}"
+
+
+def parse_cursor(cursor):
+    """(created_at, id) from a cursor, None when missing or malformed"""
+    try:
+        micros, pk = (int(part) for part in (cursor or "").split("."))
+        return EPOCH + timedelta(microseconds=micros), pk
+    except (ValueError, OverflowError):
+        return None
+
+
+def page(queryset, cursor=None, size=PAGE_SIZE):
+    """(entries, next cursor or None) for the page after cursor, newest first"""
+    position = parse_cursor(cursor)
+
+    if "fts_rowid" in queryset.query.annotations:
+        # Full-text matches come in log id order, which is insertion order too
+        queryset = queryset.order_by("-fts_rowid")
+        if position is not None:
+            queryset = queryset.filter(fts_rowid__lt=position[1])
+    else:
+        queryset = queryset.order_by("-created_at", "-id")
+        if position is not None:
+            created_at, pk = position
+            # (created_at, id) < position, written so the created_at bound is an index range
+            queryset = queryset.filter(created_at__lte=created_at).exclude(created_at=created_at, id__gte=pk)
+
+    entries = list(queryset[:size + 1])
+    if len(entries) > size:
+        return entries[:size], cursor_for(entries[size - 1])
+    return entries, None
@@ -0,0 +1,479 @@
+"""
+LLM providers for AI drafting.
+
+Views call draft() / stream_draft() (and their async forms) with a document
+type, field, language and the user's topic; this module adds the matching
+system prompt, consults the draft cache and hands the request to the
+configured provider (settings.AI_PROVIDER):
+
+* ``"gemini"`` – Google Gemini; one model client per process, transient
+  API errors retried with jittered exponential backoff
+* ``"stub"``   – deterministic offline drafts with optional latency, for
+  load tests and benchmarks without network or API quota
+"""
+
+import asyncio
+import hashlib
+import random
+import threading
+import time
+
+from django.conf import settings
+from django.dispatch import receiver
+from django.test.signals import setting_changed
+
+from . import draft_cache, metrics
+
+
+# ---------------- SYSTEM PROMPTS ----------------
+# (document type, field, language) -> instructions sent ahead of the user's topic
+SYSTEM_PROMPTS = {
+    ("office_order", "body", "hi"): """
+आप BISAG-N के लिए एक आधिकारिक कार्यालय आदेश की मुख्य सामग्री लिख रहे हैं।
+
+नियम:
+- कम से कम 2–3 वाक्यों का एक औपचारिक अनुच्छेद लिखें।
+- सरकारी भाषा का प्रयोग करें।
+- कोई शीर्षक, संदर्भ, दिनांक, प्रेषक या प्राप्तकर्ता न लिखें।
+- बुलेट या क्रमांक का प्रयोग न करें।
+- केवल सादा पाठ में उत्तर दें।
+""",
+
+    ("office_order", "body", "en"): """
+You are drafting the BODY of an official government Office Order for BISAG-N.
+
+Rules:
+- Write one formal paragraph (minimum 2–3 sentences).
+- Use official government tone.
+- Do not include title, reference, date, From or To.
+- No bullet points or numbering.
+- Plain text only.
+""",
+
+    ("circular", "body", "hi"): """
+आप BISAG-N के लिए एक सरकारी परिपत्र (Circular) का केवल मुख्य भाग (BODY) लिख रहे हैं।
+
+महत्वपूर्ण नियम:
+- केवल परिपत्र का मुख्य विषय-वस्तु लिखें।
+- कोई विषय (Subject) न लिखें।
+- कोई शीर्षक न लिखें।
+- कोई संदर्भ संख्या न लिखें।
+- कोई हस्ताक्षर न लिखें।
+- कोई दिनांक न लिखें।
+- कोई "प्रेषक" या "प्राप्तकर्ता" न लिखें।
+- 1–2 औपचारिक अनुच्छेद लिखें।
+- सरकारी भाषा का प्रयोग करें।
+- केवल सादा पाठ में उत्तर दें।
+""",
+
+    ("circular", "body", "en"): """
+You are drafting ONLY the BODY content of an official Government Circular for BISAG-N.
+
+IMPORTANT Rules:
+- Write ONLY the main body content of the circular.
+- Do NOT include any subject line.
+- Do NOT include any title or heading.
+- Do NOT include reference number.
+- Do NOT include signature.
+- Do NOT include date.
+- Do NOT include From or To sections.
+- Write 1–2 formal paragraphs only.
+- Official government tone.
+- Plain text only.
+""",
+
+    ("policy", "title", "hi"): """
+आप BISAG-N के लिए एक सरकारी नीति दस्तावेज़ का विषय (Subject) लिख रहे हैं।
+
+नियम:
+- केवल एक पंक्ति का संक्षिप्त विषय लिखें।
+- औपचारिक सरकारी भाषा का प्रयोग करें।
+- 5-12 शब्दों में।
+- केवल विषय लिखें, कुछ और नहीं।
+""",
+
+    ("policy", "title", "en"): """
+You are writing the subject line for an official Government Policy document for BISAG-N.
+
+Rules:
+- Write ONE concise subject line only.
+- Use formal government language.
+- 5-12 words maximum.
+- Return ONLY the subject, nothing else.
+""",
+
+    ("policy", "body", "hi"): """
+आप BISAG-N के लिए एक सरकारी नीति दस्तावेज़ की सामग्री लिख रहे हैं।
+
+नियम:
+- औपचारिक नीति भाषा का प्रयोग करें।
+- उद्देश्य, दायरा, और प्रमुख बिंदुओं को शामिल करें।
+- 3-5 अनुच्छेदों में लिखें।
+- कोई शीर्षक या नीति संख्या न लिखें।
+- सरकारी भाषा का प्रयोग करें।
+- केवल सादा पाठ में उत्तर दें।
+""",
+
+    ("policy", "body", "en"): """
+You are writing the content for an official Government Policy document for BISAG-N.
+
+Rules:
+- Use formal policy language.
+- Include purpose, scope, and key points.
+- Write 3-5 formal paragraphs.
+- Do NOT include title or policy number.
+- Official government tone.
+- Plain text only.
+""",
+}
+
+
+def system_prompt_for(doc_type, field, lang):
+    return SYSTEM_PROMPTS[(doc_type, field, "hi" if lang == "hi" else "en")]
+
+
+class DraftRequest:
+    """One drafting call: what to write and the user's topic"""
+
+    def __init__(self, doc_type, field, lang, prompt):
+        self.doc_type = doc_type
+        self.field = field
+        self.lang = "hi" if lang == "hi" else "en"
+        self.prompt = prompt
+        self.system_prompt = system_prompt_for(doc_type, field, lang)
+
+    @property
+    def full_prompt(self):
+        return self.system_prompt + "\n\nTopic:\n" + self.prompt
+
+    @property
+    def cache_key(self):
+        return draft_cache.draft_key(self.doc_type, self.field, self.lang, self.system_prompt, self.prompt)
+
+
+def _lstrip_first(chunks):
+    started = False
+    for text in chunks:
+        if not started:
+            text = text.lstrip()
+            started = bool(text)
+        if text:
+            yield text
+
+
+async def _alstrip_first(chunks):
+    started = False
+    async for text in chunks:
+        if not started:
+            text = text.lstrip()
+            started = bool(text)
+        if text:
+            yield text
+
+
+# ---------------- GEMINI ----------------
+def _chunk_text(chunk):
+    try:
+        return chunk.text or ""
+    except Exception:
+        # Chunks without text parts (e.g. safety stops) raise on .text
+        return ""
+
+
+def _is_transient(error):
+    """Rate limits, overload and dropped connections are worth another try"""
+    if isinstance(error, (ConnectionError, TimeoutError)):
+        return True
+    try:
+        from google.api_core import exceptions
+    except ImportError:
+        return False
+    return isinstance(error, (
+        exceptions.TooManyRequests,
+        exceptions.ResourceExhausted,
+        exceptions.ServiceUnavailable,
+        exceptions.InternalServerError,
+        exceptions.DeadlineExceeded,
+    ))
+
+
+class GeminiProvider:
+    name = "gemini"
+
+    def __init__(self, model_name="models/gemini-2.5-flash", api_key=None,
+                 retries=3, backoff=0.5, max_backoff=8.0, model=None):
+        self.model_name = model_name
+        self.api_key = api_key
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self._model = model
+        self._lock = threading.Lock()
+
+    @property
+    def model(self):
+        """The GenerativeModel, created on first use and reused by every request"""
+        if self._model is None:
+            with self._lock:
+                if self._model is None:
+                    import google.generativeai as genai
+                    genai.configure(api_key=self.api_key)
+                    self._model = genai.GenerativeModel(self.model_name)
+        return self._model
+
+    def _delay(self, attempt):
+        # "Full jitter": spreads retries from many workers hitting the same limit
+        return random.uniform(0, min(self.max_backoff, self.backoff * 2 ** attempt))
+
+    def _should_retry(self, error, attempt):
+        if attempt >= self.retries or not _is_transient(error):
+            return False
+        print(f"[WARN] Gemini API: {error.__class__.__name__}, retrying ({attempt + 1}/{self.retries})")
+        return True
+
+    def generate(self, request):
+        attempt = 0
+        while True:
+            try:
+                res = self.model.generate_content(request.full_prompt)
+                return res.text.strip() if res and res.text else ""
+            except Exception as e:
+                if not self._should_retry(e, attempt):
+                    raise
+                time.sleep(self._delay(attempt))
+                attempt += 1
+
+    def stream(self, request):
+        # Only the start of a stream is retried; once text has been sent it cannot be taken back
+        attempt = 0
+        while True:
+            try:
+                chunks = iter(self.model.generate_content(request.full_prompt, stream=True))
+                first = next(chunks, None)
+                break
+            except Exception as e:
+                if not self._should_retry(e, attempt):
+                    raise
+                time.sleep(self._delay(attempt))
+                attempt += 1
+
+        if first is None:
+            return
+        yield _chunk_text(first)
+        for chunk in chunks:
+            yield _chunk_text(chunk)
+
+    async def agenerate(self, request):
+        attempt = 0
+        while True:
+            try:
+                res = await self.model.generate_content_async(request.full_prompt)
+                return res.text.strip() if res and res.text else ""
+            except Exception as e:
+                if not self._should_retry(e, attempt):
+                    raise
+                await asyncio.sleep(self._delay(attempt))
+                attempt += 1
+
+    async def astream(self, request):
+        attempt = 0
+        while True:
+            try:
+                response = await self.model.generate_content_async(request.full_prompt, stream=True)
+                chunks = response.__aiter__()
+                first = await chunks.__anext__()
+                break
+            except StopAsyncIteration:
+                return
+            except Exception as e:
+                if not self._should_retry(e, attempt):
+                    raise
+                await asyncio.sleep(self._delay(attempt))
+                attempt += 1
+
+        yield _chunk_text(first)
+        while True:
+            try:
+                chunk = await chunks.__anext__()
+            except StopAsyncIteration:
+                return
+            yield _chunk_text(chunk)
+
+
+# ---------------- OFFLINE STUB ----------------
+STUB_PARAGRAPHS = {
+    "en": (
+        "This is with reference to {topic}. In pursuance of the decision taken "
+        "by the competent authority, all officers and staff of BISAG-N are hereby "
+        "informed that the instructions contained herein shall come into force "
+        "with immediate effect.",
+        "Heads of divisions shall ensure strict compliance and bring this to the "
+        "notice of all concerned. Any deviation shall be reported to the "
+        "administration section without delay.",
+        "This issues with the approval of the competent authority.",
+    ),
+    "hi": (
+        "यह {topic} के संबंध में है। सक्षम प्राधिकारी द्वारा लिए गए निर्णय के "
+        "अनुसरण में, बायसेग-एन के सभी अधिकारियों एवं कर्मचारियों को सूचित किया "
+        "जाता है कि इसमें निहित निर्देश तत्काल प्रभाव से लागू होंगे।",
+        "सभी प्रभाग प्रमुख इनका कड़ाई से अनुपालन सुनिश्चित करेंगे तथा इसे सभी "
+        "संबंधितों के ध्यान में लाएंगे।",
+        "यह सक्षम प्राधिकारी के अनुमोदन से जारी किया जाता है।",
+    ),
+}
+
+
+class StubProvider:
+    """Deterministic drafts built from the request, no network involved"""
+
+    name = "stub"
+
+    def __init__(self, latency=0.0, chunk_delay=0.0):
+        self.latency = latency
+        self.chunk_delay = chunk_delay
+
+    def compose(self, request):
+        topic = request.prompt.strip().rstrip(".।") or "the subject"
+        if request.field == "title":
+            return f"{topic} नीति" if request.lang == "hi" else f"Policy on {topic.title()}"
+
+        # Same request, same length: 2 or 3 paragraphs picked from the digest
+        digest = hashlib.sha256(request.full_prompt.encode("utf-8")).digest()
+        paragraphs = STUB_PARAGRAPHS[request.lang][:2 + digest[0] % 2]
+        return "\n\n".join(paragraphs).format(topic=topic)
+
+    def chunks(self, request):
+        words = self.compose(request).split(" ")
+        return [word + " " for word in words[:-1]] + words[-1:]
+
+    def generate(self, request):
+        time.sleep(self.latency)
+        return self.compose(request)
+
+    def stream(self, request):
+        time.sleep(self.latency)
+        for text in self.chunks(request):
+            time.sleep(self.chunk_delay)
+            yield text
+
+    async def agenerate(self, request):
+        await asyncio.sleep(self.latency)
+        return self.compose(request)
+
+    async def astream(self, request):
+        await asyncio.sleep(self.latency)
+        for text in self.chunks(request):
+            await asyncio.sleep(self.chunk_delay)
+            yield text
+
+
+# ---------------- PROVIDER SELECTION ----------------
+_provider = None
+_provider_lock = threading.Lock()
+
+
+def build_provider(name=None):
+    name = name or getattr(settings, "AI_PROVIDER", "gemini")
+    if name == "gemini":
+        return GeminiProvider(
+            model_name=getattr(settings, "AI_MODEL", "models/gemini-2.5-flash"),
+            api_key=settings.GEMINI_API_KEY,
+            retries=getattr(settings, "AI_RETRIES", 3),
+        )
+    if name == "stub":
+        return StubProvider(latency=getattr(settings, "AI_STUB_LATENCY", 0.0))
+    raise ValueError(f"Unknown AI provider: {name}")
+
+
+def get_provider():
+    global _provider
+    if _provider is None:
+        with _provider_lock:
+            if _provider is None:
+                _provider = build_provider()
+    return _provider
+
+
+def reset_provider():
+    global _provider
+    with _provider_lock:
+        _provider = None
+
+
+@receiver(setting_changed)
+def _settings_changed(setting, **kwargs):
+    if setting in ("AI_PROVIDER", "AI_MODEL", "AI_RETRIES", "AI_STUB_LATENCY", "GEMINI_API_KEY"):
+        reset_provider()
+
+
+# ---------------- DRAFTING ----------------
+# Each call returns the reply with the draft cache outcome ("hit" / "miss").
+# regenerate=True skips the lookup and overwrites the saved draft.
+
+def draft(doc_type, field, lang, prompt, regenerate=False):
+    request = DraftRequest(doc_type, field, lang, prompt)
+    key = request.cache_key
+    if not regenerate:
+        cached = draft_cache.lookup(key)
+        if cached is not None:
+            return cached, "hit"
+
+    with metrics.timer("llm_call", request.doc_type, request.lang):
+        text = get_provider().generate(request)
+    draft_cache.store(key, text)
+    return text, "miss"
+
+
+def stream_draft(doc_type, field, lang, prompt, regenerate=False):
+    """Reply as an iterator of text chunks; cached once the stream completes"""
+    request = DraftRequest(doc_type, field, lang, prompt)
+    key = request.cache_key
+    if not regenerate:
+        cached = draft_cache.lookup(key)
+        if cached is not None:
+            return iter([cached]), "hit"
+
+    def chunks():
+        parts = []
+        with metrics.timer("llm_call", request.doc_type, request.lang):
+            for text in _lstrip_first(get_provider().stream(request)):
+                parts.append(text)
+                yield text
+        draft_cache.store(key, "".join(parts).strip())
+
+    return chunks(), "miss"
+
+
+async def adraft(doc_type, field, lang, prompt, regenerate=False):
+    request = DraftRequest(doc_type, field, lang, prompt)
+    key = request.cache_key
+    if not regenerate:
+        cached = await draft_cache.alookup(key)
+        if cached is not None:
+            return cached, "hit"
+
+    with metrics.timer("llm_call", request.doc_type, request.lang):
+        text = await get_provider().agenerate(request)
+    await draft_cache.astore(key, text)
+    return text, "miss"
+
+
+async def astream_draft(doc_type, field, lang, prompt, regenerate=False):
+    request = DraftRequest(doc_type, field, lang, prompt)
+    key = request.cache_key
+    if not regenerate:
+        cached = await draft_cache.alookup(key)
+        if cached is not None:
+            async def replay():
+                yield cached
+            return replay(), "hit"
+
+    async def chunks():
+        parts = []
+        with metrics.timer("llm_call", request.doc_type, request.lang):
+            async for text in _alstrip_first(get_provider().astream(request)):
+                parts.append(text)
+                yield text
+        await draft_cache.astore(key, "".join(parts).strip())
+
+    return chunks(), "miss"
@@ -0,0 +1,286 @@
+"""
+Offline load generator: simulated office staff working through the
+document flows concurrently (`python manage.py load_test`).
+
+A server configuration is a mode and a worker layout, e.g. "wsgi:2x4":
+
+* wsgi:PxT  P worker processes, each serving T threads through Django's
+            WSGI handler (test Client), one simulated user per thread
+* asgi:PxT  P worker processes, each running T concurrent users on one
+            event loop through the ASGI handler (AsyncClient), with the
+            async drafting views, as asgi.py serves them
+
+Every user logs in once, then repeats a flow until the run ends: open the
+home page, draft a body (stub AI), preview it (result_*) and download the
+PDF and DOCX from the session (download_*_pdf / download_*_docx). Each
+request is timed under its URL name from generator/urls.py.
+
+Requests go straight into the handler, without sockets or an HTTP
+server, so the numbers are the application's capacity on this box.
+
+Worker processes are spawned fresh, so this module must not import
+models (or anything that does) at import time; see render_worker.py.
+"""
+
+import asyncio
+import os
+import random
+import threading
+import time
+from contextlib import contextmanager
+
+
+PASSWORD = "load-test-password"
+
+DOWNLOAD_URLS = {
+    "office_order": {"pdf": "download_pdf", "docx": "download_docx"},
+    "circular": {"pdf": "download_circular_pdf", "docx": "download_circular_docx"},
+    "policy": {"pdf": "download_policy_pdf", "docx": "download_policy_docx"},
+}
+
+
+def parse_config(value):
+    """"wsgi:2x4" -> ("wsgi", 2, 4)"""
+    mode, _, layout = value.partition(":")
+    processes, _, threads = layout.partition("x")
+    if mode not in ("wsgi", "asgi") or not processes.isdigit() or not threads.isdigit():
+        raise ValueError(f"Expected wsgi:PxT or asgi:PxT, got {value!r}")
+    if int(processes) < 1 or int(threads) < 1:
+        raise ValueError(f"Need at least one process and one thread: {value!r}")
+    return mode, int(processes), int(threads)
+
+
+def username(index):
+    return f"loadtest{index:04d}"
+
+
+# ---------------- RECORDING ----------------
+class Recorder:
+    """Latencies (ms) and error counts per URL name, shared by a worker's users"""
+
+    def __init__(self):
+        self.samples = {}
+        self.errors = {}
+        self.flows = 0
+        self._lock = threading.Lock()
+
+    def record(self, name, ms, ok):
+        with self._lock:
+            self.samples.setdefault(name, []).append(ms)
+            if not ok:
+                self.errors[name] = self.errors.get(name, 0) + 1
+
+    def flow_done(self):
+        with self._lock:
+            self.flows += 1
+
+
+# ---------------- FLOWS ----------------
+def flow_requests(doc_type, lang, options):
+    """(method, URL name, POST data) of one pass through a document"""
+    from django.urls import reverse
+    from . import benchmarks
+
+    requests = [
+        ("get", "home", None),
+        ("post", benchmarks.DRAFT_URLS[doc_type], benchmarks.draft_data(lang)),
+        ("post", benchmarks.RESULT_URLS[doc_type], benchmarks.form_data(
+            doc_type, lang, options["paragraphs"], options["recipients"])),
+    ]
+    requests += [("get", DOWNLOAD_URLS[doc_type][fmt], None) for fmt in options["formats"]]
+    return [(method, name, reverse(name), data) for method, name, data in requests]
+
+
+def pick_document(rng, options):
+    return rng.choice(options["types"]), rng.choice(options["langs"])
+
+
+def _think(rng, options):
+    return rng.uniform(0.5, 1.5) * options["think"] if options["think"] else 0
+
+
+def run_user_sync(index, deadline, options, recorder):
+    from django.test import Client
+    from django.urls import reverse
+
+    rng = random.Random(index)
+    client = Client()
+
+    start = time.perf_counter()
+    response = client.post(reverse("login"), {"username": username(index), "password": PASSWORD})
+    recorder.record("login", (time.perf_counter() - start) * 1000, response.status_code == 302)
+
+    while True:  # at least one flow per user
+        doc_type, lang = pick_document(rng, options)
+        for method, name, url, data in flow_requests(doc_type, lang, options):
+            start = time.perf_counter()
+            try:
+                response = getattr(client, method)(url, data)
+                ok = response.status_code == 200
+            except Exception as e:
+                print(f"[ERROR] Load test {name}: {e}")
+                ok = False
+            recorder.record(name, (time.perf_counter() - start) * 1000, ok)
+            time.sleep(_think(rng, options))
+        recorder.flow_done()
+        if time.monotonic() >= deadline:
+            break
+
+
+async def run_user_async(index, deadline, options, recorder):
+    from django.test import AsyncClient
+    from django.urls import reverse
+
+    rng = random.Random(index)
+    client = AsyncClient()
+
+    start = time.perf_counter()
+    response = await client.post(reverse("login"), {"username": username(index), "password": PASSWORD})
+    recorder.record("login", (time.perf_counter() - start) * 1000, response.status_code == 302)
+
+    while True:  # at least one flow per user
+        doc_type, lang = pick_document(rng, options)
+        for method, name, url, data in flow_requests(doc_type, lang, options):
+            start = time.perf_counter()
+            try:
+                response = await getattr(client, method)(url, data)
+                ok = response.status_code == 200
+            except Exception as e:
+                print(f"[ERROR] Load test {name}: {e}")
+                ok = False
+            recorder.record(name, (time.perf_counter() - start) * 1000, ok)
+            await asyncio.sleep(_think(rng, options))
+        recorder.flow_done()
+        if time.monotonic() >= deadline:
+            break
+
+
+# ---------------- THROWAWAY DATABASE ----------------
+def database_name(workdir, label="load"):
+    """
+    A test database name of this run's own, never the configured TEST NAME,
+    which a `manage.py test` run may be using at the same time.
+    """
+    from django.db import connection
+
+    if connection.vendor == "sqlite":
+        # Worker processes must share it, so a file rather than in memory
+        return os.path.join(workdir, f"{label}.sqlite3")
+    return f"test_{label}_{os.getpid()}"
+
+
+@contextmanager
+def throwaway_database(workdir, label="load"):
+    """Create a database named by database_name() and yield its name; destroyed on exit"""
+    from django.db import connection
+
+    test_settings = connection.settings_dict.setdefault("TEST", {})
+    configured_name = test_settings.get("NAME")
+    test_settings["NAME"] = database_name(workdir, label)
+    try:
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True)
+        try:
+            yield connection.settings_dict["NAME"]
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+    finally:
+        test_settings["NAME"] = configured_name
+
+
+# ---------------- WORKER PROCESSES ----------------
+def init_worker(settings_module, db_name, overrides):
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", settings_module)
+    import django
+    django.setup()
+
+    from django.conf import settings
+    from django.db import connections
+    from django.test.utils import override_settings
+
+    # The throwaway database the command created, not the configured one
+    settings.DATABASES["default"]["NAME"] = db_name
+    connections["default"].settings_dict["NAME"] = db_name
+    override_settings(**overrides).enable()
+
+
+def run_worker(mode, first_user, users, duration, options):
+    """
+    Drive `users` simulated users for `duration` seconds in this process.
+    Returns samples, errors, flows and the measured wall time.
+    """
+    from django.db import close_old_connections
+
+    # One untimed flow so template compilation and engine start-up are not measured
+    warm_up = Recorder()
+    warm_options = dict(options, think=0)
+    if mode == "wsgi":
+        run_user_sync(first_user, 0, warm_options, warm_up)
+    else:
+        asyncio.run(run_user_async(first_user, 0, warm_options, warm_up))
+
+    recorder = Recorder()
+    started = time.monotonic()
+    deadline = started + duration
+
+    if mode == "wsgi":
+        def user(index):
+            try:
+                run_user_sync(index, deadline, options, recorder)
+            finally:
+                close_old_connections()
+
+        threads = [threading.Thread(target=user, args=(first_user + i,)) for i in range(users)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    else:
+        async def all_users():
+            await asyncio.gather(*(
+                run_user_async(first_user + i, deadline, options, recorder) for i in range(users)
+            ))
+        asyncio.run(all_users())
+
+    return {
+        "samples": recorder.samples,
+        "errors": recorder.errors,
+        "flows": recorder.flows,
+        "seconds": time.monotonic() - started,
+    }
+
+
+# ---------------- REPORT ----------------
+def summarize(worker_results):
+    """Merge the workers' results: throughput and per URL name p50/p95/p99 (ms)"""
+    from .benchmarks import percentile
+
+    samples, errors = {}, {}
+    flows, throughput = 0, 0.0
+    for result in worker_results:
+        for name, values in result["samples"].items():
+            samples.setdefault(name, []).extend(values)
+        for name, count in result["errors"].items():
+            errors[name] = errors.get(name, 0) + count
+        flows += result["flows"]
+        requests = sum(len(v) for n, v in result["samples"].items() if n != "login")
+        throughput += requests / result["seconds"]
+
+    urls = {
+        name: {
+            "requests": len(values),
+            "errors": errors.get(name, 0),
+            "p50_ms": round(percentile(values, 50), 1),
+            "p95_ms": round(percentile(values, 95), 1),
+            "p99_ms": round(percentile(values, 99), 1),
+        }
+        for name, values in sorted(samples.items())
+    }
+    flow_samples = [ms for name, values in samples.items() if name != "login" for ms in values]
+    return {
+        "requests_per_second": round(throughput, 2),
+        "flows": flows,
+        "requests": len(flow_samples),
+        "errors": sum(errors.values()),
+        "p95_ms": round(percentile(flow_samples, 95), 1) if flow_samples else None,
+        "urls": urls,
+    }
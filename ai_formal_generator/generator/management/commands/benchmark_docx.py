@@ -0,0 +1,71 @@
+"""
+Compare per-document DOCX cost before and after the skeleton engine.
+
+"before" lays every document out from a blank Document() (margins, header,
+logo, titles, labels, styling), which is what the download views used to do;
+"after" loads the in-memory skeleton for the layout and only fills in the
+placeholders. Peak traced allocations are reported per document as well.
+
+    python manage.py benchmark_docx --iterations 20 --type circular
+"""
+
+import statistics
+import time
+import tracemalloc
+
+from django.core.management.base import BaseCommand
+
+from generator import document_model
+from generator.docx_engine import engine
+from generator.samples import DOC_TYPES, LANGUAGES, sample_context
+
+
+def time_renders(model, cached, iterations):
+    timings = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        engine.render(model, cached=cached)
+        timings.append((time.perf_counter() - start) * 1000)
+    return timings
+
+
+def peak_kb(model, cached):
+    tracemalloc.start()
+    try:
+        engine.render(model, cached=cached)
+        return tracemalloc.get_traced_memory()[1] / 1024
+    finally:
+        tracemalloc.stop()
+
+
+class Command(BaseCommand):
+    help = "Benchmark DOCX building with and without cached skeletons"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--iterations", type=int, default=20)
+        parser.add_argument("--type", choices=DOC_TYPES, action="append", dest="types")
+        parser.add_argument("--lang", choices=LANGUAGES, action="append", dest="langs")
+        parser.add_argument("--paragraphs", type=int, default=3)
+
+    def handle(self, *args, **options):
+        iterations = options["iterations"]
+
+        self.stdout.write(
+            f"{'document':<14}{'lang':<6}{'before ms':>12}{'after ms':>12}{'speedup':>10}"
+            f"{'before KB':>12}{'after KB':>12}"
+        )
+        for doc_type in options["types"] or DOC_TYPES:
+            for lang in options["langs"] or LANGUAGES:
+                model = document_model.build(doc_type, sample_context(doc_type, lang, paragraphs=options["paragraphs"]))
+
+                # One untimed render each so imports and the skeleton build are not measured
+                engine.render(model, cached=False)
+                engine.render(model)
+
+                before = statistics.median(time_renders(model, False, iterations))
+                after = statistics.median(time_renders(model, True, iterations))
+
+                self.stdout.write(
+                    f"{doc_type:<14}{lang:<6}{before:>12.1f}{after:>12.1f}{before / after:>9.2f}x"
+                    f"{peak_kb(model, False):>12.0f}{peak_kb(model, True):>12.0f}"
+                )
@@ -0,0 +1,116 @@
+"""
+Seed synthetic issued documents and benchmark the document history.
+
+Inserts --single documents one save() at a time (what a result_* view does)
+and --documents more with bulk_create (what batch generation does), reports
+rows per second for both, then times the history queries the /history/ page
+runs against the seeded table.
+
+    python manage.py benchmark_history --documents 200000 --single 2000
+    python manage.py benchmark_history --documents 0 --queries 50   # query timings only
+    python manage.py benchmark_history --clear
+
+Seeded rows belong to the "history-benchmark" user, so --clear (or deleting
+that user) removes them again.
+"""
+
+import itertools
+import statistics
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db.models.functions import Substr
+
+from generator import history
+from generator.models import DocumentLog
+from generator.samples import TOPICS, sample_documents
+
+
+SEED_USER = "history-benchmark"
+
+
+def chunks(documents, n, size=5000):
+    """The next n documents, in lists of at most size"""
+    while n > 0:
+        chunk = list(itertools.islice(documents, min(n, size)))
+        n -= len(chunk)
+        yield chunk
+
+
+def history_page(queryset, cursor=None):
+    """What the history view fetches for one page"""
+    documents = queryset.defer("body", "to_recipients", "payload").annotate(excerpt=Substr("body", 1, 200))
+    return history.page(documents, cursor)
+
+
+class Command(BaseCommand):
+    help = "Seed synthetic DocumentLog rows and benchmark inserts and history queries"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--documents", type=int, default=10000, help="Rows to add with bulk_create")
+        parser.add_argument("--single", type=int, default=500, help="Rows to add with one save() each")
+        parser.add_argument("--queries", type=int, default=20, help="Runs per query timing")
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument("--clear", action="store_true", help="Delete the seeded rows and exit")
+
+    def handle(self, *args, **options):
+        user, _ = User.objects.get_or_create(username=SEED_USER)
+        if options["clear"]:
+            deleted, _ = DocumentLog.objects.filter(user=user).delete()
+            self.stdout.write(f"Deleted {deleted} seeded documents")
+            return
+
+        documents = sample_documents(options["single"] + options["documents"], seed=options["seed"])
+
+        # Documents are generated a chunk at a time outside the timed inserts
+        if options["single"]:
+            seconds = 0
+            for chunk in chunks(documents, options["single"]):
+                start = time.perf_counter()
+                for doc_type, data in chunk:
+                    history.record(doc_type, data, user)
+                seconds += time.perf_counter() - start
+            self.report_insert("save()", options["single"], seconds)
+
+        if options["documents"]:
+            seconds = 0
+            for chunk in chunks(documents, options["documents"]):
+                start = time.perf_counter()
+                history.record_many(chunk, user)
+                seconds += time.perf_counter() - start
+            self.report_insert("bulk_create", options["documents"], seconds)
+
+        total = DocumentLog.objects.count()
+        if not total:
+            return
+        self.stdout.write(f"\n{total} documents in the history; median of {options['queries']} runs:")
+        for label, query in self.queries(user):
+            timings = []
+            for _ in range(options["queries"]):
+                start = time.perf_counter()
+                query()
+                timings.append((time.perf_counter() - start) * 1000)
+            self.stdout.write(f"  {label:<34}{statistics.median(timings):>9.2f} ms")
+
+    def report_insert(self, label, n, seconds):
+        self.stdout.write(f"{label:<12}{n:>9} rows {seconds:>8.2f}s {n / seconds:>10.0f} rows/s")
+
+    def queries(self, user):
+        everything = DocumentLog.objects.all()
+        mine = DocumentLog.objects.filter(user=user)
+        middle = everything.order_by("-created_at", "-id")[everything.count() // 2]
+        reference = mine.order_by("-id").values_list("reference_id", flat=True).first() or ""
+
+        return [
+            ("latest page", lambda: history_page(everything)),
+            ("page half way down", lambda: history_page(everything, history.cursor_for(middle))),
+            ("latest circulars", lambda: history_page(everything.filter(document_type="Circular"))),
+            ("one user's latest", lambda: history_page(mine)),
+            ("one user's, half way down", lambda: history_page(mine, history.cursor_for(middle))),
+            ("reference number", lambda: history_page(history.search(everything, reference))),
+            ("search one word", lambda: history_page(history.search(everything, TOPICS["en"][0]))),
+            ("search two words", lambda: history_page(history.search(everything, " ".join(TOPICS["en"][:2])))),
+            ("search Hindi word", lambda: history_page(history.search(everything, TOPICS["hi"][3]))),
+            ("search, no match", lambda: history_page(history.search(everything, "zzyzx"))),
+        ]
@@ -0,0 +1,101 @@
+"""
+Compare per-render PDF cost before and after the shared render engine.
+
+"before" re-parses the stylesheets and builds a fresh FontConfiguration for
+every document (what the download views used to do); "after" renders through
+generator.pdf_engine, which parses both once on first use.
+
+--threads N also renders through the engine from N threads at once and
+reports the wall-clock cost per document; with renders no longer queued
+behind one lock it drops below "after" on a multi-core machine.
+
+    python manage.py benchmark_pdf --iterations 10 --lang hi
+    python manage.py benchmark_pdf --threads 4
+"""
+
+import os
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.template.loader import render_to_string
+
+from generator import document_model, pdf_engine
+from generator.samples import DOC_TYPES, LANGUAGES, PDF_TEMPLATES, sample_context
+
+
+def render_legacy(template_name, context):
+    from weasyprint import HTML, CSS
+    from weasyprint.text.fonts import FontConfiguration
+
+    css_name, options = pdf_engine.PDF_TEMPLATES[template_name]
+    font_config = FontConfiguration()
+    stylesheets = [
+        CSS(filename=os.path.join(pdf_engine.STYLES_DIR, name), font_config=font_config)
+        for name in (pdf_engine.FONTS_CSS, css_name)
+    ]
+    html = render_to_string(template_name, context)
+    return HTML(string=html, base_url=settings.BASE_DIR).write_pdf(
+        stylesheets=stylesheets, font_config=font_config, **options
+    )
+
+
+def time_renders(render, template_name, context, iterations):
+    timings = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        render(template_name, context)
+        timings.append((time.perf_counter() - start) * 1000)
+    return timings
+
+
+def time_concurrent(render, template_name, context, iterations, threads):
+    """Wall-clock ms per document with threads rendering iterations documents each"""
+    count = iterations * threads
+    with ThreadPoolExecutor(threads) as executor:
+        start = time.perf_counter()
+        list(executor.map(lambda _: render(template_name, context), range(count)))
+        return (time.perf_counter() - start) * 1000 / count
+
+
+class Command(BaseCommand):
+    help = "Benchmark PDF rendering with and without the shared render engine"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--iterations", type=int, default=5)
+        parser.add_argument("--type", choices=DOC_TYPES, action="append", dest="types")
+        parser.add_argument("--lang", choices=LANGUAGES, action="append", dest="langs")
+        parser.add_argument("--paragraphs", type=int, default=3)
+        parser.add_argument("--threads", type=int, default=1, help="Also time this many concurrent renders")
+
+    def handle(self, *args, **options):
+        iterations = options["iterations"]
+        threads = options["threads"]
+
+        concurrent_column = f"{f'x{threads} ms':>12}" if threads > 1 else ""
+        self.stdout.write(
+            f"{'document':<14}{'lang':<6}{'before ms':>12}{'after ms':>12}{'speedup':>10}{concurrent_column}"
+        )
+        for doc_type in options["types"] or DOC_TYPES:
+            for lang in options["langs"] or LANGUAGES:
+                template_name = PDF_TEMPLATES[doc_type]
+                data = sample_context(doc_type, lang, paragraphs=options["paragraphs"])
+                context = {"document": document_model.build(doc_type, data)}
+
+                # One untimed render each so template compilation is not measured
+                render_legacy(template_name, context)
+                pdf_engine.render_pdf(template_name, context)
+
+                before = statistics.median(time_renders(render_legacy, template_name, context, iterations))
+                after = statistics.median(time_renders(pdf_engine.render_pdf, template_name, context, iterations))
+
+                concurrent = ""
+                if threads > 1:
+                    per_document = time_concurrent(pdf_engine.render_pdf, template_name, context, iterations, threads)
+                    concurrent = f"{per_document:>12.1f}"
+
+                self.stdout.write(
+                    f"{doc_type:<14}{lang:<6}{before:>12.1f}{after:>12.1f}{before / after:>9.2f}x{concurrent}"
+                )
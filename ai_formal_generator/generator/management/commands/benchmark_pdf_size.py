@@ -0,0 +1,59 @@
+"""
+Measure PDF sizes with whole fonts embedded and with glyph subsets.
+
+"full"   embeds the complete bundled font files (full_fonts, hinting)
+"subset" is what downloads use: only the glyphs each document needs,
+         without hinting (pdf_engine.FONT_OPTIONS)
+
+    python manage.py benchmark_pdf_size --paragraphs 5 --out /tmp/pdfs
+"""
+
+import os
+
+from django.core.management.base import BaseCommand
+
+from generator import document_model, pdf_engine
+from generator.samples import DOC_TYPES, LANGUAGES, PDF_TEMPLATES, sample_context
+
+
+MODES = {
+    "full": {"full_fonts": True, "hinting": True},
+    "subset": {},
+}
+
+
+class Command(BaseCommand):
+    help = "Compare PDF sizes with full and subset embedded fonts"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--paragraphs", type=int, default=3)
+        parser.add_argument("--out", help="Directory to write the rendered PDFs to")
+
+    def handle(self, *args, **options):
+        engine = pdf_engine.get_engine()
+        if options["out"]:
+            os.makedirs(options["out"], exist_ok=True)
+
+        totals = dict.fromkeys(MODES, 0)
+        self.stdout.write(f"{'document':<14}{'lang':<6}{'full KB':>10}{'subset KB':>11}{'saved':>8}")
+        for doc_type in DOC_TYPES:
+            for lang in LANGUAGES:
+                data = sample_context(doc_type, lang, paragraphs=options["paragraphs"])
+                context = {"document": document_model.build(doc_type, data)}
+                sizes = {}
+                for mode, overrides in MODES.items():
+                    pdf = engine.render(PDF_TEMPLATES[doc_type], context, **overrides)
+                    sizes[mode] = len(pdf)
+                    totals[mode] += len(pdf)
+                    if options["out"]:
+                        with open(os.path.join(options["out"], f"{doc_type}_{lang}_{mode}.pdf"), "wb") as f:
+                            f.write(pdf)
+                self.report(doc_type, lang, sizes)
+        self.report("total", "", totals)
+        pdf_engine.release(engine)
+
+    def report(self, label, lang, sizes):
+        full, subset = sizes["full"], sizes["subset"]
+        self.stdout.write(
+            f"{label:<14}{lang:<6}{full / 1024:>10.1f}{subset / 1024:>11.1f}{1 - subset / full:>8.0%}"
+        )
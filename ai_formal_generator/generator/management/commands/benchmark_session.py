@@ -0,0 +1,118 @@
+"""
+Measure what keeping documents in the session costs per request.
+
+Builds the session of a user who has issued an office order, a circular and
+a policy, once holding the three documents themselves (what the result_*
+views used to do) and once holding only their public ids, and reports for
+both the session row size, the time to load and save it (every request with
+a session loads it; requests that change it save it), and the queries and
+bytes a download needs to get its document.
+
+    python manage.py benchmark_session --paragraphs 6 --recipients 20
+"""
+
+import json
+import random
+import statistics
+import time
+from importlib import import_module
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from generator import history, renderers
+from generator.models import UnicodeJSONEncoder
+from generator.samples import DOC_TYPES, PARAGRAPHS, sample_context
+
+
+def varied_body(lang, paragraphs, rng):
+    """Sample paragraphs with shuffled words; repeated ones would compress away in the signed session"""
+    words = PARAGRAPHS[lang].split()
+    return "\n\n".join(" ".join(rng.sample(words, len(words))) for _ in range(paragraphs))
+
+
+def median_ms(action, iterations):
+    timings = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        action()
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings)
+
+
+class Command(BaseCommand):
+    help = "Compare session size and per-request DB I/O with documents in and out of the session"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--paragraphs", type=int, default=5)
+        parser.add_argument("--recipients", type=int, default=10)
+        parser.add_argument("--lang", choices=("en", "hi"), default="hi")
+        parser.add_argument("--iterations", type=int, default=200)
+
+    def handle(self, *args, **options):
+        store = import_module(settings.SESSION_ENGINE).SessionStore
+        rng = random.Random(0)
+        documents = {}
+        for doc_type in DOC_TYPES:
+            data = sample_context(doc_type, options["lang"], recipients=options["recipients"])
+            data["body"] = varied_body(options["lang"], options["paragraphs"], rng)
+            documents[doc_type] = data
+        entries = {doc_type: history.record(doc_type, data) for doc_type, data in documents.items()}
+        key = lambda doc_type: renderers.DOCUMENTS[doc_type]["session_key"]
+
+        modes = {
+            "before": {key(doc_type): data for doc_type, data in documents.items()},
+            "after": {key(doc_type): entry.public_id for doc_type, entry in entries.items()},
+        }
+        results = {}
+        try:
+            for mode, values in modes.items():
+                session = store()
+                session.update(values)
+                session.update({"_auth_user_id": "1", "_auth_user_backend": "django.contrib.auth.backends.ModelBackend"})
+                session.save()
+                results[mode] = self.measure(store, session, options["iterations"])
+                session.delete()
+        finally:
+            for entry in entries.values():
+                entry.delete()
+
+        self.stdout.write(f"{'':<34}{'before':>12}{'after':>12}")
+        for label in results["before"]:
+            before, after = results["before"][label], results["after"][label]
+            number = "{:>12,.2f}" if label.endswith("(ms)") else "{:>12,}"
+            self.stdout.write(f"{label:<34}{number.format(before)}{number.format(after)}")
+
+    def measure(self, store, session, iterations):
+        session_key = session.session_key
+        row_bytes = len(session.encode(session._session))
+
+        def load():
+            return store(session_key).load()
+
+        def save():
+            current = store(session_key)
+            current.load()
+            current.modified = True
+            current.save()
+
+        def fetch_document():
+            # What download_artifact needs: the session, then (now) the stored payload
+            value = load()[renderers.DOCUMENTS["policy"]["session_key"]]
+            return value if isinstance(value, dict) else history.load(value, "policy")[1]
+
+        with CaptureQueriesContext(connection) as queries:
+            data = fetch_document()
+        stored = not isinstance(session.get("policy_data"), dict)
+        payload_bytes = len(json.dumps(data, cls=UnicodeJSONEncoder).encode()) if stored else 0
+
+        return {
+            "session row (bytes)": row_bytes,
+            "session load (ms)": median_ms(load, iterations),
+            "session save (ms)": median_ms(save, iterations),
+            "download: queries": len(queries),
+            "download: bytes read": row_bytes + payload_bytes,
+            "download: document fetch (ms)": median_ms(fetch_document, iterations),
+        }
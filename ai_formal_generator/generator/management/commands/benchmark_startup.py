@@ -0,0 +1,107 @@
+"""
+Measure cold start cost of the web app: import time and peak RSS.
+
+Each run is a fresh interpreter that sets Django up and loads the URLconf
+(which imports generator.views), as a worker does on boot.
+
+"lazy"  is that and nothing more - what boots cost now.
+"eager" additionally loads what the old import chain pulled in up front:
+        WeasyPrint with the PDF engine, python-docx, and a configured
+        Gemini model.
+
+    python manage.py benchmark_startup --runs 7
+"""
+
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+
+PROBE = """
+import json, os, sys, time
+start = time.perf_counter()
+
+import django
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", {settings_module!r})
+django.setup()
+from django.urls import get_resolver
+get_resolver().url_patterns
+
+skipped = []
+if {eager!r}:
+    from generator import llm, pdf_engine
+    loaders = {{
+        "weasyprint": pdf_engine.get_engine,
+        "docx": lambda: __import__("docx"),
+        "gemini": lambda: llm.build_provider("gemini").model,
+    }}
+    for name, load in loaders.items():
+        try:
+            load()
+        except Exception as e:
+            skipped.append(f"{{name}}: {{e.__class__.__name__}}")
+
+seconds = time.perf_counter() - start
+try:
+    import resource
+    rss_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform == "darwin":
+        rss_kb //= 1024  # reported in bytes there
+except ImportError:
+    rss_kb = None
+
+print(json.dumps({{"seconds": seconds, "rss_kb": rss_kb, "modules": len(sys.modules), "skipped": skipped}}))
+"""
+
+MODES = ("eager", "lazy")
+
+
+def run_probe(eager):
+    code = PROBE.format(
+        settings_module=os.environ.get("DJANGO_SETTINGS_MODULE", "ai_formal_generator.settings"),
+        eager=eager,
+    )
+    result = subprocess.run(
+        [sys.executable, "-W", "ignore", "-c", code],
+        cwd=settings.BASE_DIR, capture_output=True, text=True,
+    )
+    if result.returncode != 0:
+        raise CommandError(f"Startup probe failed:\n{result.stderr}")
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+class Command(BaseCommand):
+    help = "Benchmark cold import time and memory with eager vs lazy heavy dependencies"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--runs", type=int, default=5)
+        parser.add_argument("--json", action="store_true", help="Print raw results as JSON")
+
+    def handle(self, *args, **options):
+        results = {}
+        for mode in MODES:
+            samples = [run_probe(mode == "eager") for _ in range(options["runs"])]
+            rss = [s["rss_kb"] for s in samples if s["rss_kb"] is not None]
+            results[mode] = {
+                "median_ms": statistics.median(s["seconds"] for s in samples) * 1000,
+                "min_ms": min(s["seconds"] for s in samples) * 1000,
+                "rss_mb": statistics.median(rss) / 1024 if rss else None,
+                "modules": samples[-1]["modules"],
+                "skipped": samples[-1]["skipped"],
+            }
+
+        if options["json"]:
+            self.stdout.write(json.dumps(results, indent=2))
+            return
+
+        self.stdout.write(f"{'mode':<8}{'median ms':>12}{'min ms':>10}{'RSS MB':>10}{'modules':>10}")
+        for mode, r in results.items():
+            rss = f"{r['rss_mb']:.1f}" if r["rss_mb"] is not None else "n/a"
+            self.stdout.write(f"{mode:<8}{r['median_ms']:>12.1f}{r['min_ms']:>10.1f}{rss:>10}{r['modules']:>10}")
+            if r["skipped"]:
+                self.stdout.write(f"        not loaded: {', '.join(r['skipped'])}")
@@ -0,0 +1,95 @@
+"""
+End-to-end benchmark of every document type and language (generator/benchmarks.py).
+
+Runs offline against a throwaway database of its own (never the configured
+test database, which `manage.py test` may be using) with the stub AI
+provider, writes the results as JSON and compares them with a stored
+baseline: any step slower (or hungrier) than the baseline by more than
+--tolerance fails the command, and so does a missing baseline.
+
+    python manage.py benchmark_suite --paragraphs 1 10 --recipients 1 25 --output bench.json
+    python manage.py benchmark_suite --save-baseline          # on the reference machine
+    python manage.py benchmark_suite --steps submit docx      # without WeasyPrint
+
+The baseline defaults to benchmark_baseline.json next to manage.py.
+Baselines are only comparable on the machine they were recorded on, so
+none is committed: record one with --save-baseline first.
+"""
+
+import json
+import os
+import shutil
+import tempfile
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from generator import benchmarks, loadtest
+from generator.samples import DOC_TYPES, LANGUAGES
+
+
+class Command(BaseCommand):
+    help = "Benchmark form submit, PDF and DOCX download for every document type and language"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--type", choices=DOC_TYPES, action="append", dest="types")
+        parser.add_argument("--lang", choices=LANGUAGES, action="append", dest="langs")
+        parser.add_argument("--paragraphs", type=int, nargs="+", default=[3])
+        parser.add_argument("--recipients", type=int, nargs="+", default=[5])
+        parser.add_argument("--steps", nargs="+", choices=benchmarks.STEPS, default=list(benchmarks.STEPS))
+        parser.add_argument("--iterations", type=int, default=5)
+        parser.add_argument("--no-memory", action="store_true", help="Skip the traced memory pass")
+        parser.add_argument("--output", help="Write the results JSON here")
+        parser.add_argument("--baseline", default=os.path.join(settings.BASE_DIR, "benchmark_baseline.json"))
+        parser.add_argument("--save-baseline", action="store_true", help="Store these results as the baseline")
+        parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed slowdown, as a fraction")
+
+    def handle(self, *args, **options):
+        if not options["save_baseline"] and not os.path.exists(options["baseline"]):
+            raise CommandError(f"No baseline at {options['baseline']}; run with --save-baseline to record one")
+
+        case_list = benchmarks.cases(
+            options["types"] or DOC_TYPES, options["langs"] or LANGUAGES,
+            options["paragraphs"], options["recipients"],
+        )
+
+        self.stdout.write(f"{'case':<26}{'step':<8}{'median ms':>11}{'p95 ms':>10}{'peak KB':>10}")
+        workdir = tempfile.mkdtemp(prefix="benchmark_suite_")
+        try:
+            with loadtest.throwaway_database(workdir, "benchmark"):
+                report = benchmarks.run(
+                    case_list, options["steps"], options["iterations"],
+                    memory=not options["no_memory"], progress=self.report_case,
+                )
+        except benchmarks.BenchmarkError as e:
+            raise CommandError(str(e))
+        finally:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+        if options["output"]:
+            self.write_json(options["output"], report)
+            self.stdout.write(f"Results written to {options['output']}")
+
+        if options["save_baseline"]:
+            self.write_json(options["baseline"], report)
+            self.stdout.write(f"Baseline saved to {options['baseline']}")
+            return
+
+        with open(options["baseline"], encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = benchmarks.compare(report, baseline, options["tolerance"])
+        if regressions:
+            for line in regressions:
+                self.stderr.write(f"REGRESSION {line}")
+            raise CommandError(f"{len(regressions)} regression(s) against {options['baseline']}")
+        self.stdout.write(self.style.SUCCESS(f"No regressions against {options['baseline']}"))
+
+    def report_case(self, case, results):
+        for step, r in results.items():
+            peak = f"{r['peak_kb']:>10.1f}" if "peak_kb" in r else f"{'-':>10}"
+            self.stdout.write(f"{case.name:<26}{step:<8}{r['median_ms']:>11.1f}{r['p95_ms']:>10.1f}{peak}")
+
+    def write_json(self, path, report):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+            f.write("\n")
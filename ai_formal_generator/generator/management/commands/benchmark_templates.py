@@ -0,0 +1,71 @@
+"""
+Time the Django template render of the PDF templates (the HTML WeasyPrint
+lays out, not the PDF itself).
+
+"uncached"   loads and parses the template on every render and renders
+             every node (no cached loader, no fragments)
+"loader"     template parsed once by the cached loader, rendered in full
+"fragments"  cached loader plus the pre-rendered {% fragment %} blocks
+
+    python manage.py benchmark_templates --iterations 2000
+"""
+
+import statistics
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.template import Context, Engine, engines
+
+from generator import document_model
+from generator.samples import DOC_TYPES, LANGUAGES, PDF_TEMPLATES, sample_context
+from generator.templatetags import fragments
+
+
+def median_us(render, iterations):
+    render()  # first render fills the loader / fragment caches
+    timings = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        render()
+        timings.append((time.perf_counter() - start) * 1e6)
+    return statistics.median(timings)
+
+
+class Command(BaseCommand):
+    help = "Benchmark PDF template rendering with and without template and fragment caching"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--iterations", type=int, default=1000)
+        parser.add_argument("--recipients", type=int, default=10)
+
+    def handle(self, *args, **options):
+        cached = engines["django"].engine
+        uncached = Engine(
+            dirs=settings.TEMPLATES[0]["DIRS"],
+            loaders=[
+                "django.template.loaders.filesystem.Loader",
+                "django.template.loaders.app_directories.Loader",
+            ],
+            libraries={
+                "assets": "generator.templatetags.assets",
+                "fragments": "generator.templatetags.fragments",
+            },
+        )
+        iterations = options["iterations"]
+
+        self.stdout.write(
+            f"{'document':<14}{'lang':<6}{'uncached us':>13}{'loader us':>12}{'fragments us':>14}{'speedup':>10}"
+        )
+        for doc_type in DOC_TYPES:
+            template_name = PDF_TEMPLATES[doc_type]
+            for lang in LANGUAGES:
+                data = sample_context(doc_type, lang, recipients=options["recipients"])
+                context = {"document": document_model.build(doc_type, data)}
+                with fragments.disabled():
+                    slow = median_us(lambda: uncached.get_template(template_name).render(Context(context)), iterations)
+                    loader = median_us(lambda: cached.get_template(template_name).render(Context(context)), iterations)
+                fast = median_us(lambda: cached.get_template(template_name).render(Context(context)), iterations)
+                self.stdout.write(
+                    f"{doc_type:<14}{lang:<6}{slow:>13.1f}{loader:>12.1f}{fast:>14.1f}{slow / fast:>9.1f}x"
+                )
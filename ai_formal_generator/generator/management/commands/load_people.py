@@ -0,0 +1,46 @@
+"""
+Copy circular.json's people into the Person table.
+
+Ids are kept, so circulars already issued to a person still resolve once
+REGISTRY["PEOPLE_SOURCE"] is switched to "database". Re-running updates
+the rows in place; people edited since in the admin are overwritten.
+
+    python manage.py load_people
+"""
+
+import json
+import os
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.core.management.color import no_style
+from django.db import connection, transaction
+
+from generator.models import Person
+
+
+class Command(BaseCommand):
+    help = "Load circular.json people into the Person table (admin-editable recipients)"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--file", default=os.path.join(settings.BASE_DIR, "circular.json"))
+
+    def handle(self, *args, **options):
+        with open(options["file"], encoding="utf-8") as f:
+            people = json.load(f)["people"]
+
+        with transaction.atomic():
+            for position, person in enumerate(people):
+                Person.objects.update_or_create(id=person["id"], defaults={
+                    "name_en": person.get("name_en", ""),
+                    "name_hi": person.get("name_hi", ""),
+                    "designation_en": person.get("designation_en", ""),
+                    "designation_hi": person.get("designation_hi", ""),
+                    "position": position,
+                })
+            # Explicit ids leave PostgreSQL's sequence behind; new admin rows would clash
+            with connection.cursor() as cursor:
+                for sql in connection.ops.sequence_reset_sql(no_style(), [Person]):
+                    cursor.execute(sql)
+
+        self.stdout.write(f"Loaded {len(people)} people")
@@ -0,0 +1,139 @@
+"""
+Load-test the document flows with simulated concurrent staff (generator/loadtest.py).
+
+Each --config is run in turn against a throwaway database of its own (never
+the configured test database, which `manage.py test` may be using) and a
+temporary render cache, with the stub AI provider: worker processes are spawned, every simulated user logs
+in and repeats home -> draft -> preview -> PDF/DOCX downloads for
+--duration seconds. Reports throughput and p50/p95/p99 latency per URL
+name, then compares the configurations.
+
+    python manage.py load_test --config wsgi:1x4 --config wsgi:2x4 --config asgi:2x8 --duration 30
+    python manage.py load_test --formats docx --think 2 --ai-latency 1.5 --output load.json
+"""
+
+import json
+import multiprocessing
+import os
+import shutil
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from generator import loadtest
+from generator.samples import DOC_TYPES, LANGUAGES
+
+
+class Command(BaseCommand):
+    help = "Simulate concurrent users through the document flows and compare server configurations"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--config", action="append", dest="configs",
+                            help="wsgi:PxT or asgi:PxT (processes x threads/users per process); repeatable")
+        parser.add_argument("--duration", type=float, default=20, help="Seconds per configuration")
+        parser.add_argument("--formats", nargs="+", choices=("pdf", "docx"), default=["pdf", "docx"])
+        parser.add_argument("--type", choices=DOC_TYPES, action="append", dest="types")
+        parser.add_argument("--lang", choices=LANGUAGES, action="append", dest="langs")
+        parser.add_argument("--paragraphs", type=int, default=3)
+        parser.add_argument("--recipients", type=int, default=5)
+        parser.add_argument("--think", type=float, default=0, help="Mean pause between a user's requests (s)")
+        parser.add_argument("--ai-latency", type=float, default=0, help="Stub AI reply latency (s)")
+        parser.add_argument("--output", help="Write the report JSON here")
+
+    def handle(self, *args, **options):
+        try:
+            configs = [loadtest.parse_config(c) for c in options["configs"] or ["wsgi:1x4", "asgi:1x4"]]
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        flow_options = {
+            "types": options["types"] or list(DOC_TYPES),
+            "langs": options["langs"] or list(LANGUAGES),
+            "formats": options["formats"],
+            "paragraphs": options["paragraphs"],
+            "recipients": options["recipients"],
+            "think": options["think"],
+        }
+
+        workdir = tempfile.mkdtemp(prefix="load_test_")
+        cache_location = os.path.join(workdir, "render_cache")
+        report = {"duration": options["duration"], "options": flow_options, "configs": {}}
+        try:
+            with loadtest.throwaway_database(workdir) as db_name:
+                self.create_users(max(p * t for _, p, t in configs))
+                connection.close()
+                for mode, processes, threads in configs:
+                    label = f"{mode}:{processes}x{threads}"
+                    overrides = self.worker_overrides(mode, options, cache_location)
+                    summary = self.run_config(db_name, processes, threads, mode, overrides, options, flow_options)
+                    report["configs"][label] = summary
+                    self.report_config(label, processes * threads, summary)
+        finally:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+        self.report_comparison(report["configs"], configs)
+        if options["output"]:
+            with open(options["output"], "w", encoding="utf-8") as f:
+                json.dump(report, f, indent=2)
+                f.write("\n")
+            self.stdout.write(f"Report written to {options['output']}")
+
+    def create_users(self, count):
+        password = make_password(loadtest.PASSWORD)  # hashed once, shared by every user
+        User.objects.bulk_create(
+            [User(username=loadtest.username(i), password=password) for i in range(count)]
+        )
+
+    def worker_overrides(self, mode, options, cache_location):
+        """Settings of the worker processes: stub AI and a render cache that is not the real one"""
+        return {
+            "AI_PROVIDER": "stub",
+            "AI_STUB_LATENCY": options["ai_latency"],
+            "AI_ASYNC_VIEWS": mode == "asgi",
+            "ALLOWED_HOSTS": [*settings.ALLOWED_HOSTS, "testserver"],
+            "DEBUG": False,
+            "RENDER_CACHE": dict(getattr(settings, "RENDER_CACHE", {}), BACKEND="disk", LOCATION=cache_location),
+        }
+
+    def run_config(self, db_name, processes, threads, mode, overrides, options, flow_options):
+        executor = ProcessPoolExecutor(
+            max_workers=processes,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=loadtest.init_worker,
+            initargs=(os.environ["DJANGO_SETTINGS_MODULE"], db_name, overrides),
+        )
+        with executor:
+            futures = [
+                executor.submit(loadtest.run_worker, mode, i * threads, threads, options["duration"], flow_options)
+                for i in range(processes)
+            ]
+            return loadtest.summarize([future.result() for future in futures])
+
+    def report_config(self, label, users, summary):
+        self.stdout.write("")
+        self.stdout.write(self.style.MIGRATE_HEADING(
+            f"{label}  {users} users  {summary['requests_per_second']:.1f} req/s  "
+            f"{summary['flows']} flows  {summary['errors']} errors"
+        ))
+        self.stdout.write(f"{'url name':<26}{'requests':>10}{'errors':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+        for name, u in summary["urls"].items():
+            self.stdout.write(
+                f"{name:<26}{u['requests']:>10}{u['errors']:>8}{u['p50_ms']:>10.1f}{u['p95_ms']:>10.1f}{u['p99_ms']:>10.1f}"
+            )
+
+    def report_comparison(self, summaries, configs):
+        self.stdout.write("")
+        self.stdout.write(self.style.MIGRATE_HEADING("Comparison"))
+        self.stdout.write(f"{'config':<14}{'users':>7}{'req/s':>10}{'p95 ms':>10}{'errors':>8}")
+        for mode, processes, threads in configs:
+            label = f"{mode}:{processes}x{threads}"
+            s = summaries[label]
+            p95 = f"{s['p95_ms']:>10.1f}" if s["p95_ms"] is not None else f"{'-':>10}"
+            self.stdout.write(
+                f"{label:<14}{processes * threads:>7}{s['requests_per_second']:>10.1f}{p95}{s['errors']:>8}"
+            )
@@ -0,0 +1,18 @@
+"""
+Mint a signed header that makes ProfilingMiddleware profile a request,
+whatever the sample rate (valid for PROFILING["TOKEN_MAX_AGE"] seconds).
+
+    python manage.py profile_token
+    curl -H "X-Profile-Request: <token>" https://.../circular/pdf/
+"""
+
+from django.core.management.base import BaseCommand
+
+from generator import profiling
+
+
+class Command(BaseCommand):
+    help = "Print a signed X-Profile-Request header value for on-demand request profiling"
+
+    def handle(self, *args, **options):
+        self.stdout.write(f"{profiling.HEADER}: {profiling.make_token()}")
@@ -0,0 +1,210 @@
+"""
+Per-stage timing histograms, served as Prometheus text on /metrics.
+
+Each stage of producing a document is timed where it happens and counted
+into a histogram per (stage, document type, language):
+
+    session_read     loading the session's document (views.session_document)
+    template_render  Django template render of a PDF template
+    pdf_layout       WeasyPrint layout and pagination
+    pdf_write        WeasyPrint PDF serialisation
+    docx_build       python-docx fill of a skeleton (docx_engine)
+    html_render      HTML export (document_model)
+    llm_call         drafting provider call, draft cache hits excluded
+
+    with metrics.timer("pdf_layout"):
+        ...
+
+Stages below renderers.render_model() take the document type and language
+from metrics.document(), which render_model() enters; others pass them
+to timer(). With settings.METRICS["ENABLED"] off, timer() and document()
+return a shared no-op and nothing is recorded.
+
+Histograms are kept in process memory: each web worker serves its own,
+and renders done in render pool workers are not included. Labels are
+limited to the known stages, document types and languages (anything else
+is counted as "other"), so callers cannot grow the series without bound.
+"""
+
+import bisect
+import threading
+import time
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.dispatch import receiver
+from django.test.signals import setting_changed
+
+
+METRIC = "generator_stage_seconds"
+
+# Upper bounds (seconds) of the histogram buckets; +Inf is implied
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# Label values a series may carry; "" when not known, "other" when unexpected
+STAGES = frozenset((
+    "session_read", "template_render", "pdf_layout", "pdf_write", "docx_build", "html_render", "llm_call",
+))
+DOCUMENTS = frozenset(("office_order", "circular", "policy"))
+LANGUAGES = frozenset(("en", "hi"))
+
+
+def metrics_settings():
+    conf = getattr(settings, "METRICS", {})
+    return {
+        "ENABLED": conf.get("ENABLED", False),
+        "TOKEN": conf.get("TOKEN", ""),
+    }
+
+
+_enabled = None
+_labels = ContextVar("metrics_labels", default=(None, None))
+
+
+def enabled():
+    global _enabled
+    if _enabled is None:
+        _enabled = metrics_settings()["ENABLED"]
+    return _enabled
+
+
+@receiver(setting_changed)
+def _settings_changed(setting, **kwargs):
+    global _enabled
+    if setting == "METRICS":
+        _enabled = None
+
+
+# ---------------- HISTOGRAMS ----------------
+class Histogram:
+    """Observation counts per bucket (not cumulative; the last is +Inf), sum and count"""
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, seconds):
+        self.counts[bisect.bisect_left(BUCKETS, seconds)] += 1
+        self.sum += seconds
+        self.count += 1
+
+
+_histograms = {}
+_lock = threading.Lock()
+
+
+def _label(value, known):
+    if not value:
+        return ""
+    return value if value in known else "other"
+
+
+def observe(stage, document, language, seconds):
+    key = (_label(stage, STAGES), _label(document, DOCUMENTS), _label(language, LANGUAGES))
+    with _lock:
+        histogram = _histograms.get(key)
+        if histogram is None:
+            histogram = _histograms[key] = Histogram()
+        histogram.observe(seconds)
+
+
+def reset():
+    with _lock:
+        _histograms.clear()
+
+
+# ---------------- TIMERS ----------------
+class Timer:
+    """
+    Times its block into the stage's histogram. Labels not given fall back
+    to the enclosing document(); they may also be set inside the block
+    (timer.language = ...) when only known once the work is done.
+    """
+
+    def __init__(self, stage, document=None, language=None):
+        self.stage = stage
+        self.document = document
+        self.language = language
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        elapsed = time.perf_counter() - self.start
+        document, language = _labels.get()
+        observe(self.stage, self.document or document, self.language or language, elapsed)
+        return False
+
+
+class _Labels:
+    def __init__(self, document, language):
+        self.labels = (document, language)
+
+    def __enter__(self):
+        self.token = _labels.set(self.labels)
+        return self
+
+    def __exit__(self, *exc):
+        _labels.reset(self.token)
+        return False
+
+
+class _Noop:
+    """Stands in for Timer and document() while metrics are off"""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def __setattr__(self, name, value):
+        pass
+
+
+_NOOP = _Noop()
+
+
+def timer(stage, document=None, language=None):
+    if not enabled():
+        return _NOOP
+    return Timer(stage, document, language)
+
+
+def document(doc_type, language):
+    """Label the stages timed inside the block with a document type and language"""
+    if not enabled():
+        return _NOOP
+    return _Labels(doc_type, language)
+
+
+# ---------------- EXPOSITION ----------------
+def _escape(value):
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _number(value):
+    return repr(float(value))
+
+
+def exposition():
+    """All histograms in the Prometheus text format (version 0.0.4)"""
+    with _lock:
+        snapshot = sorted((key, list(h.counts), h.sum, h.count) for key, h in _histograms.items())
+
+    lines = [
+        f"# HELP {METRIC} Time spent in each stage of producing a document.",
+        f"# TYPE {METRIC} histogram",
+    ]
+    for (stage, document, language), counts, total, count in snapshot:
+        labels = f'stage="{_escape(stage)}",document="{_escape(document)}",language="{_escape(language)}"'
+        cumulative = 0
+        for bound, bucket_count in zip(BUCKETS + (None,), counts):
+            cumulative += bucket_count
+            le = "+Inf" if bound is None else _number(bound)
+            lines.append(f'{METRIC}_bucket{{{labels},le="{le}"}} {cumulative}')
+        lines.append(f"{METRIC}_sum{{{labels}}} {_number(total)}")
+        lines.append(f"{METRIC}_count{{{labels}}} {count}")
+    return "\n".join(lines) + "\n"
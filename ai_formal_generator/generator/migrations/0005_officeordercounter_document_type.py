@@ -0,0 +1,27 @@
+# Generated by Django 5.2.18 on 2026-10-18 16:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('generator', '0004_renderjob'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='officeordercounter',
+            name='document_type',
+            field=models.CharField(default='office_order', max_length=50),
+        ),
+        migrations.AlterField(
+            model_name='officeordercounter',
+            name='year',
+            field=models.IntegerField(),
+        ),
+        migrations.AddConstraint(
+            model_name='officeordercounter',
+            constraint=models.UniqueConstraint(fields=('document_type', 'year'), name='unique_counter_per_type_year'),
+        ),
+    ]
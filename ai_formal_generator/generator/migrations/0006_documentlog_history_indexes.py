@@ -0,0 +1,88 @@
+# Generated by Django 5.2.18 on 2026-10-18 17:05
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+# Full-text index over DocumentLog subject and body, queried by
+# generator/history.py. SQLite gets an FTS5 table over the log table kept in
+# step by triggers; PostgreSQL a GIN index on the same tsvector expression
+# history.search() uses. Note that SQLite drops the triggers whenever a later
+# migration rebuilds generator_documentlog (most AlterField / RemoveField
+# operations do), so such a migration must run create_search_index again.
+
+SQLITE_CREATE = [
+    """CREATE VIRTUAL TABLE generator_documentlog_fts USING fts5(
+        subject, body, content='generator_documentlog', content_rowid='id'
+    )""",
+    """CREATE TRIGGER generator_documentlog_fts_insert AFTER INSERT ON generator_documentlog BEGIN
+        INSERT INTO generator_documentlog_fts(rowid, subject, body) VALUES (new.id, new.subject, new.body);
+    END""",
+    """CREATE TRIGGER generator_documentlog_fts_delete AFTER DELETE ON generator_documentlog BEGIN
+        INSERT INTO generator_documentlog_fts(generator_documentlog_fts, rowid, subject, body)
+        VALUES ('delete', old.id, old.subject, old.body);
+    END""",
+    """CREATE TRIGGER generator_documentlog_fts_update AFTER UPDATE OF subject, body ON generator_documentlog BEGIN
+        INSERT INTO generator_documentlog_fts(generator_documentlog_fts, rowid, subject, body)
+        VALUES ('delete', old.id, old.subject, old.body);
+        INSERT INTO generator_documentlog_fts(rowid, subject, body) VALUES (new.id, new.subject, new.body);
+    END""",
+    "INSERT INTO generator_documentlog_fts(generator_documentlog_fts) VALUES ('rebuild')",
+]
+
+SQLITE_DROP = [
+    "DROP TRIGGER IF EXISTS generator_documentlog_fts_insert",
+    "DROP TRIGGER IF EXISTS generator_documentlog_fts_delete",
+    "DROP TRIGGER IF EXISTS generator_documentlog_fts_update",
+    "DROP TABLE IF EXISTS generator_documentlog_fts",
+]
+
+POSTGRES_CREATE = [
+    """CREATE INDEX documentlog_search ON generator_documentlog
+        USING GIN (to_tsvector('simple', subject || ' ' || body))""",
+]
+
+POSTGRES_DROP = [
+    "DROP INDEX IF EXISTS documentlog_search",
+]
+
+
+def create_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    statements = {"sqlite": SQLITE_DROP + SQLITE_CREATE, "postgresql": POSTGRES_DROP + POSTGRES_CREATE}
+    for sql in statements.get(vendor, []):
+        schema_editor.execute(sql)
+
+
+def drop_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    for sql in {"sqlite": SQLITE_DROP, "postgresql": POSTGRES_DROP}.get(vendor, []):
+        schema_editor.execute(sql)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('generator', '0005_officeordercounter_document_type'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='documentlog',
+            index=models.Index(fields=['created_at', 'id'], name='documentlog_created'),
+        ),
+        migrations.AddIndex(
+            model_name='documentlog',
+            index=models.Index(fields=['document_type', 'created_at', 'id'], name='documentlog_type_created'),
+        ),
+        migrations.AddIndex(
+            model_name='documentlog',
+            index=models.Index(fields=['user', 'created_at', 'id'], name='documentlog_user_created'),
+        ),
+        migrations.AddIndex(
+            model_name='documentlog',
+            index=models.Index(fields=['reference_id'], name='documentlog_reference'),
+        ),
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,53 @@
+# Generated by Django 5.2.18 on 2026-10-18 19:40
+
+from importlib import import_module
+
+from django.db import migrations, models
+
+import generator.models
+
+
+# Adding the unique column rebuilds generator_documentlog on SQLite, which
+# drops the full-text triggers from 0006; they are recreated at the end (and
+# at the start when unapplying, which rebuilds the table again).
+search_index = import_module("generator.migrations.0006_documentlog_history_indexes")
+
+
+def fill_public_ids(apps, schema_editor):
+    DocumentLog = apps.get_model("generator", "DocumentLog")
+    batch = []
+    for row in DocumentLog.objects.only("id").iterator(chunk_size=2000):
+        row.public_id = generator.models.new_public_id()
+        batch.append(row)
+        if len(batch) == 2000:
+            DocumentLog.objects.bulk_update(batch, ["public_id"])
+            batch = []
+    DocumentLog.objects.bulk_update(batch, ["public_id"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('generator', '0006_documentlog_history_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(migrations.RunPython.noop, search_index.create_search_index),
+        migrations.AddField(
+            model_name='documentlog',
+            name='payload',
+            field=models.JSONField(blank=True, default=dict, encoder=generator.models.UnicodeJSONEncoder),
+        ),
+        migrations.AddField(
+            model_name='documentlog',
+            name='public_id',
+            field=models.CharField(max_length=16, null=True),
+        ),
+        migrations.RunPython(fill_public_ids, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='documentlog',
+            name='public_id',
+            field=models.CharField(default=generator.models.new_public_id, editable=False, max_length=16, unique=True),
+        ),
+        migrations.RunPython(search_index.create_search_index, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.2.18 on 2026-10-18 21:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('generator', '0007_documentlog_payload_public_id'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Person',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name_en', models.CharField(max_length=200)),
+                ('name_hi', models.CharField(blank=True, default='', max_length=200)),
+                ('designation_en', models.CharField(max_length=200)),
+                ('designation_hi', models.CharField(blank=True, default='', max_length=200)),
+                ('position', models.PositiveIntegerField(default=0, help_text='Order in the recipient list')),
+                ('active', models.BooleanField(default=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name_plural': 'People',
+                'ordering': ['position', 'id'],
+            },
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.2.18 on 2026-10-19 10:05
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+# Jobs are short-lived and their payload cannot be matched back to a
+# stored document reliably, so the existing ones are dropped
+def delete_jobs(apps, schema_editor):
+    apps.get_model("generator", "RenderJob").objects.all().delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('generator', '0008_person'),
+    ]
+
+    operations = [
+        migrations.RunPython(delete_jobs, migrations.RunPython.noop),
+        migrations.RemoveField(
+            model_name='renderjob',
+            name='payload',
+        ),
+        migrations.AddField(
+            model_name='renderjob',
+            name='document',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='render_jobs', to='generator.documentlog', to_field='public_id'),
+        ),
+    ]
@@ -1,34 +1,176 @@
-from django.db import models
+import secrets
+import uuid
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import IntegrityError, models, transaction
+from django.db.models import F
+
+class UnicodeJSONEncoder(DjangoJSONEncoder):
+    """Stores Hindi text as UTF-8 rather than 6-byte \\uXXXX escapes"""
+
+    def __init__(self, *args, **kwargs):
+        kwargs["ensure_ascii"] = False
+        super().__init__(*args, **kwargs)
+
+
+def new_public_id():
+    """Short unguessable id a stored document is addressed by in URLs and sessions"""
+    return secrets.token_urlsafe(9)
+
 
 class DocumentLog(models.Model):
+    """An issued document, recorded by the result_* views and batch generation"""
     DOCUMENT_TYPES = [
         ("Office Order", "Office Order"),
         ("Notice", "Notice"),
         ("Circular", "Circular"),
+        ("Policy", "Policy"),
         ("Other", "Other"),
     ]
 
+    public_id = models.CharField(max_length=16, unique=True, default=new_public_id, editable=False)
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.CASCADE,
+        related_name="generated_documents", null=True, blank=True,
+    )
     document_type = models.CharField(max_length=50, choices=DOCUMENT_TYPES)
-    language = models.CharField(max_length=20)
-    reference_id = models.CharField(max_length=100)
-    content = models.TextField()
+    language = models.CharField(max_length=20, default="en")
+    reference_id = models.CharField(max_length=100, blank=True)
+    date_issued = models.CharField(max_length=50, blank=True, default="")
+    subject = models.TextField(blank=True, default="")
+    body = models.TextField(default="")
+    from_designation = models.CharField(max_length=200, blank=True, default="")
+    to_recipients = models.TextField(blank=True, default="")
+    # The document data the renderers work from (what used to live in the session)
+    payload = models.JSONField(default=dict, blank=True, encoder=UnicodeJSONEncoder)
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ["-created_at"]
+        verbose_name = "Generated Document"
+        verbose_name_plural = "Generated Documents"
+        # History pages are read newest first, (created_at, id) being the
+        # keyset, overall, per type and per user. Subject/body full-text
+        # search is a separate index created in migration 0006.
+        indexes = [
+            models.Index(fields=["created_at", "id"], name="documentlog_created"),
+            models.Index(fields=["document_type", "created_at", "id"], name="documentlog_type_created"),
+            models.Index(fields=["user", "created_at", "id"], name="documentlog_user_created"),
+            models.Index(fields=["reference_id"], name="documentlog_reference"),
+        ]
 
     def __str__(self):
         return f"{self.document_type} | {self.reference_id}"
 
 
 class OfficeOrderCounter(models.Model):
-    year = models.IntegerField(unique=True)
+    """Yearly reference number sequence, one per document type"""
+    document_type = models.CharField(max_length=50, default="office_order")
+    year = models.IntegerField()
     counter = models.IntegerField(default=0)
 
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["document_type", "year"], name="unique_counter_per_type_year"),
+        ]
+
     def __str__(self):
-        return f"Year {self.year}: {self.counter}"
+        return f"{self.document_type} {self.year}: {self.counter}"
     
     @classmethod
-    def get_next_number(cls, year):
+    def get_next_number(cls, year, document_type="office_order"):
         """Get next sequential number for given year"""
-        obj, created = cls.objects.get_or_create(year=year, defaults={'counter': 0})
-        obj.counter += 1
-        obj.save()
-        return obj.counter
+        return cls.reserve(year, 1, document_type)[0]
+
+    @classmethod
+    def reserve(cls, year, n, document_type="office_order"):
+        """
+        Reserve n consecutive numbers, returned as a range.
+
+        The increment is a single UPDATE ... SET counter = counter + n, so
+        concurrent callers queue on the row lock instead of overwriting each
+        other; the value read back in the same transaction is our own.
+        The first reservation of a year creates the row, and a creation race
+        falls back to the UPDATE.
+        """
+        rows = cls.objects.filter(document_type=document_type, year=year)
+        while True:
+            with transaction.atomic():
+                if rows.update(counter=F("counter") + n):
+                    end = rows.values_list("counter", flat=True).get()
+                    return range(end - n + 1, end + 1)
+            try:
+                with transaction.atomic():
+                    cls.objects.create(document_type=document_type, year=year, counter=n)
+                return range(1, n + 1)
+            except IntegrityError:
+                continue  # created by someone else in the meantime
+
+
+class Person(models.Model):
+    """
+    A circular recipient, edited in the admin.
+
+    Used instead of circular.json's "people" when REGISTRY["PEOPLE_SOURCE"]
+    is "database" (see generator/registry.py); load_people copies the file in.
+    """
+    name_en = models.CharField(max_length=200)
+    name_hi = models.CharField(max_length=200, blank=True, default="")
+    designation_en = models.CharField(max_length=200)
+    designation_hi = models.CharField(max_length=200, blank=True, default="")
+    position = models.PositiveIntegerField(default=0, help_text="Order in the recipient list")
+    active = models.BooleanField(default=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ["position", "id"]
+        verbose_name_plural = "People"
+
+    def __str__(self):
+        return f"{self.name_en} ({self.designation_en})"
+
+    def as_entry(self):
+        """The person as a circular.json "people" entry"""
+        return {
+            "id": self.id,
+            "name_en": self.name_en,
+            "name_hi": self.name_hi,
+            "designation_en": self.designation_en,
+            "designation_hi": self.designation_hi,
+        }
+
+
+class RenderJob(models.Model):
+    """
+    A PDF/DOCX render queued on the background worker pool, of a stored
+    document (by its public id; the data is not copied). Finished jobs are
+    pruned after RENDER_POOL["JOB_RETENTION"] seconds.
+    """
+    QUEUED = "queued"
+    RUNNING = "running"
+    DONE = "done"
+    FAILED = "failed"
+
+    STATUSES = [
+        (QUEUED, "Queued"),
+        (RUNNING, "Running"),
+        (DONE, "Done"),
+        (FAILED, "Failed"),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    document_type = models.CharField(max_length=50)
+    format = models.CharField(max_length=10)
+    status = models.CharField(max_length=10, choices=STATUSES, default=QUEUED)
+    cache_key = models.CharField(max_length=64)
+    document = models.ForeignKey(
+        DocumentLog, on_delete=models.CASCADE, to_field="public_id", related_name="render_jobs",
+    )
+    error = models.TextField(blank=True, default="")
+    created_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"{self.document_type} {self.format} | {self.status}"
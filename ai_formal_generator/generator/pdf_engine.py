@@ -0,0 +1,152 @@
+"""
+Shared WeasyPrint render engine.
+
+Each PDF template's stylesheet (generator/styles/*.css) is parsed once when
+the engine is created, and the bundled Noto Devanagari fonts are registered
+once on its FontConfiguration. Every render then reuses the parsed
+CSS and the loaded fonts instead of re-parsing and re-discovering them.
+Decoded images (the letterhead logo, see generator/assets.py) are kept in
+WeasyPrint's image cache across renders too.
+
+Pango font maps are not safe to share between threads mid-layout, so an
+engine is used by one render at a time: render_pdf() checks out an idle
+engine and creates another only when all of them are busy. Concurrent
+renders (a threaded server, the inline render path) each lay out with
+their own engine instead of queueing behind one lock; a process keeps as
+many engines as it has had renders at once.
+
+Layout and PDF serialisation are separate WeasyPrint calls, so each is
+timed as its own stage (generator/metrics.py).
+
+WeasyPrint itself is only imported when the engine is first needed
+(get_engine()), so processes that never render a PDF don't pay for it.
+"""
+
+import hashlib
+import os
+import threading
+
+from django.conf import settings
+from django.template.loader import render_to_string
+
+from . import metrics
+
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+STYLES_DIR = os.path.join(APP_DIR, "styles")
+FONTS_DIR = os.path.join(APP_DIR, "fonts")
+
+FONTS_CSS = "fonts.css"
+
+# Embed only the glyphs a document uses, without hinting instructions (the
+# WeasyPrint defaults, pinned here; benchmark_pdf_size measures the saving)
+FONT_OPTIONS = {
+    "full_fonts": False,
+    "hinting": False,
+}
+
+# template -> (stylesheet, write_pdf options)
+PDF_TEMPLATES = {
+    "generator/pdf_office_order.html": ("office_order.css", {}),
+    "generator/pdf_circular.html": ("circular.css", {
+        "optimize_images": True,
+        "jpeg_quality": 85,
+        "presentational_hints": True,
+    }),
+    "generator/pdf_policy.html": ("policy.css", {
+        "optimize_images": True,
+        "jpeg_quality": 85,
+        "presentational_hints": True,
+    }),
+}
+
+
+def _read_stylesheet(name):
+    with open(os.path.join(STYLES_DIR, name), "rb") as f:
+        return f.read()
+
+
+class PdfEngine:
+    """Parsed stylesheets and fonts, reused by every render that checks the engine out"""
+
+    def __init__(self):
+        from weasyprint.text.fonts import FontConfiguration
+
+        self.font_config = FontConfiguration()
+        self.fonts = self._parse(FONTS_CSS)
+        self.stylesheets = {
+            template_name: self._parse(css_name)
+            for template_name, (css_name, _) in PDF_TEMPLATES.items()
+        }
+        # Image URI -> decoded image, shared by this engine's renders
+        self.image_cache = {}
+
+    def _parse(self, css_name):
+        from weasyprint import CSS
+
+        return CSS(
+            filename=os.path.join(STYLES_DIR, css_name),
+            font_config=self.font_config,
+        )
+
+    def render(self, template_name, context, **overrides):
+        """Render a PDF template to bytes (overrides: write_pdf options)"""
+        from weasyprint import HTML
+
+        options = {
+            **FONT_OPTIONS,
+            **PDF_TEMPLATES[template_name][1],
+            **overrides,
+            "stylesheets": [self.fonts, self.stylesheets[template_name]],
+            "cache": self.image_cache,
+        }
+        with metrics.timer("template_render"):
+            html = render_to_string(template_name, context)
+
+        with metrics.timer("pdf_layout"):
+            document = HTML(
+                string=html,
+                base_url=settings.BASE_DIR
+            ).render(font_config=self.font_config, **options)
+        with metrics.timer("pdf_write"):
+            return document.write_pdf(**options)
+
+
+# ---------------- MODULE ENGINES ----------------
+# Engines not rendering right now; the lock only guards this list
+_idle = []
+_idle_lock = threading.Lock()
+_versions = {}
+
+
+def get_engine():
+    """An idle engine for one render, created when every engine is busy; hand it back with release()"""
+    with _idle_lock:
+        if _idle:
+            return _idle.pop()
+    return PdfEngine()
+
+
+def release(engine):
+    with _idle_lock:
+        _idle.append(engine)
+
+
+def render_pdf(template_name, context):
+    engine = get_engine()
+    try:
+        return engine.render(template_name, context)
+    finally:
+        release(engine)
+
+
+def stylesheet_version(template_name):
+    """Hash of the stylesheets applied to a template (part of the render cache key)"""
+    version = _versions.get(template_name)
+    if version is None:
+        css_name, _ = PDF_TEMPLATES[template_name]
+        version = hashlib.sha256(
+            _read_stylesheet(FONTS_CSS) + _read_stylesheet(css_name)
+        ).hexdigest()
+        _versions[template_name] = version
+    return version
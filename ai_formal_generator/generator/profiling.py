@@ -0,0 +1,166 @@
+"""
+Sampling cProfile hook for live requests.
+
+ProfilingMiddleware profiles a random SAMPLE_RATE fraction of requests,
+plus every request carrying a signed X-Profile-Request header (minted by
+`python manage.py profile_token`, valid for TOKEN_MAX_AGE seconds). Each
+profile is written as a pstats file under
+
+    PROFILING["DIRECTORY"]/<url name>/<timestamp>.prof
+
+(for example download_circular_pdf/ vs download_policy_docx/), keeping
+the newest MAX_FILES per URL name. The staff page at /profiles/ merges an
+endpoint's files and lists its hottest functions; the files also load
+into pstats, snakeviz and similar tools.
+
+Only the view is profiled: the content of streamed responses is produced
+after the middleware returns. With PROFILING["ENABLED"] off the
+middleware removes itself at start-up (MiddlewareNotUsed).
+"""
+
+import cProfile
+import os
+import pstats
+import random
+import time
+
+from django.conf import settings
+from django.core import signing
+from django.core.exceptions import MiddlewareNotUsed
+
+
+HEADER = "X-Profile-Request"
+SALT = "generator.profiling"
+
+
+def profiling_settings():
+    conf = getattr(settings, "PROFILING", {})
+    return {
+        "ENABLED": conf.get("ENABLED", False),
+        "SAMPLE_RATE": conf.get("SAMPLE_RATE", 0.0),
+        "DIRECTORY": str(conf.get("DIRECTORY", os.path.join(settings.BASE_DIR, "profiles"))),
+        "MAX_FILES": conf.get("MAX_FILES", 50),
+        "TOKEN_MAX_AGE": conf.get("TOKEN_MAX_AGE", 24 * 3600),
+    }
+
+
+# ---------------- TOKENS ----------------
+def make_token():
+    """Value for the X-Profile-Request header"""
+    return signing.TimestampSigner(salt=SALT).sign("profile")
+
+
+def valid_token(value, max_age):
+    try:
+        return signing.TimestampSigner(salt=SALT).unsign(value, max_age=max_age) == "profile"
+    except signing.BadSignature:
+        return False
+
+
+# ---------------- MIDDLEWARE ----------------
+class ProfilingMiddleware:
+    def __init__(self, get_response):
+        conf = profiling_settings()
+        if not conf["ENABLED"]:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.sample_rate = conf["SAMPLE_RATE"]
+        self.directory = conf["DIRECTORY"]
+        self.max_files = conf["MAX_FILES"]
+        self.token_max_age = conf["TOKEN_MAX_AGE"]
+
+    def wanted(self, request):
+        token = request.headers.get(HEADER)
+        if token:
+            return valid_token(token, self.token_max_age)
+        return random.random() < self.sample_rate
+
+    def __call__(self, request):
+        if not self.wanted(request):
+            return self.get_response(request)
+
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError:  # another profiler is already active in this thread
+            return self.get_response(request)
+        try:
+            response = self.get_response(request)
+        finally:
+            profile.disable()
+
+        match = request.resolver_match
+        self.save(profile, match.url_name if match and match.url_name else "unresolved")
+        return response
+
+    def save(self, profile, endpoint):
+        folder = os.path.join(self.directory, endpoint)
+        try:
+            os.makedirs(folder, exist_ok=True)
+            path = os.path.join(folder, f"{time.time_ns()}.prof")
+            profile.dump_stats(path + ".tmp")
+            os.replace(path + ".tmp", path)  # readers never see a half-written file
+            prune(folder, self.max_files)
+        except OSError as e:
+            print(f"[ERROR] Could not save profile for {endpoint}: {e}")
+
+
+# ---------------- FILES ----------------
+def profile_files(folder):
+    """pstats files in an endpoint folder, oldest first"""
+    try:
+        names = [n for n in os.listdir(folder) if n.endswith(".prof")]
+    except FileNotFoundError:
+        return []
+    return [os.path.join(folder, n) for n in sorted(names)]
+
+
+def prune(folder, max_files):
+    files = profile_files(folder)
+    for path in files[:max(0, len(files) - max_files)]:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass  # removed by a concurrent request
+
+
+def endpoints(directory=None):
+    """{url name: number of profiles}, most profiled first"""
+    directory = directory or profiling_settings()["DIRECTORY"]
+    try:
+        names = sorted(os.listdir(directory))
+    except FileNotFoundError:
+        return {}
+    counts = {name: len(profile_files(os.path.join(directory, name))) for name in names}
+    return dict(sorted(((n, c) for n, c in counts.items() if c), key=lambda item: -item[1]))
+
+
+def hot_functions(endpoint, limit=30, sort="tottime", directory=None):
+    """
+    Top functions over all of an endpoint's profiles, as dicts with
+    function, calls, tottime and cumtime (seconds, summed over requests).
+    """
+    directory = directory or profiling_settings()["DIRECTORY"]
+    stats = None
+    for path in profile_files(os.path.join(directory, endpoint)):
+        try:
+            if stats is None:
+                stats = pstats.Stats(path)
+            else:
+                stats.add(path)
+        except (OSError, EOFError, ValueError):
+            continue  # pruned or half-written meanwhile
+    if stats is None:
+        return []
+
+    index = {"tottime": 2, "cumtime": 3}[sort]
+    rows = sorted(stats.stats.items(), key=lambda item: -item[1][index])[:limit]
+    return [
+        {
+            "function": pstats.func_std_string(func),
+            "calls": calls,
+            "tottime": tottime,
+            "cumtime": cumtime,
+        }
+        for func, (_, calls, tottime, cumtime, _) in rows
+    ]
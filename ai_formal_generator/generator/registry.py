@@ -0,0 +1,251 @@
+"""
+Lookup tables for designations, people and the per-document JSON files.
+
+Everything the forms and data builders look up is built once into a
+Registry: the id -> person directory, designation labels per language and
+the option lists the form templates loop over. A registry is an immutable
+snapshot (mappings are MappingProxyType, lists are tuples), so requests
+share one without locking and a reload swaps in a new one as a whole.
+
+Each part of a registry comes from a source:
+
+* ``FileSource``  – circular.json, policy.json, office_order.json; changes
+                    are noticed by mtime and size, confirmed by checksum
+* ``PeopleTable`` – the Person model, used for the circular directory when
+                    ``settings.REGISTRY["PEOPLE_SOURCE"]`` is "database", so
+                    admins can edit people without a deploy
+
+current() returns the live snapshot. Between checks (``RELOAD_INTERVAL``
+seconds) that is one clock read; a check stats the files (and runs one
+aggregate query for the people table), re-reads only what changed and
+swaps in a new snapshot when a checksum differs. ``changed`` is then sent
+so caches built from the old data (DOCX skeletons, header fragments) can
+drop it. A source that fails to load keeps the previous snapshot.
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from types import MappingProxyType
+
+from django.conf import settings
+from django.dispatch import Signal, receiver
+from django.test.signals import setting_changed
+
+from .constants import DESIGNATION_MAP
+
+
+LANGUAGES = ("en", "hi")
+
+FILES = {
+    "office_order": "office_order.json",
+    "circular": "circular.json",
+    "policy": "policy.json",
+}
+
+# Sent with registry= (the new snapshot) and previous= after a reload
+changed = Signal()
+
+
+def registry_settings():
+    conf = getattr(settings, "REGISTRY", {})
+    return {
+        "RELOAD_INTERVAL": conf.get("RELOAD_INTERVAL", 2.0),
+        "PEOPLE_SOURCE": conf.get("PEOPLE_SOURCE", "file"),
+    }
+
+
+# ---------------- FREEZING ----------------
+def freeze(value):
+    """Read-only copy of parsed JSON: dicts become mappingproxies, lists tuples"""
+    if isinstance(value, dict):
+        return MappingProxyType({k: freeze(v) for k, v in value.items()})
+    if isinstance(value, (list, tuple)):
+        return tuple(freeze(v) for v in value)
+    return value
+
+
+def thaw(value):
+    """Plain dicts and lists again, for data that is stored or serialised"""
+    if isinstance(value, MappingProxyType):
+        return {k: thaw(v) for k, v in value.items()}
+    if isinstance(value, tuple):
+        return [thaw(v) for v in value]
+    return value
+
+
+# ---------------- SOURCES ----------------
+class FileSource:
+    """A JSON file next to manage.py"""
+
+    def __init__(self, filename):
+        self.filename = filename
+
+    @property
+    def path(self):
+        return os.path.join(settings.BASE_DIR, self.filename)
+
+    def stamp(self):
+        stat = os.stat(self.path)
+        return (stat.st_mtime_ns, stat.st_size)
+
+    def load(self):
+        """(checksum, parsed data)"""
+        with open(self.path, "rb") as f:
+            content = f.read()
+        return hashlib.sha256(content).hexdigest(), json.loads(content.decode("utf-8"))
+
+
+class PeopleTable:
+    """Active Person rows, as circular.json "people" entries"""
+
+    def stamp(self):
+        from django.db.models import Count, Max
+        from .models import Person
+        stats = Person.objects.aggregate(count=Count("id"), latest=Max("updated_at"))
+        return (stats["count"], stats["latest"])
+
+    def load(self):
+        from .models import Person
+        people = [person.as_entry() for person in Person.objects.filter(active=True)]
+        content = json.dumps(people, sort_keys=True, ensure_ascii=False).encode("utf-8")
+        return hashlib.sha256(content).hexdigest(), people
+
+
+def sources():
+    found = {name: FileSource(filename) for name, filename in FILES.items()}
+    if registry_settings()["PEOPLE_SOURCE"] == "database":
+        found["people"] = PeopleTable()
+    return found
+
+
+# ---------------- REGISTRY ----------------
+class Registry:
+    """One consistent set of lookups, built from the sources and DESIGNATION_MAP"""
+
+    def __init__(self, documents, designation_map, version=""):
+        self.version = version
+        self.office_order = freeze(documents["office_order"])
+        self.circular = freeze(documents["circular"])
+        self.policy = freeze(documents["policy"])
+
+        # People in directory order, and by id with their position in it.
+        # An empty people table falls back to circular.json's list.
+        self.people = freeze(documents.get("people")) or self.circular["people"]
+        self.people_by_id = MappingProxyType(
+            {str(p["id"]): (index, p) for index, p in enumerate(self.people)}
+        )
+
+        # Form options: designation keys in rank order (DESIGNATION_MAP order)
+        self.designation_options = tuple(designation_map)
+        self.designations = MappingProxyType({
+            lang: MappingProxyType({key: labels[lang] for key, labels in designation_map.items()})
+            for lang in LANGUAGES
+        })
+
+    def designation(self, key, lang):
+        return self.designations[lang][key]
+
+    def designation_labels(self, keys, lang):
+        """Labels for the known keys among ``keys``, in the order given"""
+        labels = self.designations[lang]
+        return [labels[key] for key in keys if key in labels]
+
+    def is_person(self, person_id):
+        return str(person_id) in self.people_by_id
+
+    def resolve_people(self, ids):
+        """
+        Plain dicts for the people with these ids, in directory order.
+
+        One lookup per id, so the cost follows the number of recipients
+        rather than the size of the directory. Unknown and repeated ids are
+        dropped.
+        """
+        found = {}
+        for person_id in ids:
+            hit = self.people_by_id.get(str(person_id))
+            if hit:
+                found[hit[0]] = hit[1]
+        # Directory entries are flat, so a shallow copy thaws them
+        return [found[index].copy() for index in sorted(found)]
+
+
+# ---------------- ACCESS ----------------
+_registry = None
+_loaded = {}  # source name -> (stamp, checksum, data)
+_next_check = 0.0
+_lock = threading.Lock()
+
+
+def _refresh():
+    """Re-read changed sources; a new Registry when their content changed, else None"""
+    loaded = {}
+    for name, source in sources().items():
+        stamp = source.stamp()
+        previous = _loaded.get(name)
+        if previous and previous[0] == stamp:
+            loaded[name] = previous
+            continue
+        try:
+            loaded[name] = (stamp,) + source.load()
+        except (OSError, ValueError) as e:
+            if previous is None:
+                raise
+            # Keep the last good data until the source changes again
+            print(f"[ERROR] Registry: could not reload {name}, keeping previous data: {e}")
+            loaded[name] = (stamp,) + previous[1:]
+
+    version = hashlib.sha256("".join(
+        f"{name}:{checksum};" for name, (_, checksum, _) in sorted(loaded.items())
+    ).encode("utf-8")).hexdigest()
+
+    _loaded.clear()
+    _loaded.update(loaded)
+    if _registry is not None and _registry.version == version:
+        return None  # touched or saved unchanged
+    return Registry({name: data for name, (_, _, data) in loaded.items()}, DESIGNATION_MAP, version)
+
+
+def current():
+    """The live registry, rebuilt first if a source changed since it was built"""
+    global _registry, _next_check
+    if time.monotonic() < _next_check:
+        return _registry
+
+    with _lock:
+        if _registry is not None and time.monotonic() < _next_check:
+            return _registry
+        previous = _registry
+        try:
+            registry = _refresh()
+        except Exception as e:
+            if previous is None:
+                raise
+            # e.g. a file mid-replace; checked again next interval
+            print(f"[ERROR] Registry reload failed, keeping previous data: {e}")
+            registry = None
+        if registry is not None:
+            _registry = registry
+        _next_check = time.monotonic() + registry_settings()["RELOAD_INTERVAL"]
+
+    if registry is not None and previous is not None:
+        changed.send(sender=Registry, registry=registry, previous=previous)
+    return _registry
+
+
+def reset():
+    """Forget the current registry; the next current() rebuilds it"""
+    global _registry, _next_check
+    with _lock:
+        _registry = None
+        _loaded.clear()
+        _next_check = 0.0
+
+
+@receiver(setting_changed)
+def _settings_changed(setting, **kwargs):
+    if setting in ("REGISTRY", "BASE_DIR"):
+        reset()
@@ -0,0 +1,252 @@
+"""
+Content-addressed cache for rendered PDF / DOCX artifacts.
+
+A download is fully determined by the stored document data (its payload),
+the template it is rendered with and the stylesheet / builder version.
+The cache key is a SHA-256 over all of those, so re-downloading an
+unchanged document is a single file (or cache) read instead of a full
+WeasyPrint layout pass or python-docx build.
+
+Two backends are available, selected with ``settings.RENDER_CACHE``:
+
+* ``"disk"``   – one file per artifact, size bounded, LRU by mtime
+* ``"django"`` – any configured Django cache alias (locmem is LRU)
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+import threading
+
+from django.conf import settings
+from django.core.cache import caches
+from django.dispatch import receiver
+from django.template.loader import get_template
+from django.test.signals import setting_changed
+
+
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+
+# ---------------- KEYS ----------------
+_template_versions = {}
+
+
+def template_version(template_name):
+    """Hash of a template's source, recomputed only when the file changes"""
+    path = get_template(template_name).origin.name
+    stat = os.stat(path)
+    stamp = (stat.st_mtime_ns, stat.st_size)
+
+    cached = _template_versions.get(path)
+    if cached and cached[0] == stamp:
+        return cached[1]
+
+    with open(path, "rb") as f:
+        digest = hashlib.sha256(f.read()).hexdigest()
+    _template_versions[path] = (stamp, digest)
+    return digest
+
+
+def artifact_key(kind, context, *versions):
+    """
+    Key for one rendered artifact.
+
+    ``kind`` is the output format ("pdf" / "docx"), ``context`` the
+    document data and ``versions`` any template / stylesheet / builder
+    version strings that change the output.
+    """
+    h = hashlib.sha256()
+    h.update(kind.encode("utf-8"))
+    for version in versions:
+        h.update(b"\0")
+        h.update(str(version).encode("utf-8"))
+    h.update(b"\0")
+    h.update(json.dumps(context, sort_keys=True, ensure_ascii=False, default=str).encode("utf-8"))
+    return h.hexdigest()
+
+
+# ---------------- BACKENDS ----------------
+class DiskArtifactCache:
+    """Artifacts stored as files, least recently used evicted past max_bytes"""
+
+    def __init__(self, location, max_bytes=DEFAULT_MAX_BYTES):
+        self.location = str(location)
+        self.max_bytes = max_bytes
+        self._size = None
+        self._lock = threading.Lock()
+
+    def _path(self, key):
+        return os.path.join(self.location, key[:2], key)
+
+    def get(self, key):
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+        except OSError:
+            return None
+        try:
+            os.utime(path)  # mark as recently used
+        except OSError:
+            pass
+        return data
+
+    def set(self, key, data):
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        # Write to a temp file first so readers never see a partial artifact
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+        with self._lock:
+            if self._size is None:
+                self._size = self._scan_size()
+            else:
+                self._size += len(data)
+            if self._size > self.max_bytes:
+                self._evict()
+
+    def clear(self):
+        with self._lock:
+            for path, _, _ in self._entries():
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+            self._size = 0
+
+    def _entries(self):
+        if not os.path.isdir(self.location):
+            return []
+        entries = []
+        for root, _, files in os.walk(self.location):
+            for name in files:
+                if name.endswith(".tmp"):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((path, stat.st_mtime, stat.st_size))
+        return entries
+
+    def _scan_size(self):
+        return sum(size for _, _, size in self._entries())
+
+    def _evict(self):
+        # Other processes share the directory, so re-scan before evicting
+        entries = sorted(self._entries(), key=lambda e: e[1])
+        total = sum(size for _, _, size in entries)
+        target = int(self.max_bytes * 0.9)
+        for path, _, size in entries:
+            if total <= target:
+                break
+            try:
+                os.remove(path)
+                total -= size
+            except OSError:
+                pass
+        self._size = total
+
+
+class DjangoArtifactCache:
+    """
+    Artifacts stored in a Django cache alias (size bound by MAX_ENTRIES).
+
+    The alias may be shared with other data, so keys carry a generation
+    number and clear() moves to the next one instead of flushing the alias;
+    the old generation's entries age out on their own.
+    """
+
+    GENERATION_KEY = "artifact:generation"
+
+    def __init__(self, alias="default", timeout=None):
+        self.alias = alias
+        self.timeout = timeout
+
+    @property
+    def cache(self):
+        return caches[self.alias]
+
+    def _key(self, key):
+        generation = self.cache.get_or_set(self.GENERATION_KEY, 0, None)
+        return f"artifact:{generation}:{key}"
+
+    def get(self, key):
+        return self.cache.get(self._key(key))
+
+    def set(self, key, data):
+        self.cache.set(self._key(key), data, self.timeout)
+
+    def clear(self):
+        try:
+            self.cache.incr(self.GENERATION_KEY)
+        except ValueError:  # no generation stored yet
+            self.cache.set(self.GENERATION_KEY, 1, None)
+
+
+# ---------------- ACCESS ----------------
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_cache():
+    """Return the configured artifact cache, or None when caching is disabled"""
+    global _cache
+    if _cache is not None:
+        return _cache or None
+
+    with _cache_lock:
+        if _cache is None:
+            conf = getattr(settings, "RENDER_CACHE", {})
+            backend = conf.get("BACKEND", "disk")
+            if not conf.get("ENABLED", True) or not backend:
+                _cache = False
+            elif backend == "django":
+                _cache = DjangoArtifactCache(
+                    alias=conf.get("CACHE_ALIAS", "default"),
+                    timeout=conf.get("TIMEOUT"),
+                )
+            elif backend == "disk":
+                _cache = DiskArtifactCache(
+                    location=conf.get("LOCATION", os.path.join(settings.BASE_DIR, "render_cache")),
+                    max_bytes=conf.get("MAX_BYTES", DEFAULT_MAX_BYTES),
+                )
+            else:
+                raise ValueError(f"Unknown RENDER_CACHE backend: {backend}")
+    return _cache or None
+
+
+def reset_cache():
+    """Forget the configured backend (used when settings change in tests)"""
+    global _cache
+    with _cache_lock:
+        _cache = None
+
+
+@receiver(setting_changed)
+def _settings_changed(setting, **kwargs):
+    if setting in ("RENDER_CACHE", "BASE_DIR"):
+        reset_cache()
+
+
+def get_or_render(key, render):
+    """Return cached bytes for ``key``, calling ``render()`` on a miss"""
+    cache = get_cache()
+    if cache is None:
+        return render()
+
+    data = cache.get(key)
+    if data is None:
+        data = render()
+        try:
+            cache.set(key, data)
+        except OSError as e:
+            print(f"[ERROR] Render cache write failed: {e}")
+    return data
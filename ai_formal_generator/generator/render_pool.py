@@ -0,0 +1,409 @@
+"""
+Background PDF/DOCX rendering on a local process pool.
+
+Views enqueue a render of a stored document with submit() and return
+immediately; the job row (RenderJob) tracks its status so any web worker
+can answer status polls. Finished bytes go into the render cache under the
+job's cache key, which is where the download endpoint reads them from.
+Job rows only reference the document, and finished ones are pruned after
+JOB_RETENTION seconds (at most once a minute, from submit()).
+
+A render in flight is shared by everyone asking for the same cache key:
+later jobs chain onto it and downloads wait for it instead of rendering
+again. The preview pages queue their PDF and DOCX speculatively as soon as
+they are shown (owner = the session); issuing a newer document of the same
+type from that session cancels whatever of it has not started yet.
+
+That sharing and cancellation state lives in this process (the futures
+cannot be shared), so it only covers requests served by the web process
+that queued the render. A request landing on another process still finds
+the result in the render cache once it is done (the disk backend is shared
+between processes), or renders it itself; a speculative render there is
+not cancelled, only left to finish.
+
+Worker processes are spawned fresh (no inherited DB sockets) and warm
+started: Django is set up, PDF templates compiled and the PDF engine's
+stylesheets and fonts loaded before the first job arrives.
+"""
+
+import functools
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import CancelledError, ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections
+from django.utils import timezone
+
+from . import document_model, history, render_cache, renderers
+from .models import RenderJob
+from .render_worker import init_worker
+
+
+_executor = None
+_executor_lock = threading.Lock()
+
+# Pool renders not finished yet, by cache key; keys someone is actually
+# waiting for (not only speculation); speculative keys by (owner, doc_type)
+_inflight = {}
+_confirmed = set()
+_speculative = {}
+_inflight_lock = threading.Lock()
+
+# Seconds between job prunes in one process, and when the last one ran
+PRUNE_INTERVAL = 60
+_pruned_at = None
+
+# Used when the render cache is disabled, so finished jobs still have somewhere to live
+_fallback_store = render_cache.DjangoArtifactCache("default")
+
+
+def pool_settings():
+    conf = getattr(settings, "RENDER_POOL", {})
+    return {
+        "ENABLED": conf.get("ENABLED", True),
+        "WORKERS": conf.get("WORKERS", 2),
+        "PRERENDER": conf.get("PRERENDER", True),
+        "WAIT_TIMEOUT": conf.get("WAIT_TIMEOUT", 60),
+        "JOB_RETENTION": conf.get("JOB_RETENTION", 3600),
+    }
+
+
+def artifact_store():
+    return render_cache.get_cache() or _fallback_store
+
+
+# ---------------- WORKER SIDE ----------------
+def _run_job(job_id, doc_type, fmt, data):
+    RenderJob.objects.filter(id=job_id, status=RenderJob.QUEUED).update(status=RenderJob.RUNNING)
+    return renderers.render_artifact(doc_type, fmt, data)
+
+
+# ---------------- WEB SIDE ----------------
+def get_executor():
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ProcessPoolExecutor(
+                    max_workers=pool_settings()["WORKERS"],
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=init_worker,
+                    initargs=(os.environ.get("DJANGO_SETTINGS_MODULE", "ai_formal_generator.settings"),),
+                )
+    return _executor
+
+
+def pool_submit(fn, *args):
+    """
+    Submit to the pool. A worker that died (or failed to start) breaks the
+    executor for good, so a broken one is replaced and the call retried once.
+    """
+    global _executor
+    executor = get_executor()
+    try:
+        return executor.submit(fn, *args)
+    except BrokenProcessPool:
+        print("[ERROR] Render pool is broken; starting a new one")
+        with _executor_lock:
+            if _executor is executor:
+                _executor = None
+        executor.shutdown(wait=False, cancel_futures=True)
+        return get_executor().submit(fn, *args)
+
+
+def shutdown():
+    global _executor
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=True, cancel_futures=True)
+            _executor = None
+
+
+def _settle(key, future):
+    """Done-callback of a pool render: store the artifact, then stop tracking the key"""
+    try:
+        if not future.cancelled() and future.exception() is None:
+            artifact_store().set(key, future.result())
+    finally:
+        with _inflight_lock:
+            if _inflight.get(key) is future:
+                del _inflight[key]
+                _confirmed.discard(key)
+
+
+def _forget(speculation, key, future):
+    """Done-callback of a speculative request: its owner no longer needs to cancel it"""
+    with _inflight_lock:
+        keys = _speculative.get(speculation)
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del _speculative[speculation]
+
+
+def _record(job_id, future):
+    """Record the outcome of a render on its job row"""
+    try:
+        future.result()
+    except CancelledError:
+        RenderJob.objects.filter(id=job_id).update(
+            status=RenderJob.FAILED, error="Superseded by a newer document", finished_at=timezone.now()
+        )
+        return
+    except Exception as e:
+        print(f"[ERROR] Render job {job_id} failed: {e}")
+        RenderJob.objects.filter(id=job_id).update(
+            status=RenderJob.FAILED, error=str(e), finished_at=timezone.now()
+        )
+        return
+
+    RenderJob.objects.filter(id=job_id).update(status=RenderJob.DONE, finished_at=timezone.now())
+
+
+def _job_done(job_id, future):
+    """Done-callback of a pool job"""
+    if not future.cancelled():
+        # On the pool's own thread, which keeps its DB connection between jobs;
+        # cancellations call back in the cancelling request instead
+        close_old_connections()
+    _record(job_id, future)
+
+
+def _finish(job_id, key, future):
+    """Store an inline render's artifact and record the outcome on the job row"""
+    if future.exception() is None:
+        artifact_store().set(key, future.result())
+    _record(job_id, future)
+
+
+def _start(job_id, doc_type, fmt, data, key, owner):
+    """The pool future rendering key, started unless one is in flight already"""
+    with _inflight_lock:
+        future = _inflight.get(key)
+        started = future is None
+        if started:
+            future = pool_submit(_run_job, job_id, doc_type, fmt, data)
+            _inflight[key] = future
+        if owner is None:
+            _confirmed.add(key)
+        else:
+            _speculative.setdefault((owner, doc_type), set()).add(key)
+
+    # Outside the lock: a future that is already done runs its callbacks right here
+    if started:
+        future.add_done_callback(functools.partial(_settle, key))
+    if owner is not None:
+        future.add_done_callback(functools.partial(_forget, (owner, doc_type), key))
+    return future
+
+
+def cancel_speculative(owner, doc_type):
+    """
+    Drop the speculative renders of owner's previous document of this type:
+    queued ones are cancelled, running ones left to finish into the cache.
+    Renders someone has asked for since are kept.
+    """
+    with _inflight_lock:
+        keys = _speculative.pop((owner, doc_type), ())
+        futures = [_inflight[key] for key in keys if key in _inflight and key not in _confirmed]
+    for future in futures:
+        future.cancel()
+
+
+def prune_jobs():
+    """
+    Delete finished jobs (done, failed or superseded) older than
+    JOB_RETENTION, and jobs left unfinished for a day (a worker died).
+    Returns how many were deleted.
+    """
+    now = timezone.now()
+    finished = RenderJob.objects.filter(
+        status__in=(RenderJob.DONE, RenderJob.FAILED),
+        finished_at__lt=now - timedelta(seconds=pool_settings()["JOB_RETENTION"]),
+    )
+    stuck = RenderJob.objects.filter(
+        status__in=(RenderJob.QUEUED, RenderJob.RUNNING),
+        created_at__lt=now - timedelta(days=1),
+    )
+    return (finished | stuck).delete()[0]
+
+
+def _maybe_prune():
+    global _pruned_at
+    if _pruned_at is None or time.monotonic() - _pruned_at >= PRUNE_INTERVAL:
+        _pruned_at = time.monotonic()
+        prune_jobs()
+
+
+def submit(doc_type, fmt, public_id, data, owner=None):
+    """
+    Queue a render of the stored document public_id (whose data the caller
+    has loaded already) and return its RenderJob.
+
+    owner marks a speculative render (the session key of the preview that
+    asked for it), so cancel_speculative() can drop it.
+    """
+    _maybe_prune()
+    key = renderers.artifact_key(doc_type, fmt, data)
+    job = RenderJob.objects.create(
+        document_type=doc_type, format=fmt, cache_key=key, document_id=public_id
+    )
+
+    if artifact_store().get(key) is not None:
+        job.status = RenderJob.DONE
+        job.finished_at = timezone.now()
+        job.save(update_fields=["status", "finished_at"])
+        return job
+
+    if not pool_settings()["ENABLED"]:
+        # Same bookkeeping, rendered inline (development / tests)
+        future = _InlineFuture(lambda: renderers.render_artifact(doc_type, fmt, data))
+        _finish(job.id, key, future)
+        job.refresh_from_db()
+        return job
+
+    future = _start(job.id, doc_type, fmt, data, key, owner)
+    future.add_done_callback(functools.partial(_job_done, job.id))
+    return job
+
+
+def get_artifact(doc_type, fmt, data):
+    """
+    Rendered bytes for a download: waits for a render of the same key in
+    flight (typically the preview's speculative one), else reads the cache
+    or renders inline.
+    """
+    key = renderers.artifact_key(doc_type, fmt, data)
+    with _inflight_lock:
+        future = _inflight.get(key)
+        if future is not None:
+            _confirmed.add(key)
+
+    if future is not None:
+        try:
+            return future.result(timeout=pool_settings()["WAIT_TIMEOUT"])
+        except CancelledError:
+            pass
+        except Exception as e:
+            print(f"[ERROR] Waiting for render {key[:12]} failed: {e}")
+
+    if render_cache.get_cache() is None:
+        # Finished pool renders land in the fallback store instead
+        content = _fallback_store.get(key)
+        if content is not None:
+            return content
+    return renderers.get_artifact(doc_type, fmt, data)
+
+
+def job_artifact(job):
+    """
+    Bytes for a finished job, re-rendered from its document if evicted
+    meanwhile; None when that document is gone too.
+    """
+    store = artifact_store()
+    content = store.get(job.cache_key)
+    if content is None:
+        stored = history.load(job.document_id, job.document_type)
+        if stored is None:
+            return None
+        content = renderers.render_artifact(job.document_type, job.format, stored[1])
+        store.set(job.cache_key, content)
+    return content
+
+
+def render_many(items):
+    """
+    Render (doc_type, fmt, data) items across the pool.
+
+    Yields (index, content, error) in completion order: render cache hits
+    first, then each render as soon as its worker finishes. Closing the
+    generator early (a client leaving a streamed batch) cancels the renders
+    that have not started.
+    """
+    store = artifact_store()
+    in_pool = pool_settings()["ENABLED"]
+    hits, pending = [], {}
+
+    for index, (doc_type, fmt, data) in enumerate(items):
+        key = renderers.artifact_key(doc_type, fmt, data)
+        content = store.get(key)
+        if content is not None:
+            hits.append((index, content))
+        elif in_pool:
+            pending[pool_submit(renderers.render_artifact, doc_type, fmt, data)] = (index, key)
+        else:
+            # Rendered one at a time below, as the caller consumes results
+            pending[functools.partial(renderers.render_artifact, doc_type, fmt, data)] = (index, key)
+
+    try:
+        for index, content in hits:
+            yield index, content, None
+
+        for task in (as_completed(pending) if in_pool else pending):
+            index, key = pending[task]
+            future = task if in_pool else _InlineFuture(task)
+            try:
+                content = future.result()
+            except Exception as e:
+                print(f"[ERROR] Batch render {index} failed: {e}")
+                yield index, None, str(e)
+                continue
+            store.set(key, content)
+            yield index, content, None
+    finally:
+        if in_pool:
+            for future in pending:
+                future.cancel()
+
+
+def render_formats(doc_type, data, formats=None):
+    """
+    One document in several formats ({fmt: bytes}, all of FORMATS by default).
+
+    The document model is built once and every format is rendered from it;
+    cache hits are used as they are and the misses render side by side on
+    the pool. Raises the first render error.
+    """
+    formats = formats or renderers.FORMATS
+    store = artifact_store()
+    model = document_model.build(doc_type, data)
+    results, keys = {}, {}
+
+    for fmt in formats:
+        key = renderers.artifact_key(doc_type, fmt, data)
+        content = store.get(key)
+        if content is not None:
+            results[fmt] = content
+        else:
+            keys[fmt] = key
+
+    if pool_settings()["ENABLED"]:
+        futures = {fmt: pool_submit(renderers.render_model, model, fmt) for fmt in keys}
+    else:
+        futures = {fmt: _InlineFuture(functools.partial(renderers.render_model, model, fmt)) for fmt in keys}
+
+    for fmt, future in futures.items():
+        results[fmt] = future.result()
+        store.set(keys[fmt], results[fmt])
+    return {fmt: results[fmt] for fmt in formats}
+
+
+class _InlineFuture:
+    def __init__(self, fn):
+        try:
+            self._result, self._error = fn(), None
+        except Exception as e:
+            self._result, self._error = None, e
+
+    def exception(self):
+        return self._error
+
+    def result(self):
+        if self._error is not None:
+            raise self._error
+        return self._result
@@ -0,0 +1,69 @@
+"""
+Start-up of render pool worker processes.
+
+Spawned workers unpickle their initializer before Django is set up, so this
+module must not import models (or anything that does) at import time.
+
+Warm-up is best effort, one engine at a time: an initializer that raises
+breaks the whole pool, so a PDF engine that cannot load (no Pango) must
+not take DOCX and HTML rendering down with it.
+"""
+
+import os
+
+
+def _warm_images():
+    from . import assets
+
+    for name in assets.IMAGES:
+        assets.get(name)
+
+
+def _warm_pdf():
+    from django.template.loader import get_template
+    from . import pdf_engine, renderers
+
+    pdf_engine.release(pdf_engine.get_engine())  # parses stylesheets, registers fonts
+    for spec in renderers.DOCUMENTS.values():
+        get_template(spec["pdf_template"])
+
+
+def _warm_html():
+    from django.template.loader import get_template
+    from . import document_model
+
+    get_template(document_model.EXPORT_TEMPLATE)
+    document_model.stylesheet()
+
+
+def _warm_docx():
+    from . import document_model, docx_engine, renderers
+    from .samples import LANGUAGES, sample_context
+
+    for doc_type in renderers.DOCUMENTS:
+        for lang in LANGUAGES:
+            docx_engine.engine.skeleton(document_model.build(doc_type, sample_context(doc_type, lang)))
+
+
+WARM_UP_STEPS = (
+    ("images", _warm_images),
+    ("pdf", _warm_pdf),
+    ("html", _warm_html),
+    ("docx", _warm_docx),
+)
+
+
+def warm_up():
+    """Load templates, stylesheets, fonts, images and DOCX skeletons so the first job renders at full speed"""
+    for name, step in WARM_UP_STEPS:
+        try:
+            step()
+        except Exception as e:
+            print(f"[ERROR] Render worker warm-up ({name}) failed: {e}")
+
+
+def init_worker(settings_module):
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", settings_module)
+    import django
+    django.setup()
+    warm_up()
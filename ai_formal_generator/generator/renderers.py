@@ -0,0 +1,99 @@
+"""
+Document renderers shared by the download views and the render worker pool.
+
+Every generated document type is described once in DOCUMENTS (session key
+of the last issued document's id, PDF template, download filename) so
+callers can render any (document type, format) pair from its document
+data. DOCX files are filled in from per-layout skeletons by
+generator/docx_engine.py.
+
+Each render starts from the document model (generator/document_model.py):
+render_model() takes one built model and every format is rendered from
+its blocks, so a caller producing several formats of a document
+(render_pool.render_formats) builds it only once.
+"""
+
+from . import assets, document_model, docx_engine, metrics, pdf_engine, render_cache
+
+
+# Bump when generator/docx_engine.py changes its output, so cached files are not reused
+DOCX_BUILDER_VERSION = "5"
+
+CONTENT_TYPES = {
+    "pdf": "application/pdf",
+    "docx": "application/vnd.openxmlformats-officedocument.wordprocessingml.document",
+    "html": "text/html; charset=utf-8",
+}
+
+
+# ---------------- REGISTRY ----------------
+DOCUMENTS = {
+    "office_order": {
+        "session_key": "doc_data",
+        "pdf_template": "generator/pdf_office_order.html",
+        "filename": "Office_Order",
+        "missing": "No office order generated",
+    },
+    "circular": {
+        "session_key": "circular_data",
+        "pdf_template": "generator/pdf_circular.html",
+        "filename": "Circular",
+        "missing": "No circular generated",
+    },
+    "policy": {
+        "session_key": "policy_data",
+        "pdf_template": "generator/pdf_policy.html",
+        "filename": "Policy",
+        "missing": "No policy generated",
+    },
+}
+
+FORMATS = tuple(CONTENT_TYPES)
+
+
+def artifact_key(doc_type, fmt, data):
+    """Render cache key for one (document type, format) rendering of data"""
+    if fmt == "pdf":
+        template_name = DOCUMENTS[doc_type]["pdf_template"]
+        return render_cache.artifact_key(
+            "pdf", data, template_name,
+            render_cache.template_version(template_name),
+            pdf_engine.stylesheet_version(template_name),
+            document_model.MODEL_VERSION,
+            document_model.labels_version(),
+            assets.version(),
+        )
+    if fmt == "html":
+        return render_cache.artifact_key("html", data, doc_type, document_model.version(), assets.version())
+    return render_cache.artifact_key(
+        "docx", data, doc_type, DOCX_BUILDER_VERSION,
+        document_model.MODEL_VERSION, document_model.labels_version(), assets.version(),
+    )
+
+
+def render_model(model, fmt):
+    """Render one format of a built document model, without consulting the cache"""
+    spec = DOCUMENTS[model.doc_type]
+    with metrics.document(model.doc_type, model.language):
+        if fmt == "pdf":
+            return pdf_engine.render_pdf(spec["pdf_template"], {"document": model})
+        if fmt == "docx":
+            return docx_engine.render_docx(model)
+        if fmt == "html":
+            return document_model.render_html(model)
+    raise ValueError(f"Unknown format: {fmt}")
+
+
+def render_artifact(doc_type, fmt, data):
+    """Render without consulting the cache"""
+    return render_model(document_model.build(doc_type, data), fmt)
+
+
+def get_artifact(doc_type, fmt, data):
+    """Rendered bytes, served from the render cache when possible"""
+    key = artifact_key(doc_type, fmt, data)
+    return render_cache.get_or_render(key, lambda: render_artifact(doc_type, fmt, data))
+
+
+def filename(doc_type, fmt):
+    return f"{DOCUMENTS[doc_type]['filename']}.{fmt}"
@@ -0,0 +1,122 @@
+"""
+Synthetic document data for benchmarks and load tests.
+
+Builds the same dicts the result_* views store, so render
+paths can be exercised without going through the forms. Document types
+and their PDF templates come from renderers.DOCUMENTS, so samples render
+exactly what the downloads do.
+"""
+
+import random
+
+from . import registry
+from .documents import document_reference
+from .registry import thaw
+from .renderers import DOCUMENTS
+
+
+DOC_TYPES = tuple(DOCUMENTS)
+LANGUAGES = ("en", "hi")
+
+PDF_TEMPLATES = {doc_type: spec["pdf_template"] for doc_type, spec in DOCUMENTS.items()}
+
+PARAGRAPHS = {
+    "en": (
+        "In pursuance of the decision taken by the competent authority, all "
+        "officers and staff of BISAG-N are hereby informed that the instructions "
+        "contained herein shall come into force with immediate effect. Heads of "
+        "divisions shall ensure strict compliance and bring this order to the "
+        "notice of all concerned."
+    ),
+    "hi": (
+        "सक्षम प्राधिकारी द्वारा लिए गए निर्णय के अनुसरण में, बायसेग-एन के सभी "
+        "अधिकारियों एवं कर्मचारियों को सूचित किया जाता है कि इसमें निहित निर्देश "
+        "तत्काल प्रभाव से लागू होंगे। सभी प्रभाग प्रमुख इनका कड़ाई से अनुपालन "
+        "सुनिश्चित करेंगे तथा इसे सभी संबंधितों के ध्यान में लाएंगे।"
+    ),
+}
+
+
+def sample_body(lang, paragraphs=3):
+    return "\n\n".join([PARAGRAPHS[lang]] * paragraphs)
+
+
+def sample_context(doc_type, lang, paragraphs=3, recipients=5, seed=0):
+    """Session data for one document, shaped like the matching result_* view"""
+    if doc_type not in DOCUMENTS:
+        raise ValueError(f"Unknown document type: {doc_type}")
+    rng = random.Random(seed)
+    reg = registry.current()
+    designations = list(reg.designation_options)
+    body = sample_body(lang, paragraphs)
+    sender = reg.designation(designations[0], lang)
+    to = reg.designation_labels(rng.sample(designations, min(recipients, len(designations))), lang)
+    reference = document_reference(doc_type, lang, 2026, seed + 1)
+
+    if doc_type == "office_order":
+        title = reg.office_order["title_hi"] if lang == "hi" else reg.office_order["title_en"]
+        return {
+            "language": lang,
+            "header": thaw(reg.office_order["header"][lang]),
+            "title": title,
+            "reference": reference,
+            "date": "01-01-2026",
+            "body": body,
+            "from": sender,
+            "to": to,
+        }
+
+    if doc_type == "circular":
+        header = reg.circular["header"]["hindi" if lang == "hi" else "english"]
+        people = thaw(reg.people)
+        return {
+            "language": lang,
+            "header": {
+                "org_name": header["org_name"],
+                "ministry": header["ministry"],
+                "government": header["government"],
+            },
+            "reference": reference,
+            "date": "01-01-2026",
+            "subject": header["title"],
+            "body": body,
+            "from": sender,
+            "to_people": [people[i % len(people)] for i in range(recipients)],
+        }
+
+    if doc_type == "policy":
+        return {
+            "language": lang,
+            "header": thaw(reg.policy["header"][lang]),
+            "reference": reference,
+            "date": "01-01-2026",
+            "subject": reg.policy["title_hi"] if lang == "hi" else reg.policy["title_en"],
+            "body": body,
+            "from": sender,
+            "to": ", ".join(to),
+            "to_list": to,
+        }
+
+
+# Topics mixed into subjects and bodies of sample_documents(), so history
+# searches match a realistic share of rows instead of all or none
+TOPICS = {
+    "en": ("leave", "travel", "budget", "audit", "security", "training",
+           "procurement", "holiday", "attendance", "transfer", "vehicle", "library"),
+    "hi": ("अवकाश", "यात्रा", "बजट", "लेखापरीक्षा", "सुरक्षा", "प्रशिक्षण",
+           "खरीद", "छुट्टी", "उपस्थिति", "स्थानांतरण", "वाहन", "पुस्तकालय"),
+}
+
+
+def sample_documents(n, year=2026, seed=0):
+    """n (doc_type, data) pairs of mixed types and languages with distinct references"""
+    rng = random.Random(seed)
+    for i in range(n):
+        doc_type, lang = rng.choice(DOC_TYPES), rng.choice(LANGUAGES)
+        data = sample_context(doc_type, lang, paragraphs=rng.randint(1, 3), seed=i % 100)
+        topics = rng.sample(TOPICS[lang], 2)
+        data["reference"] = document_reference(doc_type, lang, year, i + 1)
+        data["body"] = f"{' '.join(topics)}. {data['body']}"
+        if doc_type != "office_order":
+            data["subject"] = f"{data['subject']}: {topics[0]}"
+        yield doc_type, data
@@ -0,0 +1,16 @@
+"""
+{% asset_uri "logo" %}: a letterhead image prepared by generator/assets.py,
+as a data: URI, so WeasyPrint gets the display-size PNG without a file read.
+"""
+
+from django import template
+
+from .. import assets
+
+
+register = template.Library()
+
+
+@register.simple_tag
+def asset_uri(name):
+    return assets.get(name).data_uri
@@ -0,0 +1,99 @@
+"""
+Pre-rendered template fragments.
+
+The letterhead of a PDF template (logo, header lines, title) and its fixed
+labels only change with the language and the header data, yet they were
+rendered node by node for every document. Wrapping such a block in
+
+    {% load fragments %}
+    {% fragment language header %} ... {% endfragment %}
+
+renders it once per distinct value of the listed variables and replays the
+stored HTML afterwards. The block must depend on nothing but those
+variables.
+
+Rendered blocks live on the parsed template node, so a template edited in
+development (the cached loader then re-parses it) starts afresh. They are
+also dropped when the letterhead JSON changes (generator/registry.py).
+"""
+
+from contextlib import contextmanager
+
+from django import template
+from django.dispatch import receiver
+from django.utils.safestring import mark_safe
+
+from .. import registry
+
+
+register = template.Library()
+
+# Blocks kept per fragment node; past this the node starts over
+MAX_VARIANTS = 64
+
+ENABLED = True
+_generation = 0
+
+
+@contextmanager
+def disabled():
+    """Render fragments in full (benchmarks and tests)"""
+    global ENABLED
+    ENABLED = False
+    try:
+        yield
+    finally:
+        ENABLED = True
+
+
+@receiver(registry.changed)
+def _registry_changed(**kwargs):
+    global _generation
+    _generation += 1
+
+
+def _hashable(value):
+    if isinstance(value, dict):
+        return tuple((k, _hashable(v)) for k, v in value.items())
+    if isinstance(value, (list, tuple)):
+        return tuple(_hashable(v) for v in value)
+    return value
+
+
+class FragmentNode(template.Node):
+    def __init__(self, nodelist, vary_on):
+        self.nodelist = nodelist
+        self.vary_on = vary_on
+        self.rendered = {}
+        self.generation = _generation
+
+    def render(self, context):
+        if not ENABLED:
+            return self.nodelist.render(context)
+
+        if self.generation != _generation:
+            self.rendered = {}
+            self.generation = _generation
+        try:
+            key = tuple(_hashable(var.resolve(context)) for var in self.vary_on)
+            html = self.rendered.get(key)
+        except TypeError:  # unhashable value, render as usual
+            return self.nodelist.render(context)
+
+        if html is None:
+            html = mark_safe(self.nodelist.render(context))
+            if len(self.rendered) >= MAX_VARIANTS:
+                self.rendered = {}
+            self.rendered[key] = html
+        return html
+
+
+@register.tag
+def fragment(parser, token):
+    """{% fragment var1 var2 ... %}block{% endfragment %}"""
+    bits = token.split_contents()[1:]
+    if not bits:
+        raise template.TemplateSyntaxError("'fragment' needs at least one variable to vary on")
+    nodelist = parser.parse(("endfragment",))
+    parser.delete_first_token()
+    return FragmentNode(nodelist, [parser.compile_filter(bit) for bit in bits])
@@ -1,3 +1,1409 @@
-from django.test import TestCase
+import asyncio
+import base64
+import datetime
+import io
+import json
+import os
+import random
+import shutil
+import tempfile
+import threading
+import time
+import uuid
+import zipfile
+from concurrent.futures import Future
+from concurrent.futures.process import BrokenProcessPool
+from types import SimpleNamespace
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import caches
+from django.core.management import CommandError, call_command
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection, connections
+from django.test import (
+    Client, SimpleTestCase, TestCase, TransactionTestCase, AsyncRequestFactory, RequestFactory, override_settings,
+)
+from django.test.utils import CaptureQueriesContext
+from django.template import Context as TemplateContext, Template
+from django.template.loader import render_to_string
+from django.urls import reverse
+
+from . import assets, batch, benchmarks, document_model, docx_engine, draft_cache, history, llm, loadtest, metrics, pdf_engine, profiling, registry, render_cache, render_pool, render_worker, renderers, samples, views
+from .management.commands import load_test
+from .models import DocumentLog, OfficeOrderCounter, Person, RenderJob
+from .templatetags import fragments
+
+
+class StubModel:
+    """
+    Offline stand-in for the Gemini model with a configurable reply latency.
+
+    With stream=True the reply comes back word by word, ``latency`` apart,
+    failing after ``fail_after`` chunks when set.
+    """
+
+    def __init__(self, text="Drafted text.", latency=0.0, fail_after=None):
+        self.text = text
+        self.latency = latency
+        self.fail_after = fail_after
+        self.prompts = []
+        self.cancelled = 0
+
+    def chunks(self):
+        words = f"  {self.text}  ".split(" ")
+        return [word + " " for word in words[:-1]] + [words[-1]]
+
+    async def generate_content_async(self, prompt, stream=False):
+        self.prompts.append(prompt)
+        if stream:
+            return self.astream()
+        try:
+            await asyncio.sleep(self.latency)
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        return SimpleNamespace(text=f"  {self.text}  ")
+
+    def generate_content(self, prompt, stream=False):
+        self.prompts.append(prompt)
+        if stream:
+            return self.stream()
+        time.sleep(self.latency)
+        return SimpleNamespace(text=f"  {self.text}  ")
+
+    def stream(self):
+        for i, text in enumerate(self.chunks()):
+            if i == self.fail_after:
+                raise ConnectionError("stream dropped")
+            time.sleep(self.latency)
+            yield SimpleNamespace(text=text)
+
+    async def astream(self):
+        for i, text in enumerate(self.chunks()):
+            if i == self.fail_after:
+                raise ConnectionError("stream dropped")
+            await asyncio.sleep(self.latency)
+            yield SimpleNamespace(text=text)
+
+
+def use_model(model):
+    """Route drafting through the Gemini provider with ``model`` as its client"""
+    return mock.patch.object(llm, "_provider", llm.GeminiProvider(model=model, backoff=0))
+
+
+@override_settings(AI_TIMEOUT=5)
+class AsyncDraftingTests(SimpleTestCase):
+    factory = AsyncRequestFactory()
+
+    def setUp(self):
+        caches["ai_drafts"].clear()
+
+    def post(self, view, **data):
+        data.setdefault("language", "en")
+        return view(self.factory.post("/", data))
+
+    def test_returns_stripped_text_with_system_prompt(self):
+        stub = StubModel("Office closed on 26 January.")
+        with use_model(stub):
+            response = asyncio.run(self.post(views.generate_body_async, body_prompt="Republic Day holiday", language="hi"))
+
+        self.assertEqual(response.content.decode(), "Office closed on 26 January.")
+        self.assertTrue(stub.prompts[0].startswith(llm.system_prompt_for("office_order", "body", "hi")))
+        self.assertTrue(stub.prompts[0].endswith("Republic Day holiday"))
+
+    def test_policy_title_reads_subject_prompt(self):
+        stub = StubModel("Policy on Remote Work")
+        with use_model(stub):
+            response = asyncio.run(self.post(views.generate_policy_title_async, subject_prompt="remote work"))
+
+        self.assertEqual(response.content.decode(), "Policy on Remote Work")
+
+    def test_empty_prompt_skips_model(self):
+        stub = StubModel()
+        with use_model(stub):
+            response = asyncio.run(self.post(views.generate_circular_body_async, body_prompt="  "))
+
+        self.assertEqual(response.content.decode(), "Please provide a prompt for AI generation.")
+        self.assertEqual(stub.prompts, [])
+
+    def test_sync_and_async_policy_title_answer_alike(self):
+        def both(**data):
+            return [
+                self.post(views.generate_policy_title, **data).content.decode(),
+                asyncio.run(self.post(views.generate_policy_title_async, **data)).content.decode(),
+            ]
+
+        stub = StubModel()
+        with use_model(stub):
+            self.assertEqual(both(subject_prompt="  "), ["Please provide a prompt for AI generation."] * 2)
+        self.assertEqual(stub.prompts, [])
+
+        with mock.patch.object(llm, "draft", side_effect=ConnectionError("offline")), \
+                mock.patch.object(llm, "adraft", side_effect=ConnectionError("offline")):
+            failed = both(subject_prompt="remote work")
+        self.assertEqual(failed, ["Failed to generate content. Please check your internet connection and try again."] * 2)
+
+    @override_settings(AI_TIMEOUT=0.05)
+    def test_slow_model_times_out(self):
+        stub = StubModel(latency=1)
+        with use_model(stub):
+            response = asyncio.run(self.post(views.generate_policy_body_async, body_prompt="leave policy"))
+
+        self.assertEqual(response.content.decode(), "AI generation timed out. Please try again.")
+        self.assertEqual(stub.cancelled, 1)
+
+    def test_concurrent_requests_overlap(self):
+        stub = StubModel(latency=0.2)
+
+        async def burst():
+            return await asyncio.gather(*[
+                self.post(views.generate_body_async, body_prompt=f"topic {i}") for i in range(200)
+            ])
+
+        with use_model(stub):
+            start = time.perf_counter()
+            responses = asyncio.run(burst())
+            elapsed = time.perf_counter() - start
+
+        self.assertEqual(len(responses), 200)
+        self.assertLess(elapsed, 2)
+
+    def test_disconnect_cancels_model_call(self):
+        stub = StubModel(latency=10)
+
+        async def disconnect():
+            task = asyncio.ensure_future(self.post(views.generate_body_async, body_prompt="topic"))
+            await asyncio.sleep(0.05)
+            task.cancel()  # what Django's ASGI handler does on http.disconnect
+            with self.assertRaises(asyncio.CancelledError):
+                await task
+
+        with use_model(stub):
+            asyncio.run(disconnect())
+
+        self.assertEqual(stub.cancelled, 1)
+
+
+class StreamingDraftTests(SimpleTestCase):
+    text = "The office will remain closed on account of Diwali."
+
+    def setUp(self):
+        caches["ai_drafts"].clear()
+
+    def test_sync_stream_sends_text_in_chunks(self):
+        stub = StubModel(self.text)
+        request = RequestFactory().post("/", {"body_prompt": "Diwali", "language": "en", "stream": "1"})
+        with use_model(stub):
+            response = views.generate_body(request)
+            chunks = list(response.streaming_content)
+
+        self.assertTrue(response.streaming)
+        self.assertGreater(len(chunks), 1)
+        self.assertEqual(b"".join(chunks).decode().strip(), self.text)
+        self.assertFalse(chunks[0].startswith(b" "))
+
+    def test_async_stream_sends_text_in_chunks(self):
+        stub = StubModel(self.text, latency=0.01)
+        request = AsyncRequestFactory().post("/", {"body_prompt": "Diwali", "language": "en", "stream": "1"})
+
+        async def collect():
+            response = await views.generate_circular_body_async(request)
+            return [chunk async for chunk in response.streaming_content]
+
+        with use_model(stub):
+            chunks = asyncio.run(collect())
+
+        self.assertGreater(len(chunks), 1)
+        self.assertEqual(b"".join(chunks).decode().strip(), self.text)
+
+    def test_dropped_stream_is_reported_inline(self):
+        stub = StubModel(self.text, fail_after=5)
+        request = RequestFactory().post("/", {"body_prompt": "Diwali", "language": "en", "stream": "1"})
+        with use_model(stub):
+            content = b"".join(views.generate_policy_body(request).streaming_content).decode()
+
+        self.assertTrue(content.startswith("The office will"))
+        self.assertTrue(content.endswith(views.STREAM_INTERRUPTED))
+
+    def test_without_stream_flag_reply_is_buffered(self):
+        stub = StubModel(self.text)
+        request = RequestFactory().post("/", {"body_prompt": "Diwali", "language": "en"})
+        with use_model(stub):
+            response = views.generate_body(request)
+
+        self.assertFalse(response.streaming)
+        self.assertEqual(response.content.decode(), self.text)
+
+
+class DraftCacheTests(SimpleTestCase):
+    text = "The office will remain closed on 26 January."
+
+    def setUp(self):
+        caches["ai_drafts"].clear()
+
+    def post(self, view=views.generate_body, **data):
+        data.setdefault("language", "en")
+        return view(RequestFactory().post("/", data))
+
+    def test_normalisation_ignores_wording_noise(self):
+        self.assertEqual(
+            draft_cache.normalise_prompt("Please write the holiday on 26th Jan."),
+            draft_cache.normalise_prompt("  holiday on 26 JANUARY  "),
+        )
+        self.assertEqual(
+            draft_cache.normalise_prompt("कृपया दीवाली के अवसर पर कार्यालय बंद।"),
+            draft_cache.normalise_prompt("दीवाली के  अवसर पर कार्यालय बंद"),
+        )
+        self.assertNotEqual(
+            draft_cache.normalise_prompt("transfer from Delhi to Gandhinagar"),
+            draft_cache.normalise_prompt("transfer from Gandhinagar to Delhi"),
+        )
+
+    def test_direction_and_conjunction_words_stay_in_the_key(self):
+        def key(prompt):
+            return draft_cache.draft_key("office_order", "body", "en", "system", prompt)
+
+        for first, second in (
+            ("Transfer of Mr. Shah to Ahmedabad office", "Transfer of Mr. Shah from Ahmedabad office"),
+            ("Office closed on Monday and Tuesday", "Office closed on Monday or Tuesday"),
+            ("श्री शाह का अहमदाबाद से स्थानांतरण", "श्री शाह का अहमदाबाद को स्थानांतरण"),
+        ):
+            self.assertNotEqual(key(first), key(second))
+
+    def test_similar_prompt_is_served_from_cache(self):
+        stub = StubModel(self.text)
+        with use_model(stub):
+            first = self.post(body_prompt="Holiday on 26th Jan.")
+            second = self.post(body_prompt="holiday on 26 January")
+
+        self.assertEqual(len(stub.prompts), 1)
+        self.assertEqual(second.content.decode(), self.text)
+        self.assertEqual((first["X-Draft-Cache"], second["X-Draft-Cache"]), ("miss", "hit"))
+        self.assertEqual(draft_cache.stats(), {"hits": 1, "misses": 1})
+
+    def test_key_separates_type_field_and_language(self):
+        stub = StubModel(self.text)
+        with use_model(stub):
+            self.post(body_prompt="Republic Day")
+            self.post(body_prompt="Republic Day", language="hi")
+            self.post(views.generate_circular_body, body_prompt="Republic Day")
+            self.post(views.generate_policy_title, subject_prompt="Republic Day")
+
+        self.assertEqual(len(stub.prompts), 4)
+
+    def test_regenerate_bypasses_and_replaces_entry(self):
+        with use_model(StubModel("First draft.")):
+            self.post(body_prompt="Diwali")
+        with use_model(StubModel("Second draft.")):
+            regenerated = self.post(body_prompt="Diwali", regenerate="1")
+        stub = StubModel("Third draft.")
+        with use_model(stub):
+            cached = self.post(body_prompt="Diwali")
+
+        self.assertEqual(regenerated.content.decode(), "Second draft.")
+        self.assertEqual(cached.content.decode(), "Second draft.")
+        self.assertEqual(stub.prompts, [])
+
+    def test_completed_stream_is_cached_but_interrupted_one_is_not(self):
+        with use_model(StubModel(self.text, fail_after=3)):
+            b"".join(self.post(body_prompt="Diwali", stream="1").streaming_content)
+        with use_model(StubModel(self.text)):
+            b"".join(self.post(body_prompt="Diwali", stream="1").streaming_content)
+
+        stub = StubModel()
+        with use_model(stub):
+            response = self.post(body_prompt="Diwali", stream="1")
+            content = b"".join(response.streaming_content).decode()
+
+        self.assertEqual(content, self.text)
+        self.assertEqual(response["X-Draft-Cache"], "hit")
+        self.assertEqual(stub.prompts, [])
+
+    def test_async_views_share_the_cache(self):
+        with use_model(StubModel(self.text)):
+            self.post(body_prompt="Republic Day holiday")
+
+        stub = StubModel()
+        request = AsyncRequestFactory().post("/", {"body_prompt": "republic day holiday", "language": "en"})
+        with use_model(stub):
+            response = asyncio.run(views.generate_body_async(request))
+
+        self.assertEqual(response.content.decode(), self.text)
+        self.assertEqual(stub.prompts, [])
+
+    @override_settings(AI_DRAFT_CACHE={"ENABLED": False})
+    def test_disabled_cache_always_calls_model(self):
+        stub = StubModel(self.text)
+        with use_model(stub):
+            self.post(body_prompt="Diwali")
+            self.post(body_prompt="Diwali")
+
+        self.assertEqual(len(stub.prompts), 2)
+
+
+class FlakyModel(StubModel):
+    """Raises ``errors`` one by one before answering like StubModel"""
+
+    def __init__(self, errors, text="Drafted text."):
+        super().__init__(text)
+        self.errors = list(errors)
+
+    def generate_content(self, prompt, stream=False):
+        if self.errors:
+            self.prompts.append(prompt)
+            raise self.errors.pop(0)
+        return super().generate_content(prompt, stream)
+
+    async def generate_content_async(self, prompt, stream=False):
+        if self.errors:
+            self.prompts.append(prompt)
+            raise self.errors.pop(0)
+        return await super().generate_content_async(prompt, stream)
+
+
+class ProviderTests(SimpleTestCase):
+    def setUp(self):
+        caches["ai_drafts"].clear()
+
+    def test_transient_errors_are_retried(self):
+        model = FlakyModel([ConnectionError("reset"), ConnectionError("reset")])
+        provider = llm.GeminiProvider(model=model, backoff=0)
+        request = llm.DraftRequest("office_order", "body", "en", "Diwali")
+
+        self.assertEqual(provider.generate(request), "Drafted text.")
+        self.assertEqual(len(model.prompts), 3)
+
+    def test_retries_are_bounded_and_skip_permanent_errors(self):
+        request = llm.DraftRequest("office_order", "body", "en", "Diwali")
+
+        model = FlakyModel([ConnectionError("reset")] * 5)
+        with self.assertRaises(ConnectionError):
+            llm.GeminiProvider(model=model, retries=2, backoff=0).generate(request)
+        self.assertEqual(len(model.prompts), 3)
+
+        model = FlakyModel([ValueError("bad request")])
+        with self.assertRaises(ValueError):
+            llm.GeminiProvider(model=model, backoff=0).generate(request)
+        self.assertEqual(len(model.prompts), 1)
+
+    def test_stream_start_is_retried_async(self):
+        model = FlakyModel([ConnectionError("reset")], "Office closed today.")
+        provider = llm.GeminiProvider(model=model, backoff=0)
+        request = llm.DraftRequest("circular", "body", "en", "closure")
+
+        async def collect():
+            return [text async for text in provider.astream(request)]
+
+        self.assertEqual("".join(asyncio.run(collect())).strip(), "Office closed today.")
+
+    @override_settings(AI_PROVIDER="stub")
+    def test_stub_provider_is_deterministic_and_offline(self):
+        request = RequestFactory().post("/", {"body_prompt": "Diwali holiday", "language": "hi", "regenerate": "1"})
+        first = views.generate_body(request).content.decode()
+        second = views.generate_body(request).content.decode()
+
+        self.assertIsInstance(llm.get_provider(), llm.StubProvider)
+        self.assertEqual(first, second)
+        self.assertIn("Diwali holiday", first)
+
+        title = views.generate_policy_title(RequestFactory().post("/", {"subject_prompt": "remote work", "language": "en"}))
+        self.assertEqual(title.content.decode(), "Policy on Remote Work")
+
+    @override_settings(AI_PROVIDER="stub")
+    def test_stub_stream_matches_buffered_reply(self):
+        provider = llm.get_provider()
+        request = llm.DraftRequest("policy", "body", "en", "leave policy")
+
+        self.assertEqual("".join(provider.stream(request)), provider.generate(request))
+
+
+BATCH_CSV = """type,language,from,to,subject,body,date
+office_order,en,Director General,Additional Director;Chief Vigilance Officer,,Office closed on 26 January.,2026-01-20
+office_order,hi,Director General,Additional Director,,कार्यालय बंद रहेगा।,
+circular,en,Director General,1;2,Republic Day,Celebrations at 9 AM.,
+policy,en,Director General,,Leave Policy,Leave rules apply.,
+"""
+
+
+@override_settings(RENDER_POOL={"ENABLED": False}, RENDER_CACHE={"ENABLED": False})
+class BatchGenerationTests(TestCase):
+    def setUp(self):
+        self.client.force_login(User.objects.create_user("staff", password="x"))
+
+    def archive(self, response):
+        return zipfile.ZipFile(io.BytesIO(b"".join(response.streaming_content)))
+
+    def test_csv_upload_streams_zip_with_numbered_orders(self):
+        OfficeOrderCounter.objects.create(year=2026, counter=41)
+        upload = SimpleUploadedFile("orders.csv", BATCH_CSV.encode("utf-8"))
+        with mock.patch("django.utils.timezone.now", return_value=datetime.datetime(2026, 1, 15)):
+            response = self.client.post(reverse("batch_generate"), {"specs": upload, "format": "docx"})
+
+        self.assertEqual(response["Content-Type"], "application/zip")
+        archive = self.archive(response)
+        self.assertEqual(sorted(archive.namelist()), [
+            "001_Office_Order_en.docx", "002_Office_Order_hi.docx",
+            "003_Circular_en.docx", "004_Policy_en.docx", "manifest.csv",
+        ])
+        manifest = archive.read("manifest.csv").decode()
+        self.assertIn("BISAG-N/Office Order/2026/042", manifest)
+        self.assertIn("बायसेग-एन/कार्यालय आदेश/2026/043", manifest)
+        self.assertIn("BISAG-N/Circular/2026/001", manifest)
+        self.assertIn("BISAG-N/Policy/2026/001", manifest)
+        self.assertEqual(OfficeOrderCounter.objects.get(document_type="office_order", year=2026).counter, 43)
+        self.assertEqual(DocumentLog.objects.filter(user__username="staff").count(), 4)
+
+    def test_json_body_and_both_formats(self):
+        specs = [{"type": "policy", "language": "hi", "from": "Director General",
+                  "to": ["Additional Director"], "subject": "अवकाश नीति", "body": "नियम लागू।"}]
+        with mock.patch("generator.renderers.pdf_engine.render_pdf", return_value=b"%PDF-stub"):
+            response = self.client.post(
+                reverse("batch_generate") + "?format=pdf&format=docx",
+                json.dumps(specs), content_type="application/json",
+            )
+            archive = self.archive(response)
+
+        self.assertEqual(archive.read("001_Policy_hi.pdf"), b"%PDF-stub")
+        self.assertIn("001_Policy_hi.docx", archive.namelist())
+
+    def test_abandoned_stream_cancels_queued_renders(self):
+        render_pool.artifact_store().clear()  # no hits left by other tests
+        self.addCleanup(render_pool.artifact_store().clear)
+        pool = PendingExecutor()
+        submit = pool.submit
+
+        def first_render_finishes(fn, *args):
+            future = submit(fn, *args)
+            if len(pool.futures) == 1:
+                future.set_result(b"PK")
+            return future
+
+        pool.submit = first_render_finishes
+        documents = [(doc_type, samples.sample_context(doc_type, "en")) for doc_type in samples.DOC_TYPES]
+        with self.settings(RENDER_POOL={"ENABLED": True}), \
+                mock.patch.object(render_pool, "get_executor", return_value=pool):
+            stream = batch.iter_zip(documents, formats=("docx",))
+            next(stream)
+            stream.close()  # the client disconnected
+
+        self.assertEqual([future.cancelled() for future in pool.futures], [False, True, True])
+
+    def test_invalid_rows_are_all_reported(self):
+        specs = [
+            {"type": "memo", "language": "en", "from": "Director General", "body": "x"},
+            {"type": "circular", "language": "fr", "from": "Nobody", "to": "99", "body": ""},
+        ]
+        response = self.client.post(reverse("batch_generate"), json.dumps(specs), content_type="application/json")
+
+        self.assertEqual(response.status_code, 400)
+        errors = response.json()["errors"]
+        self.assertTrue(errors[0].startswith("Row 1: unknown type 'memo'"))
+        for problem in ("unknown language 'fr'", "unknown sender 'Nobody'", "unknown recipients 99",
+                        "subject is required", "body is required"):
+            self.assertIn(problem, errors[1])
+        self.assertFalse(OfficeOrderCounter.objects.exists())
+
+
+class RenderCacheTests(SimpleTestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.dir, ignore_errors=True)
+
+    def test_disk_cache_evicts_least_recently_used(self):
+        store = render_cache.DiskArtifactCache(self.dir, max_bytes=350)
+        now = time.time()
+        for age, key in ((30, "aa1"), (20, "bb2"), (10, "cc3")):
+            store.set(key, b"x" * 100)
+            os.utime(store._path(key), (now - age, now - age))
+
+        store.get("aa1")  # used again, so no longer the oldest
+        store.set("dd4", b"x" * 100)
+
+        self.assertIsNone(store.get("bb2"))
+        for key in ("aa1", "cc3", "dd4"):
+            self.assertEqual(store.get(key), b"x" * 100)
+
+    def test_settings_overrides_pick_the_backend(self):
+        with self.settings(RENDER_CACHE={"ENABLED": True, "LOCATION": self.dir}):
+            self.assertEqual(render_cache.get_cache().location, self.dir)
+            with self.settings(RENDER_CACHE={"ENABLED": False}):
+                self.assertIsNone(render_cache.get_cache())
+            self.assertEqual(render_cache.get_cache().location, self.dir)
+
+    def test_keys_change_with_the_data_and_the_template(self):
+        data = samples.sample_context("policy", "en")
+        key = renderers.artifact_key("policy", "docx", data)
+        self.assertEqual(renderers.artifact_key("policy", "docx", dict(data)), key)
+        self.assertNotEqual(renderers.artifact_key("policy", "docx", dict(data, subject="Other")), key)
+        self.assertNotEqual(renderers.artifact_key("policy", "pdf", data), key)
+
+        path = os.path.join(self.dir, "letter.html")
+        templates = [dict(settings.TEMPLATES[0], DIRS=[self.dir], APP_DIRS=False)]
+        with self.settings(TEMPLATES=templates):
+            with open(path, "w", encoding="utf-8") as f:
+                f.write("{{ body }}")
+            before = render_cache.template_version("letter.html")
+            with open(path, "w", encoding="utf-8") as f:
+                f.write("<p>{{ body }}</p>")
+            self.assertNotEqual(render_cache.template_version("letter.html"), before)
+
+    def test_django_cache_clear_keeps_other_entries(self):
+        store = render_cache.DjangoArtifactCache("default")
+        caches["default"].set("unrelated", "kept")
+        self.addCleanup(caches["default"].clear)
+        store.set("abc", b"artifact")
+
+        store.clear()
+
+        self.assertIsNone(store.get("abc"))
+        self.assertEqual(caches["default"].get("unrelated"), "kept")
+
+
+@override_settings(RENDER_POOL={"ENABLED": False}, RENDER_CACHE={"ENABLED": False})
+class RenderJobTests(TestCase):
+    def setUp(self):
+        self.addCleanup(render_pool.artifact_store().clear)
+        self.client.post(reverse("result_policy"), StoredDocumentTests.post)
+
+    def test_finished_job_status_and_download(self):
+        job = self.client.post(reverse("enqueue_render", args=[self.client.session["policy_data"], "docx"])).json()
+        self.assertEqual(job["status"], "done")
+
+        status = self.client.get(job["status_url"]).json()
+        self.assertEqual((status["status"], status["download_url"]), ("done", job["download_url"]))
+        response = self.client.get(job["download_url"])
+        self.assertEqual(response["Content-Disposition"], 'attachment; filename="Policy.docx"')
+        self.assertEqual(response.content[:2], b"PK")
+
+    def test_jobs_render_the_document_their_page_shows(self):
+        shown = self.client.session["policy_data"]
+        self.client.post(reverse("result_policy"), dict(StoredDocumentTests.post, subject="Travel Policy"))  # another tab
+
+        job = self.client.post(reverse("enqueue_render", args=[shown, "docx"])).json()
+        self.assertEqual(
+            RenderJob.objects.get(id=job["job_id"]).cache_key,
+            renderers.artifact_key("policy", "docx", history.load(shown)[1]),
+        )
+        self.assertEqual(self.client.post(reverse("enqueue_render", args=["nope", "docx"])).status_code, 404)
+        self.assertEqual(self.client.post(reverse("enqueue_render", args=[shown, "txt"])).status_code, 404)
+
+    def test_pending_job_cannot_be_downloaded_yet(self):
+        job = RenderJob.objects.create(
+            document_type="policy", format="docx", cache_key="x" * 64, document_id=self.client.session["policy_data"]
+        )
+
+        self.assertEqual(self.client.get(reverse("render_job_status", args=[job.id])).json()["status"], "queued")
+        response = self.client.get(reverse("render_job_download", args=[job.id]))
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.json()["status"], "queued")
+        self.assertEqual(self.client.get(reverse("render_job_status", args=[uuid.uuid4()])).status_code, 404)
+
+    def test_evicted_job_is_rendered_again_from_its_document(self):
+        job = self.client.post(reverse("enqueue_render", args=[self.client.session["policy_data"], "docx"])).json()
+        render_pool.artifact_store().clear()
+
+        self.assertEqual(self.client.get(job["download_url"]).content[:2], b"PK")
+
+        render_pool.artifact_store().clear()
+        with mock.patch.object(history, "load", return_value=None):  # the document was deleted meanwhile
+            self.assertEqual(self.client.get(job["download_url"]).status_code, 404)
+
+    def test_old_finished_and_stuck_jobs_are_pruned(self):
+        public_id = self.client.session["policy_data"]
+        now = datetime.datetime.now(datetime.timezone.utc)
+        retention = datetime.timedelta(seconds=render_pool.pool_settings()["JOB_RETENTION"])
+
+        def job(status, finished_at=None, created_at=now):
+            job = RenderJob.objects.create(
+                document_type="policy", format="docx", cache_key="x" * 64, document_id=public_id,
+                status=status, finished_at=finished_at,
+            )
+            RenderJob.objects.filter(id=job.id).update(created_at=created_at)
+            return job.id
+
+        pruned = [
+            job(RenderJob.DONE, now - 2 * retention),
+            job(RenderJob.FAILED, now - 2 * retention),  # superseded
+            job(RenderJob.QUEUED, created_at=now - datetime.timedelta(days=2)),
+        ]
+        kept = [job(RenderJob.DONE, now), job(RenderJob.QUEUED), job(RenderJob.RUNNING)]
+
+        self.assertEqual(render_pool.prune_jobs(), 3)
+        self.assertEqual(set(RenderJob.objects.values_list("id", flat=True)), set(kept))
+        self.assertFalse(RenderJob.objects.filter(id__in=pruned).exists())
+
+    def test_failed_pdf_engine_does_not_stop_worker_warm_up(self):
+        with mock.patch("generator.pdf_engine.get_engine", side_effect=OSError("no pango")), \
+                mock.patch("generator.docx_engine.engine.skeleton") as skeleton:
+            render_worker.warm_up()
+        self.assertTrue(skeleton.called)
+
+    def test_broken_pool_is_replaced(self):
+        broken = mock.Mock()
+        broken.submit.side_effect = BrokenProcessPool("worker died")
+        fresh = mock.Mock()
+        with mock.patch.object(render_pool, "_executor", broken), \
+                mock.patch.object(render_pool, "ProcessPoolExecutor", return_value=fresh):
+            future = render_pool.pool_submit(len, "ab")
+
+        self.assertIs(future, fresh.submit.return_value)
+        broken.shutdown.assert_called_once_with(wait=False, cancel_futures=True)
+
+
+class PdfEngineTests(SimpleTestCase):
+    def test_concurrent_renders_do_not_share_an_engine(self):
+        both_rendering = threading.Barrier(2, timeout=5)
+        used = []
+
+        class Engine:
+            def render(self, template_name, context):
+                used.append(self)
+                if len(used) <= 2:
+                    both_rendering.wait()
+                return b"%PDF"
+
+        with mock.patch.object(pdf_engine, "PdfEngine", Engine), mock.patch.object(pdf_engine, "_idle", []):
+            threads = [threading.Thread(target=pdf_engine.render_pdf, args=("t.html", {})) for _ in range(2)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            pdf_engine.render_pdf("t.html", {})
+
+        self.assertEqual(len(set(used[:2])), 2)
+        self.assertIn(used[2], used[:2])  # an idle engine is reused
+
+
+class DocxEngineTests(SimpleTestCase):
+    def text(self, content):
+        from docx import Document
+        doc = Document(io.BytesIO(content))
+        return [p.text for p in doc.paragraphs], [[c.text for c in row.cells] for t in doc.tables for row in t.rows]
+
+    def render(self, doc_type, data):
+        return docx_engine.render_docx(document_model.build(doc_type, data))
+
+    def test_skeleton_fill_matches_full_layout(self):
+        for doc_type in samples.DOC_TYPES:
+            for lang in samples.LANGUAGES:
+                data = samples.sample_context(doc_type, lang)
+                model = document_model.build(doc_type, data)
+                with self.subTest(doc_type=doc_type, lang=lang):
+                    filled = self.text(docx_engine.engine.render(model))
+                    self.assertEqual(filled, self.text(docx_engine.engine.render(model, cached=False)))
+                    self.assertIn(data["body"], filled[0])
+                    self.assertFalse(any("{{" in p for p in filled[0]))
+
+    def test_skeleton_is_built_once_per_layout(self):
+        engine = docx_engine.DocxEngine()
+        with mock.patch.object(docx_engine, "LAYOUTS", dict(docx_engine.LAYOUTS)) as layouts:
+            build = mock.Mock(side_effect=docx_engine.circular_skeleton)
+            layouts["circular"] = (build, docx_engine.fill_circular)
+            for lang in ("en", "en", "hi"):
+                engine.render(document_model.build("circular", samples.sample_context("circular", lang)))
+        self.assertEqual(build.call_count, 2)
+
+    def test_optional_parts_are_dropped(self):
+        data = dict(samples.sample_context("circular", "en"), reference="", to_people=[])
+        paragraphs, rows = self.text(self.render("circular", data))
+        self.assertFalse(any(p.startswith("Ref") for p in paragraphs))
+        self.assertEqual(rows, [])
+
+        people = samples.sample_context("circular", "en")["to_people"][:2]
+        _, rows = self.text(self.render("circular", dict(data, to_people=people)))
+        self.assertEqual([r[:2] for r in rows[1:]], [["1", people[0]["name_en"]], ["2", people[1]["name_en"]]])
+
+    def test_missing_fields_are_left_blank(self):
+        for doc_type in samples.DOC_TYPES:
+            data = dict(samples.sample_context(doc_type, "en"), subject=None, body=None)
+            del data["from"]
+            with self.subTest(doc_type=doc_type):
+                paragraphs, _ = self.text(self.render(doc_type, data))
+                self.assertFalse(any("{{" in p or "None" in p for p in paragraphs))
+
+    def test_hindi_text_gets_complex_script_font_size_and_weight(self):
+        from docx import Document
+        doc = Document(io.BytesIO(self.render("office_order", samples.sample_context("office_order", "hi"))))
+        fonts = doc.styles["Normal"].element.rPr.rFonts
+        self.assertEqual(fonts.get("{http://schemas.openxmlformats.org/wordprocessingml/2006/main}cs"),
+                         docx_engine.COMPLEX_SCRIPT_FONT)
+        header = doc.paragraphs[0].runs[0]
+        self.assertTrue(header.font.cs_bold)
+        self.assertIn('<w:szCs w:val="28"/>', header._r.xml)
+
+
+class LetterheadAssetTests(SimpleTestCase):
+    def test_logo_is_prepared_once_at_print_size(self):
+        logo = assets.get("logo")
+        self.assertIs(assets.get("logo"), logo)
+        self.assertEqual(logo.height, round(assets.IMAGES["logo"][1] * assets.DPI))
+        self.assertLess(len(logo.data), os.path.getsize(assets.IMAGES["logo"][0]))
+        self.assertEqual(base64.b64decode(logo.data_uri.split(",", 1)[1]), logo.data)
+
+    def test_documents_embed_the_prepared_logo(self):
+        logo = assets.get("logo")
+        model = document_model.build("circular", samples.sample_context("circular", "hi"))
+        self.assertIn(f'src="{logo.data_uri}"', render_to_string("generator/pdf_circular.html", {"document": model}))
+
+        with zipfile.ZipFile(io.BytesIO(docx_engine.render_docx(model))) as package:
+            media = [package.read(n) for n in package.namelist() if n.startswith("word/media/")]
+        self.assertEqual(media, [logo.data])
+
+
+class TemplateFragmentTests(SimpleTestCase):
+    def test_pdf_templates_render_the_same_with_fragments(self):
+        for doc_type, template_name in samples.PDF_TEMPLATES.items():
+            for lang in samples.LANGUAGES:
+                data = {"document": document_model.build(doc_type, samples.sample_context(doc_type, lang))}
+                with self.subTest(doc_type=doc_type, lang=lang):
+                    with fragments.disabled():
+                        full = render_to_string(template_name, data)
+                    self.assertEqual(render_to_string(template_name, data), full)
+                    self.assertEqual(render_to_string(template_name, data), full)
+
+    def test_block_is_rendered_once_per_variant(self):
+        calls = []
+        tick = lambda: calls.append(1) or len(calls)
+        block = Template("{% load fragments %}{% fragment lang %}{{ lang }}{{ tick }}{% endfragment %}")
+        render = lambda lang: block.render(TemplateContext({"lang": lang, "tick": tick}))
+
+        self.assertEqual([render("en"), render("en"), render("hi"), render("en")], ["en1", "en1", "hi2", "en1"])
+        registry.changed.send(sender=registry.Registry, registry=None, previous=None)
+        self.assertEqual(render("en"), "en3")
+
+
+class RegistryTests(TestCase):
+    def setUp(self):
+        self.base_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.base_dir)
+        for filename in registry.FILES.values():
+            shutil.copy(settings.BASE_DIR / filename, self.base_dir)
+        override = override_settings(BASE_DIR=self.base_dir, REGISTRY={"RELOAD_INTERVAL": 0})
+        override.enable()
+        self.addCleanup(override.disable)
+        registry.reset()
+        self.addCleanup(registry.reset)
+
+    def write_people(self, people, raw=None):
+        path = f"{self.base_dir}/circular.json"
+        with open(path, encoding="utf-8") as f:
+            circular = json.load(f)
+        circular["people"] = people
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(raw if raw is not None else json.dumps(circular))
+        stat = os.stat(path)
+        os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+
+    def test_people_resolve_in_directory_order(self):
+        reg = registry.current()
+        first, second, third = (dict(p) for p in reg.people[:3])
+        self.assertEqual(reg.resolve_people([third["id"], "1", 99, str(second["id"]), 1]), [first, second, third])
+        self.assertEqual(
+            views.circular_data("en", "01-01-2026", "S", "B", "", [2, 3])["to_people"],
+            [p for p in reg.resolve_people(range(1, 4)) if p["id"] in (2, 3)],
+        )
+        with self.assertRaises(TypeError):
+            reg.people_by_id["1"] = None
+
+    def test_designations_per_language(self):
+        reg = registry.current()
+        key = reg.designation_options[0]
+        self.assertEqual(reg.designation(key, "hi"), "महानिदेशक")
+        self.assertEqual(reg.designation_labels(["Nobody", key], "en"), ["Director General"])
+        data = views.policy_data("hi", "01-01-2026", "S", "B", key, [key])
+        self.assertEqual(data["to_list"], ["महानिदेशक"])
+        self.assertEqual(json.loads(json.dumps(data))["header"], data["header"])
+
+    def test_edited_file_is_reloaded_and_bad_edit_ignored(self):
+        before = registry.current()
+        self.assertIs(registry.current(), before)
+        received = []
+        handler = lambda registry, previous, **kwargs: received.append((registry, previous))
+        registry.changed.connect(handler)
+        self.addCleanup(registry.changed.disconnect, handler)
+
+        # A touch (new mtime, same content) keeps the snapshot
+        os.utime(f"{self.base_dir}/policy.json", ns=(0, 10**18))
+        self.assertIs(registry.current(), before)
+
+        docx_engine.engine.skeleton(document_model.build("circular", samples.sample_context("circular", "en")))
+        self.write_people([{"id": 7, "name_en": "Shri A", "name_hi": "श्री ए", "designation_en": "DG", "designation_hi": "महा"}])
+        reloaded = registry.current()
+        self.assertEqual(received, [(reloaded, before)])
+        self.assertEqual(docx_engine.engine._skeletons, {})
+        self.assertEqual([p["id"] for p in reloaded.people], [7])
+        self.assertEqual(batch.validate([{"type": "circular", "from": "Director General", "to": "7",
+                                          "subject": "S", "body": "B"}])[0]["to"], ["7"])
+
+        with mock.patch("builtins.print") as printed:
+            self.write_people([], raw="{not json")
+            self.assertIs(registry.current(), reloaded)
+            self.assertIs(registry.current(), reloaded)
+        self.assertEqual(printed.call_count, 1)
+        self.assertEqual(len(received), 1)
+
+    @override_settings(REGISTRY={"RELOAD_INTERVAL": 0, "PEOPLE_SOURCE": "database"})
+    def test_people_can_come_from_the_database(self):
+        file_people = registry.current().people
+        self.assertEqual(len(file_people), len(registry.current().people_by_id))
+
+        call_command("load_people", file=f"{self.base_dir}/circular.json", stdout=io.StringIO())
+        self.assertEqual(registry.current().people, file_people)
+
+        person = Person.objects.get(id=2)
+        person.name_en = "Shri New Name"
+        person.save()
+        Person.objects.filter(id=3).update(active=False)
+        Person.objects.create(name_en="Ms. Added", designation_en="Scientist", position=0)
+
+        reg = registry.current()
+        self.assertEqual(reg.people[1]["name_en"], "Ms. Added")
+        self.assertEqual(reg.resolve_people([2, 3])[0]["name_en"], "Shri New Name")
+        self.assertFalse(reg.is_person(3))
+
+
+def session_data(client, doc_type):
+    """Data of the document the session points at"""
+    return history.load(client.session[renderers.DOCUMENTS[doc_type]["session_key"]], doc_type)[1]
+
+
+class ReferenceCounterTests(TestCase):
+    def test_reserve_hands_out_consecutive_blocks(self):
+        self.assertEqual(list(OfficeOrderCounter.reserve(2026, 3)), [1, 2, 3])
+        self.assertEqual(OfficeOrderCounter.get_next_number(2026), 4)
+        self.assertEqual(list(OfficeOrderCounter.reserve(2026, 2)), [5, 6])
+
+    def test_sequences_are_per_type_and_year(self):
+        OfficeOrderCounter.reserve(2026, 5)
+        self.assertEqual(OfficeOrderCounter.get_next_number(2026, "circular"), 1)
+        self.assertEqual(OfficeOrderCounter.get_next_number(2027), 1)
+        self.assertEqual(OfficeOrderCounter.get_next_number(2026), 6)
+
+    def test_number_is_two_queries_once_the_row_exists(self):
+        OfficeOrderCounter.reserve(2026, 1)
+        with CaptureQueriesContext(connection) as ctx:
+            OfficeOrderCounter.reserve(2026, 10)
+
+        statements = [q["sql"].split()[0] for q in ctx.captured_queries if "SAVEPOINT" not in q["sql"]]
+        self.assertEqual(statements, ["UPDATE", "SELECT"])
+
+    def test_result_views_number_each_type(self):
+        post = {"language": "en", "date": "2026-01-20", "subject": "S", "body": "B", "from_position": "Director General"}
+        self.client.post(reverse("result_circular"), dict(post, **{"to[]": ["1"]}))
+        self.client.post(reverse("result_policy"), dict(post, **{"to_recipients[]": ["Additional Director"]}))
+        self.client.post(reverse("result_policy"), dict(post, **{"to_recipients[]": ["Additional Director"]}))
+
+        self.assertTrue(session_data(self.client, "circular")["reference"].startswith("BISAG-N/Circular/"))
+        self.assertTrue(session_data(self.client, "policy")["reference"].endswith("/002"))
+
+
+class DocumentHistoryTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user("clerk", password="x")
+        self.client.force_login(self.user)
+
+    def issue(self, subject, body, lang="en"):
+        self.client.post(reverse("result_policy"), {
+            "language": lang, "date": "2026-01-20", "subject": subject, "body": body,
+            "from_position": "Director General", "to_recipients[]": ["Additional Director"],
+        })
+        return session_data(self.client, "policy")["reference"]
+
+    def history(self, **params):
+        return self.client.get(reverse("history"), params).context
+
+    def test_result_views_record_issued_documents(self):
+        reference = self.issue("Leave Policy", "Earned leave rules.")
+        self.client.post(reverse("result_circular"), {
+            "language": "hi", "date": "2026-01-20", "subject": "बैठक", "body": "सूचना",
+            "from_position": "Director General", "to[]": ["1"],
+        })
+
+        policy, circular = DocumentLog.objects.order_by("id")
+        self.assertEqual((policy.document_type, policy.reference_id, policy.user), ("Policy", reference, self.user))
+        self.assertEqual((policy.date_issued, policy.subject, policy.body), ("20-01-2026", "Leave Policy", "Earned leave rules."))
+        self.assertEqual(policy.to_recipients, "Additional Director")
+        self.assertEqual((circular.document_type, circular.language, circular.subject), ("Circular", "hi", "बैठक"))
+
+    def test_search_words_prefix_hindi_and_reference(self):
+        self.issue("Leave Policy", "Earned leave rules for officers.")
+        travel = self.issue("Travel Policy", "Tour allowance rules.")
+        self.issue("अवकाश नीति", "अधिकारियों के लिए अवकाश नियम।", lang="hi")
+
+        def subjects(q):
+            return [e.subject for e in self.history(q=q)["entries"]]
+
+        self.assertEqual(subjects("rules"), ["Travel Policy", "Leave Policy"])
+        self.assertEqual(subjects("leave offic"), ["Leave Policy"])
+        self.assertEqual(subjects("अवकाश"), ["अवकाश नीति"])
+        self.assertEqual(subjects(travel), ["Travel Policy"])
+        self.assertEqual(subjects('"AND OR'), [])
+
+    def test_keyset_pages_cover_every_document_once(self):
+        history.record_many([("policy", samples.sample_context("policy", "en", seed=i)) for i in range(60)], self.user)
+        # Ties on created_at are broken by id
+        DocumentLog.objects.filter(id__lte=DocumentLog.objects.order_by("id")[29].id).update(
+            created_at=datetime.datetime(2026, 1, 1, tzinfo=datetime.timezone.utc))
+
+        for q in ("", "competent"):
+            seen, cursor = [], None
+            while True:
+                context = self.history(q=q, after=cursor or "")
+                seen += [e.id for e in context["entries"]]
+                cursor = context["next_cursor"]
+                if cursor is None:
+                    break
+            self.assertEqual(len(seen), 60)
+            self.assertEqual(set(seen), set(DocumentLog.objects.values_list("id", flat=True)))
+
+    def test_history_is_per_user_unless_staff_asks_for_all(self):
+        self.issue("Mine", "Body.")
+        other = User.objects.create_user("other", password="x", is_staff=True)
+        history.record("policy", samples.sample_context("policy", "en"), other)
+
+        self.assertEqual([e.subject for e in self.history(scope="all")["entries"]], ["Mine"])
+        self.client.force_login(other)
+        self.assertEqual(len(self.history()["entries"]), 1)
+        self.assertEqual(len(self.history(scope="all")["entries"]), 2)
+
+
+@override_settings(RENDER_CACHE={"ENABLED": False})
+class StoredDocumentTests(TestCase):
+    post = {
+        "language": "en", "date": "2026-01-20", "subject": "Leave Policy", "body": "Rules.\n" * 200,
+        "from_position": "Director General", "to_recipients[]": ["Additional Director"],
+    }
+
+    def test_session_holds_only_the_document_id(self):
+        response = self.client.post(reverse("result_policy"), self.post)
+        public_id = self.client.session["policy_data"]
+
+        self.assertIsInstance(public_id, str)
+        self.assertLess(len(public_id), 16)
+        self.assertLess(len(self.client.session.encode(dict(self.client.session.items()))), 200)
+        self.assertEqual(DocumentLog.objects.get(public_id=public_id).payload["body"], self.post["body"])
+        self.assertContains(response, reverse("download_document", args=[public_id, "docx"]))
+
+    def test_documents_download_by_id_from_any_session(self):
+        self.client.post(reverse("result_policy"), self.post)
+        public_id = self.client.session["policy_data"]
+
+        from_session = self.client.get(reverse("download_policy_docx"))
+        by_id = Client().get(reverse("download_document", args=[public_id, "docx"]))
+        self.assertEqual(by_id.status_code, 200)
+        self.assertEqual(by_id["Content-Disposition"], 'attachment; filename="Policy.docx"')
+        self.assertEqual(by_id.content[:2], from_session.content[:2])
+
+        self.assertEqual(Client().get(reverse("download_document", args=["nope", "docx"])).status_code, 404)
+        self.assertEqual(Client().get(reverse("download_document", args=[public_id, "txt"])).status_code, 404)
+
+    def test_download_is_two_small_queries(self):
+        self.client.post(reverse("result_policy"), self.post)
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(reverse("download_policy_docx"))
+        self.assertEqual(len(queries), 2)  # session row, then the document's payload
+
+    def test_sessions_holding_whole_documents_still_download(self):
+        session = self.client.session
+        session["policy_data"] = samples.sample_context("policy", "en")
+        session.save()
+        self.assertEqual(self.client.get(reverse("download_policy_docx")).status_code, 200)
+
+
+@override_settings(RENDER_POOL={"ENABLED": False}, RENDER_CACHE={"ENABLED": False})
+class DocumentExportTests(TestCase):
+    def test_model_blocks_follow_the_printed_layout(self):
+        data = samples.sample_context("circular", "hi", paragraphs=2, recipients=3)
+        model = document_model.build("circular", data)
+
+        self.assertEqual([b.kind for b in model.blocks], [
+            "logo", "header", "title", "reference", "date", "subject", "body", "from", "signatures",
+        ])
+        self.assertEqual(model.title, "परिपत्र")
+        self.assertEqual(len(model.block("body").lines), 2)
+        signatures = model.block("signatures")
+        self.assertEqual(signatures.columns, ("क्र.", "नाम", "हस्ताक्षर"))
+        self.assertEqual([row[0] for row in signatures.rows], ["1", "2", "3"])
+
+        del data["reference"]
+        self.assertIsNone(document_model.build("circular", data).block("reference"))
+
+    def test_html_is_rendered_from_the_model(self):
+        data = samples.sample_context("policy", "en", recipients=2)
+        html = renderers.render_artifact("policy", "html", data).decode("utf-8")
+
+        self.assertIn("<title>POLICY</title>", html)
+        self.assertIn(f"Subject: {data['subject']}", html)
+        for recipient in data["to_list"]:
+            self.assertIn(f"<div>{recipient}</div>", html)
+        self.assertEqual(html.count("<p>"), 3)
+
+    def test_pdf_and_docx_are_rendered_from_the_model_blocks(self):
+        model = document_model.build("circular", samples.sample_context("circular", "en", recipients=2))
+        model.block("subject").text = "Subject from the block"
+        model.block("signatures").rows = (("1", "Shri Block", ""),)
+
+        with mock.patch("generator.renderers.pdf_engine.render_pdf", return_value=b"%PDF") as render_pdf:
+            renderers.render_model(model, "pdf")
+        outputs = {
+            "pdf": render_to_string(*render_pdf.call_args.args),
+            "docx": zipfile.ZipFile(io.BytesIO(renderers.render_model(model, "docx"))).read(
+                "word/document.xml").decode("utf-8"),
+        }
+
+        for fmt, output in outputs.items():
+            with self.subTest(fmt):
+                self.assertIn("Subject from the block", output)
+                self.assertIn("Shri Block", output)
+                self.assertNotIn(model.data["subject"], output)
+
+    def test_every_format_and_the_preview_print_the_model_labels(self):
+        data = samples.sample_context("policy", "en")
+        self.addCleanup(docx_engine.engine.clear)
+        with mock.patch.dict(document_model.LABELS["policy"]["en"], {"subject": "Re:", "to": "Distribution:"}):
+            docx_engine.engine.clear()
+            with mock.patch("generator.renderers.pdf_engine.render_pdf", return_value=b"%PDF") as render_pdf:
+                renderers.render_artifact("policy", "pdf", data)
+            outputs = {
+                "pdf": render_to_string(*render_pdf.call_args.args),
+                "docx": zipfile.ZipFile(io.BytesIO(renderers.render_artifact("policy", "docx", data))).read(
+                    "word/document.xml").decode("utf-8"),
+                "html": renderers.render_artifact("policy", "html", data).decode("utf-8"),
+                "preview": self.client.post(reverse("result_policy"), StoredDocumentTests.post).content.decode(),
+            }
+
+        for fmt, output in outputs.items():
+            with self.subTest(fmt):
+                self.assertIn("Re:", output)
+                self.assertIn("Distribution:", output)
+                self.assertNotIn("Subject:", output)
+
+    def test_export_zips_every_format_built_from_one_model(self):
+        data = samples.sample_context("office_order", "en")
+        entry = history.record("office_order", data, None)
+
+        with mock.patch("generator.renderers.pdf_engine.render_pdf", return_value=b"%PDF-stub"), \
+                mock.patch.object(document_model, "build", wraps=document_model.build) as build:
+            response = self.client.get(reverse("export_document", args=[entry.public_id]))
+
+        self.assertEqual(response["Content-Disposition"], 'attachment; filename="Office_Order.zip"')
+        archive = zipfile.ZipFile(io.BytesIO(response.content))
+        self.assertEqual(archive.namelist(), ["Office_Order.pdf", "Office_Order.docx", "Office_Order.html"])
+        self.assertEqual(archive.read("Office_Order.pdf"), b"%PDF-stub")
+        self.assertIn(data["reference"], archive.read("Office_Order.html").decode("utf-8"))
+        self.assertEqual(build.call_count, 1)
+
+        self.assertEqual(self.client.get(reverse("export_document", args=["nope"])).status_code, 404)
+
+
+class PendingExecutor:
+    """Stands in for the render pool: submitted renders wait until the test settles them"""
+
+    def __init__(self):
+        self.futures = []
+
+    def submit(self, fn, *args):
+        future = Future()
+        self.futures.append(future)
+        return future
+
+
+@override_settings(RENDER_POOL={"ENABLED": True, "PRERENDER": True}, RENDER_CACHE={"ENABLED": False})
+class SpeculativeRenderTests(TransactionTestCase):  # renders settle on another thread
+    post = StoredDocumentTests.post
+
+    def setUp(self):
+        self.pool = PendingExecutor()
+        self.enterContext(mock.patch.object(render_pool, "get_executor", return_value=self.pool))
+        self.addCleanup(lambda: [future.cancel() for future in self.pool.futures])
+        self.addCleanup(render_pool.artifact_store().clear)
+
+    def speculate(self, fmt):
+        return self.client.post(reverse("enqueue_render", args=[self.client.session["policy_data"], fmt]), {"speculative": "1"})
+
+    def test_download_waits_for_the_preview_render(self):
+        self.client.post(reverse("result_policy"), self.post)
+        self.assertEqual(self.speculate("docx").status_code, 202)
+        self.assertEqual(self.speculate("docx").status_code, 202)
+        self.assertEqual(len(self.pool.futures), 1)  # the second request shares the render
+
+        def finish():
+            self.pool.futures[0].set_result(b"PK-speculative")
+            connection.close()
+
+        worker = threading.Timer(0.1, finish)
+        worker.start()
+        with mock.patch.object(renderers, "render_artifact") as render:
+            response = self.client.get(reverse("download_policy_docx"))
+        worker.join()
+
+        self.assertEqual(response.content, b"PK-speculative")
+        render.assert_not_called()
+        self.assertEqual(set(RenderJob.objects.values_list("status", flat=True)), {RenderJob.DONE})
+
+    def test_resubmitting_cancels_the_previous_speculation(self):
+        self.client.post(reverse("result_policy"), self.post)
+        self.speculate("pdf")
+        self.speculate("docx")
+        self.client.post(reverse("enqueue_render", args=[self.client.session["policy_data"], "pdf"]))  # clicked
+        self.client.post(reverse("result_policy"), dict(self.post, body="Edited rules."))
+
+        pdf, docx = self.pool.futures
+        self.assertFalse(pdf.cancelled())
+        self.assertTrue(docx.cancelled())
+        job = RenderJob.objects.get(format="docx")
+        self.assertEqual((job.status, job.error), (RenderJob.FAILED, "Superseded by a newer document"))
+
+    def test_no_speculation_without_the_pool(self):
+        self.client.post(reverse("result_policy"), self.post)
+        with self.settings(RENDER_POOL={"ENABLED": False}):
+            self.assertEqual(self.speculate("pdf").status_code, 204)
+        self.assertFalse(RenderJob.objects.exists())
+
+
+@override_settings(METRICS={"ENABLED": True}, RENDER_CACHE={"ENABLED": False}, AI_PROVIDER="stub")
+class MetricsTests(TestCase):
+    def setUp(self):
+        metrics.reset()
+        self.addCleanup(metrics.reset)
+
+    def series(self, stage, document, language):
+        labels = f'stage="{stage}",document="{document}",language="{language}"'
+        body = self.client.get(reverse("metrics")).content.decode()
+        return {
+            line.split(" ")[0].split("{")[0].rsplit("_", 1)[1]: line.rsplit(" ", 1)[1]
+            for line in body.splitlines() if labels in line and 'le="' not in line
+        }
+
+    def test_stages_are_recorded_per_document_and_language(self):
+        self.client.post(reverse("result_policy"), StoredDocumentTests.post)
+        self.client.get(reverse("download_policy_docx"))
+        self.client.get(reverse("download_policy_docx"))
+        llm.draft("circular", "body", "hi", "Holiday list")
+
+        self.assertEqual(self.series("session_read", "policy", "en")["count"], "2")
+        self.assertEqual(self.series("docx_build", "policy", "en")["count"], "2")
+        self.assertEqual(self.series("llm_call", "circular", "hi")["count"], "1")
+
+        response = self.client.get(reverse("metrics"))
+        self.assertEqual(response["Content-Type"], "text/plain; version=0.0.4; charset=utf-8")
+        self.assertIn("# TYPE generator_stage_seconds histogram", response.content.decode())
+        self.assertIn(
+            'generator_stage_seconds_bucket{stage="docx_build",document="policy",language="en",le="+Inf"} 2',
+            response.content.decode(),
+        )
+
+    def test_unknown_label_values_share_one_series(self):
+        with use_model(StubModel()):
+            for lang in ("fr", "de", "xx"):
+                llm.draft("circular", "body", lang, f"Holiday list {lang}")
+        metrics.observe("made_up", "letter", "fr", 0.1)
+
+        self.assertEqual(self.series("llm_call", "circular", "en")["count"], "3")
+        self.assertEqual(self.series("other", "other", "other")["count"], "1")
+        self.assertNotIn('language="fr"', metrics.exposition())
+
+    def test_buckets_are_cumulative(self):
+        for seconds in (0.0005, 0.003, 0.003, 60):
+            metrics.observe("pdf_layout", "circular", "en", seconds)
+        body = metrics.exposition()
+        labels = 'stage="pdf_layout",document="circular",language="en"'
+        self.assertIn(f'generator_stage_seconds_bucket{{{labels},le="0.001"}} 1', body)
+        self.assertIn(f'generator_stage_seconds_bucket{{{labels},le="0.005"}} 3', body)
+        self.assertIn(f'generator_stage_seconds_bucket{{{labels},le="30.0"}} 3', body)
+        self.assertIn(f'generator_stage_seconds_bucket{{{labels},le="+Inf"}} 4', body)
+        self.assertIn(f"generator_stage_seconds_count{{{labels}}} 4", body)
+
+    def test_disabled_records_nothing_and_hides_endpoint(self):
+        with override_settings(METRICS={"ENABLED": False}):
+            with metrics.timer("docx_build", "policy", "en") as timing:
+                timing.language = "hi"
+            self.assertEqual(self.client.get(reverse("metrics")).status_code, 404)
+        self.assertNotIn("docx_build", metrics.exposition())
+
+    def test_token_is_required_when_set(self):
+        with override_settings(METRICS={"ENABLED": True, "TOKEN": "s3cret"}):
+            self.assertEqual(self.client.get(reverse("metrics")).status_code, 401)
+            response = self.client.get(reverse("metrics"), HTTP_AUTHORIZATION="Bearer s3cret")
+            self.assertEqual(response.status_code, 200)
+
+
+class ProfilingTests(TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        conf = {"ENABLED": True, "SAMPLE_RATE": 0, "DIRECTORY": self.directory, "MAX_FILES": 2}
+        self.enterContext(override_settings(PROFILING=conf))
+
+    def test_signed_requests_are_profiled_per_endpoint(self):
+        token = profiling.make_token()
+        for _ in range(3):
+            self.client.get(reverse("policy_form"), HTTP_X_PROFILE_REQUEST=token)
+        self.client.get(reverse("policy_form"))
+        self.client.get(reverse("policy_form"), HTTP_X_PROFILE_REQUEST=token + "x")
+
+        self.assertEqual(profiling.endpoints(), {"policy_form": 2})  # newest MAX_FILES kept
+        functions = profiling.hot_functions("policy_form", sort="cumtime")
+        self.assertTrue(any("policy_form" in f["function"] for f in functions))
+
+    def test_sample_rate_picks_requests_at_random(self):
+        with override_settings(PROFILING={"ENABLED": True, "SAMPLE_RATE": 1, "DIRECTORY": self.directory}):
+            self.client.get(reverse("login"))
+        self.assertEqual(profiling.endpoints(), {"login": 1})
+
+    def test_disabled_middleware_is_not_installed(self):
+        with override_settings(PROFILING={"ENABLED": False, "SAMPLE_RATE": 1, "DIRECTORY": self.directory}):
+            self.client.get(reverse("login"), HTTP_X_PROFILE_REQUEST=profiling.make_token())
+        self.assertEqual(os.listdir(self.directory), [])
+
+    def test_report_is_staff_only(self):
+        self.client.get(reverse("policy_form"), HTTP_X_PROFILE_REQUEST=profiling.make_token())
+        self.client.force_login(User.objects.create_user("clerk"))
+        self.assertEqual(self.client.get(reverse("profile_report")).status_code, 302)
+
+        self.client.force_login(User.objects.create_user("admin", is_staff=True))
+        response = self.client.get(reverse("profile_report"), {"endpoint": "policy_form", "sort": "cumtime"})
+        self.assertContains(response, "policy_form")
+        self.assertEqual(response.context["count"], 1)
+        self.assertTrue(response.context["functions"])
+
+
+class BenchmarkSuiteTests(TestCase):
+    def test_cases_run_every_step_through_the_views(self):
+        case = benchmarks.Case("circular", "hi", paragraphs=2, recipients=3)
+        with mock.patch("generator.renderers.pdf_engine.render_pdf", return_value=b"%PDF-stub"):
+            report = benchmarks.run([case], iterations=2)
+
+        results = report["results"]["circular/hi/p2/r3"]
+        self.assertEqual(list(results), list(benchmarks.STEPS))
+        for step in results.values():
+            self.assertEqual(set(step), {"median_ms", "p95_ms", "peak_kb"})
+        self.assertEqual(len(DocumentLog.objects.last().payload["to_people"]), 3)
+
+    def test_missing_baseline_fails_before_running(self):
+        with mock.patch.object(benchmarks, "run") as run, self.assertRaisesMessage(CommandError, "No baseline"):
+            call_command("benchmark_suite", baseline=os.path.join(tempfile.gettempdir(), "missing.json"))
+        run.assert_not_called()
+
+    def test_compare_flags_only_real_slowdowns(self):
+        baseline = {"results": {"policy/en/p3/r5": {
+            "submit": {"median_ms": 10.0, "p95_ms": 12.0, "peak_kb": 300.0},
+            "docx": {"median_ms": 1.0, "p95_ms": 1.2},
+        }}}
+        report = {"results": {"policy/en/p3/r5": {
+            "submit": {"median_ms": 20.0, "p95_ms": 25.0, "peak_kb": 320.0},
+            "docx": {"median_ms": 2.5, "p95_ms": 3.0},  # +150% but under MIN_REGRESSION_MS
+        }}}
+        regressions = benchmarks.compare(report, baseline)
+        self.assertEqual(len(regressions), 1)
+        self.assertIn("policy/en/p3/r5 submit median_ms: 10.0 -> 20.0 ms", regressions[0])
+        self.assertEqual(benchmarks.compare(report, baseline, tolerance=1.5), [])
+
+
+@override_settings(AI_PROVIDER="stub", RENDER_CACHE={"ENABLED": False})
+class LoadTestTests(TransactionTestCase):  # users run on their own threads and connections
+    def test_configs_parse(self):
+        self.assertEqual(loadtest.parse_config("asgi:2x8"), ("asgi", 2, 8))
+        for bad in ("wsgi", "wsgi:2", "uwsgi:1x1", "wsgi:0x4"):
+            with self.assertRaises(ValueError):
+                loadtest.parse_config(bad)
+
+    def test_command_keeps_off_the_real_cache_and_test_database(self):
+        command = load_test.Command()
+        workdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, workdir, ignore_errors=True)
+
+        overrides = command.worker_overrides("wsgi", {"ai_latency": 0}, os.path.join(workdir, "render_cache"))
+        self.assertEqual(overrides["RENDER_CACHE"]["LOCATION"], os.path.join(workdir, "render_cache"))
+        self.assertEqual(overrides["RENDER_CACHE"]["BACKEND"], "disk")
+
+        name = loadtest.database_name(workdir)
+        self.assertTrue(name.startswith(workdir))
+        self.assertNotEqual(name, settings.DATABASES["default"].get("TEST", {}).get("NAME"))
+
+    def test_worker_runs_full_flows_per_url_name(self):
+        User.objects.create_user(loadtest.username(0), password=loadtest.PASSWORD)
+        options = {"types": ["circular"], "langs": ["hi"], "formats": ["docx"],
+                   "paragraphs": 1, "recipients": 2, "think": 0}
+
+        summary = loadtest.summarize([loadtest.run_worker("wsgi", 0, 1, 0, options)])
+
+        self.assertEqual(summary["errors"], 0)
+        self.assertEqual(summary["flows"], 1)
+        self.assertEqual(list(summary["urls"]), [
+            "download_circular_docx", "generate_circular_body", "home", "login", "result_circular",
+        ])
+        self.assertEqual(summary["requests"], 4)
+        self.assertGreater(summary["requests_per_second"], 0)
+
+
+class SchemaTests(TestCase):
+    def test_models_match_migrations(self):
+        out = io.StringIO()
+        try:
+            call_command("makemigrations", "generator", check=True, dry_run=True, stdout=out)
+        except SystemExit:
+            self.fail(f"Models and migrations disagree:\n{out.getvalue()}")
+
+    @skipUnless(connection.vendor == "sqlite", "FTS5 triggers are SQLite only")
+    def test_search_index_triggers_survive_migrations(self):
+        # A migration that rebuilds generator_documentlog drops them silently
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT name FROM sqlite_master WHERE type = 'trigger' AND tbl_name = 'generator_documentlog'")
+            triggers = {row[0] for row in cursor.fetchall()}
+        self.assertEqual(triggers, {f"generator_documentlog_fts_{op}" for op in ("insert", "update", "delete")})
+
+
+class ReferenceCounterConcurrencyTests(TransactionTestCase):
+    """
+    Many threads, each with its own DB connection, reserving at once.
+
+    Runs against the configured database: the file based SQLite test DB by
+    default, PostgreSQL when POSTGRES_DB is set.
+    """
+
+    threads = 16
+    reservations = 25
+
+    def hammer(self, document_type, year):
+        barrier = threading.Barrier(self.threads)
+        results, errors = [], []
+
+        def worker(seed):
+            rng = random.Random(seed)
+            try:
+                barrier.wait()
+                for _ in range(self.reservations):
+                    results.extend(OfficeOrderCounter.reserve(year, rng.randint(1, 3), document_type))
+            except Exception as e:
+                errors.append(e)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=worker, args=(i,)) for i in range(self.threads)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        return results, errors
+
+    def test_no_duplicates_or_gaps_under_contention(self):
+        # The row does not exist yet, so the threads also race to create it
+        results, errors = self.hammer("office_order", 2026)
+
+        self.assertEqual(errors, [])
+        self.assertEqual(sorted(results), list(range(1, len(results) + 1)))
+        self.assertEqual(OfficeOrderCounter.objects.get(document_type="office_order", year=2026).counter, len(results))
+
+    def test_types_do_not_share_numbers(self):
+        circulars, errors = self.hammer("circular", 2026)
+        policies, more_errors = self.hammer("policy", 2026)
+
+        self.assertEqual(errors + more_errors, [])
+        self.assertEqual(sorted(circulars), list(range(1, len(circulars) + 1)))
+        self.assertEqual(sorted(policies), list(range(1, len(policies) + 1)))
+
+    def tearDown(self):
+        connections.close_all()
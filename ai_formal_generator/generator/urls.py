@@ -1,6 +1,13 @@
+from django.conf import settings
 from django.urls import path
 from . import views
 
+
+def ai_view(sync_view, async_view):
+    """Drafting endpoints are served by their async variants under ASGI"""
+    return async_view if settings.AI_ASYNC_VIEWS else sync_view
+
+
 urlpatterns = [
     # Authentication
     path("login/", views.login_view, name="login"),
@@ -11,22 +18,43 @@ urlpatterns = [
     path("", views.home, name="home"),
 
     # OFFICE ORDER
-    path("generate-body/", views.generate_body, name="generate_body"),
+    path("generate-body/", ai_view(views.generate_body, views.generate_body_async), name="generate_body"),
     path("result/", views.result_office_order, name="result"),
     path("download/pdf/", views.download_pdf, name="download_pdf"),
     path("download/docx/", views.download_docx, name="download_docx"),
 
     # CIRCULAR
-    path("circular/generate-body/", views.generate_circular_body, name="generate_circular_body"),
+    path("circular/generate-body/", ai_view(views.generate_circular_body, views.generate_circular_body_async), name="generate_circular_body"),
     path("circular/result/", views.result_circular, name="result_circular"),
     path("circular/pdf/", views.download_circular_pdf, name="download_circular_pdf"),
     path("circular/docx/", views.download_circular_docx, name="download_circular_docx"),
     
     # POLICY
     path("policy/", views.policy_form, name="policy_form"),
-    path("policy/generate-title/", views.generate_policy_title, name="generate_policy_title"),
-    path("policy/generate-body/", views.generate_policy_body, name="generate_policy_body"),
+    path("policy/generate-title/", ai_view(views.generate_policy_title, views.generate_policy_title_async), name="generate_policy_title"),
+    path("policy/generate-body/", ai_view(views.generate_policy_body, views.generate_policy_body_async), name="generate_policy_body"),
     path("policy/result/", views.result_policy, name="result_policy"),
     path("policy/pdf/", views.download_policy_pdf, name="download_policy_pdf"),
     path("policy/docx/", views.download_policy_docx, name="download_policy_docx"),
+
+    # BACKGROUND RENDERING
+    path("render/jobs/<uuid:job_id>/", views.render_job_status, name="render_job_status"),
+    path("render/jobs/<uuid:job_id>/download/", views.render_job_download, name="render_job_download"),
+    path("documents/<str:public_id>/render/<str:fmt>/", views.enqueue_render, name="enqueue_render"),
+
+    # BATCH GENERATION
+    path("batch/", views.batch_generate, name="batch_generate"),
+
+    # HISTORY
+    path("history/", views.document_history, name="history"),
+
+    # METRICS (Prometheus scrape target)
+    path("metrics", views.metrics_view, name="metrics"),
+
+    # PROFILES (staff)
+    path("profiles/", views.profile_report, name="profile_report"),
+
+    # STORED DOCUMENTS (by the unguessable id of the issued document)
+    path("documents/<str:public_id>/export/", views.export_document, name="export_document"),
+    path("documents/<str:public_id>/<str:fmt>/", views.download_document, name="download_document"),
 ]
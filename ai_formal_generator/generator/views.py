@@ -1,62 +1,180 @@
-from django.shortcuts import render, redirect
-from django.http import HttpResponse, JsonResponse
+from django.shortcuts import render, redirect, get_object_or_404
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
 from django.conf import settings
 from django.utils import timezone
-from django.template.loader import render_to_string
+from django.urls import reverse
 from django.contrib.auth import authenticate, login as auth_login, logout as auth_logout
 from django.contrib.auth.models import User
 from django.contrib.auth.decorators import login_required
+from django.contrib.admin.views.decorators import staff_member_required
 from django.contrib import messages
+from django.db.models.functions import Substr
 
-from io import BytesIO
-import json, os
-from datetime import datetime
+import asyncio
+import io
+import zipfile
 
-from .models import OfficeOrderCounter
+from .models import DocumentLog, OfficeOrderCounter, RenderJob
+from . import batch, document_model, history, llm, metrics, profiling, registry, renderers, render_pool
 
-from docx import Document
-from docx.enum.text import WD_ALIGN_PARAGRAPH
+from .documents import (
+    format_date_ddmmyyyy,
+    document_reference, office_order_data, circular_data, policy_data,
+)
 
-from weasyprint import HTML, CSS
+import uuid
 
-import google.generativeai as genai
 
-from .constants import DESIGNATION_MAP
+# DOCUMENT SELECTOR - REMOVED
 
-import uuid
 
+# ---------------- AI DRAFTING ----------------
+# Prompts, providers and the draft cache live in generator/llm.py. With
+# stream=1 the reply is sent as chunked plain text while it is generated, so
+# the form can fill the textarea immediately; regenerate=1 skips the cache.
+STREAM_INTERRUPTED = "\n\n[Generation interrupted. Please try again.]"
+
+
+def wants_stream(request):
+    return request.POST.get("stream") == "1"
+
+
+def wants_regenerate(request):
+    return request.POST.get("regenerate") == "1"
+
+
+def streaming_text_response(chunks, cache_status="miss"):
+    response = StreamingHttpResponse(chunks, content_type="text/plain; charset=utf-8")
+    response["Cache-Control"] = "no-cache"
+    response["X-Accel-Buffering"] = "no"  # stop nginx from buffering the stream
+    response["X-Draft-Cache"] = cache_status
+    return response
+
+
+def draft_text_response(text, cache_status):
+    response = HttpResponse(text or "Unable to generate content. Please try again.", status=200)
+    response["X-Draft-Cache"] = cache_status
+    return response
+
+
+def guard_stream(chunks):
+    try:
+        yield from chunks
+    except Exception as e:
+        print(f"[ERROR] Gemini API: streaming failed: {str(e)}")
+        yield STREAM_INTERRUPTED
 
-# DOCUMENT SELECTOR - REMOVED
 
+async def aguard_stream(chunks):
+    try:
+        while True:
+            try:
+                yield await asyncio.wait_for(chunks.__anext__(), timeout=settings.AI_TIMEOUT)
+            except StopAsyncIteration:
+                return
+    except asyncio.TimeoutError:
+        print(f"[ERROR] Gemini API: stream stalled for {settings.AI_TIMEOUT}s")
+        yield STREAM_INTERRUPTED
+    except Exception as e:
+        print(f"[ERROR] Gemini API: streaming failed: {str(e)}")
+        yield STREAM_INTERRUPTED
 
-# ---------------- GEMINI ----------------
-genai.configure(api_key=settings.GEMINI_API_KEY)
-gemini_model = genai.GenerativeModel("models/gemini-2.5-flash")
 
-# ---------------- LOAD JSON ----------------
-BASE_DIR = settings.BASE_DIR
-with open(os.path.join(BASE_DIR, "office_order.json"), encoding="utf-8") as f:
-    OFFICE_ORDER = json.load(f)
+def draft(request, doc_type, field, lang, prompt):
+    """Reply for a drafting request: from the cache, streamed, or generated"""
+    if wants_stream(request):
+        chunks, cache_status = llm.stream_draft(doc_type, field, lang, prompt, wants_regenerate(request))
+        return streaming_text_response(guard_stream(chunks), cache_status)
 
-with open(os.path.join(BASE_DIR, "circular.json"), encoding="utf-8") as f:
-    CIRCULAR = json.load(f)
+    text, cache_status = llm.draft(doc_type, field, lang, prompt, wants_regenerate(request))
+    return draft_text_response(text, cache_status)
 
-with open(os.path.join(BASE_DIR, "policy.json"), encoding="utf-8") as f:
-    POLICY = json.load(f)
 
 # ---------------- HELPERS ----------------
-def format_date_ddmmyyyy(date_str):
+# The session only holds the public_id of the last document of each type;
+# the document itself is stored once, in its DocumentLog row.
+def session_document(request, doc_type):
+    """Data of the last document of doc_type issued in this session, or None"""
+    with metrics.timer("session_read", doc_type) as timing:
+        value = request.session.get(renderers.DOCUMENTS[doc_type]["session_key"])
+        if isinstance(value, dict):
+            data = value  # sessions from before documents were stored
+        else:
+            stored = history.load(value, doc_type) if value else None
+            data = stored[1] if stored else None
+        if data:
+            timing.language = data.get("language")
+    return data
+
+
+def artifact_response(doc_type, fmt, data):
+    content = render_pool.get_artifact(doc_type, fmt, data)
+
+    response = HttpResponse(content, content_type=renderers.CONTENT_TYPES[fmt])
+    response["Content-Disposition"] = f'attachment; filename="{renderers.filename(doc_type, fmt)}"'
+    return response
+
+
+def download_artifact(request, doc_type, fmt):
+    """Send the rendered document of this session as an attachment"""
+    data = session_document(request, doc_type)
+    if not data:
+        return HttpResponse(renderers.DOCUMENTS[doc_type]["missing"], status=400)
+    return artifact_response(doc_type, fmt, data)
+
+
+def download_document(request, public_id, fmt):
+    """Send a stored document, addressed by its public id, as an attachment"""
+    stored = history.load(public_id) if fmt in renderers.FORMATS else None
+    if stored is None:
+        return HttpResponse("Document not found", status=404)
+
+    doc_type, data = stored
+    return artifact_response(doc_type, fmt, data)
+
+
+def export_document(request, public_id):
+    """A stored document in every format (PDF, DOCX, HTML) as one ZIP, rendered concurrently"""
+    stored = history.load(public_id)
+    if stored is None:
+        return HttpResponse("Document not found", status=404)
+
+    doc_type, data = stored
     try:
-        return datetime.strptime(date_str, "%Y-%m-%d").strftime("%d-%m-%Y")
-    except Exception:
-        return date_str
+        files = render_pool.render_formats(doc_type, data)
+    except Exception as e:
+        print(f"[ERROR] Export of {public_id} failed: {e}")
+        return HttpResponse("Export failed", status=500)
+
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", compression=zipfile.ZIP_STORED) as archive:
+        for fmt, content in files.items():
+            # PDF and DOCX are compressed already; only the HTML is worth deflating
+            compress_type = zipfile.ZIP_DEFLATED if fmt == "html" else zipfile.ZIP_STORED
+            archive.writestr(renderers.filename(doc_type, fmt), content, compress_type=compress_type)
+
+    response = HttpResponse(buffer.getvalue(), content_type="application/zip")
+    response["Content-Disposition"] = f'attachment; filename="{renderers.DOCUMENTS[doc_type]["filename"]}.zip"'
+    return response
+
+
+def issue(request, doc_type, data):
+    """Record an issued document and keep its id in the session"""
+    if request.session.session_key:
+        # The previous preview's speculative renders are of no use any more
+        render_pool.cancel_speculative(request.session.session_key, doc_type)
+    entry = history.record(doc_type, data, request.user)
+    request.session[renderers.DOCUMENTS[doc_type]["session_key"]] = entry.public_id
+    labels = document_model.labels(doc_type, data.get("language"))
+    return dict(data, public_id=entry.public_id, labels=labels)
 
 # ---------------- HOME ----------------
 @login_required(login_url='login')
 def home(request):
+    reg = registry.current()
     return render(request, "generator/home.html", {
-        "designations": DESIGNATION_MAP.keys(),
-        "people": CIRCULAR["people"]
+        "designations": reg.designation_options,
+        "people": reg.people,
     })
 
 
@@ -74,32 +192,7 @@ def generate_body(request):
         if not prompt:
             return HttpResponse("Please provide a prompt for AI generation.", status=200)
 
-        if lang == "hi":
-            system_prompt = """
-आप BISAG-N के लिए एक आधिकारिक कार्यालय आदेश की मुख्य सामग्री लिख रहे हैं।
-
-नियम:
-- कम से कम 2–3 वाक्यों का एक औपचारिक अनुच्छेद लिखें।
-- सरकारी भाषा का प्रयोग करें।
-- कोई शीर्षक, संदर्भ, दिनांक, प्रेषक या प्राप्तकर्ता न लिखें।
-- बुलेट या क्रमांक का प्रयोग न करें।
-- केवल सादा पाठ में उत्तर दें।
-"""
-        else:
-            system_prompt = """
-You are drafting the BODY of an official government Office Order for BISAG-N.
-
-Rules:
-- Write one formal paragraph (minimum 2–3 sentences).
-- Use official government tone.
-- Do not include title, reference, date, From or To.
-- No bullet points or numbering.
-- Plain text only.
-"""
-
-        res = gemini_model.generate_content(system_prompt + "\n\nTopic:\n" + prompt)
-        generated_text = res.text.strip() if res and res.text else "Unable to generate content. Please try again."
-        return HttpResponse(generated_text, status=200)
+        return draft(request, "office_order", "body", lang, prompt)
         
     except Exception as e:
         error_msg = f"AI generation failed: {str(e)}"
@@ -119,24 +212,15 @@ def result_office_order(request):
     current_year = timezone.now().year
     counter = OfficeOrderCounter.get_next_number(current_year)
     
-    if lang == "hi":
-        reference = f"बायसेग-एन/कार्यालय आदेश/{current_year}/{counter:03d}"
-    else:
-        reference = f"BISAG-N/Office Order/{current_year}/{counter:03d}"
-
-    data = {
-        "language": lang,
-        "header": OFFICE_ORDER["header"][lang],
-        "title": OFFICE_ORDER["title_hi"] if lang == "hi" else OFFICE_ORDER["title_en"],
-        "reference": reference,
-        "date": date,
-        "body": request.POST.get("body", "").strip(),
-        "from": DESIGNATION_MAP[request.POST.get("from_position")][lang],
-        "to": [DESIGNATION_MAP[x][lang] for x in request.POST.getlist("to_recipients[]")],
-    }
+    data = office_order_data(
+        lang, date,
+        body=request.POST.get("body", "").strip(),
+        from_position=request.POST.get("from_position"),
+        to_positions=request.POST.getlist("to_recipients[]"),
+        reference=document_reference("office_order", lang, current_year, counter),
+    )
 
-    request.session["doc_data"] = data
-    return render(request, "generator/result_office_order.html", data)
+    return render(request, "generator/result_office_order.html", issue(request, "office_order", data))
 
 # PDF + DOCX for office order → UNCHANGED
 # (your existing download_pdf & download_docx remain exactly same)
@@ -146,7 +230,7 @@ def result_office_order(request):
 
 def circular_form(request):
     return render(request, "generator/circular_form.html", {
-        "people": CIRCULAR["people"]
+        "people": registry.current().people
     })
 
 # -------- GEMINI CIRCULAR BODY --------
@@ -161,42 +245,7 @@ def generate_circular_body(request):
         if not prompt:
             return HttpResponse("Please provide a prompt for AI generation.", status=200)
 
-        if lang == "hi":
-            system_prompt = """
-आप BISAG-N के लिए एक सरकारी परिपत्र (Circular) का केवल मुख्य भाग (BODY) लिख रहे हैं।
-
-महत्वपूर्ण नियम:
-- केवल परिपत्र का मुख्य विषय-वस्तु लिखें।
-- कोई विषय (Subject) न लिखें।
-- कोई शीर्षक न लिखें।
-- कोई संदर्भ संख्या न लिखें।
-- कोई हस्ताक्षर न लिखें।
-- कोई दिनांक न लिखें।
-- कोई "प्रेषक" या "प्राप्तकर्ता" न लिखें।
-- 1–2 औपचारिक अनुच्छेद लिखें।
-- सरकारी भाषा का प्रयोग करें।
-- केवल सादा पाठ में उत्तर दें।
-"""
-        else:
-            system_prompt = """
-You are drafting ONLY the BODY content of an official Government Circular for BISAG-N.
-
-IMPORTANT Rules:
-- Write ONLY the main body content of the circular.
-- Do NOT include any subject line.
-- Do NOT include any title or heading.
-- Do NOT include reference number.
-- Do NOT include signature.
-- Do NOT include date.
-- Do NOT include From or To sections.
-- Write 1–2 formal paragraphs only.
-- Official government tone.
-- Plain text only.
-"""
-
-        res = gemini_model.generate_content(system_prompt + "\n\nTopic:\n" + prompt)
-        generated_text = res.text.strip() if res and res.text else "Unable to generate content. Please try again."
-        return HttpResponse(generated_text, status=200)
+        return draft(request, "circular", "body", lang, prompt)
         
     except Exception as e:
         error_msg = f"AI generation failed: {str(e)}"
@@ -211,195 +260,36 @@ def result_circular(request):
     lang = request.POST.get("language")
     raw_date = request.POST.get("date")
     date = format_date_ddmmyyyy(raw_date) if raw_date else timezone.now().strftime("%d-%m-%Y")
-    subject = request.POST.get("subject")
-    body = request.POST.get("body")
-    
-    # Get from position from dropdown (like office order)
-    from_position = request.POST.get("from_position")
-    from_designation = DESIGNATION_MAP[from_position][lang] if from_position else ""
-    
-    to_ids = request.POST.getlist("to[]")
-
-    people = CIRCULAR["people"]
-    to_people = [p for p in people if str(p["id"]) in to_ids]
-
-    # Get header based on language
-    if lang == "hi":
-        header = {
-            "org_name": CIRCULAR["header"]["hindi"]["org_name"],
-            "ministry": CIRCULAR["header"]["hindi"]["ministry"],
-            "government": CIRCULAR["header"]["hindi"]["government"]
-        }
-    else:
-        header = {
-            "org_name": CIRCULAR["header"]["english"]["org_name"],
-            "ministry": CIRCULAR["header"]["english"]["ministry"],
-            "government": CIRCULAR["header"]["english"]["government"]
-        }
-
-    data = {
-        "language": lang,
-        "header": header,
-        "date": date,
-        "subject": subject,
-        "body": body,
-        "from": from_designation,
-        "to_people": to_people,
-    }
+    current_year = timezone.now().year
+    counter = OfficeOrderCounter.get_next_number(current_year, "circular")
+
+    data = circular_data(
+        lang, date,
+        subject=request.POST.get("subject"),
+        body=request.POST.get("body"),
+        from_position=request.POST.get("from_position"),
+        to_ids=request.POST.getlist("to[]"),
+        reference=document_reference("circular", lang, current_year, counter),
+    )
 
-    request.session["circular_data"] = data
-    return render(request, "generator/result_circular.html", data)
+    return render(request, "generator/result_circular.html", issue(request, "circular", data))
 
 # -------- CIRCULAR PDF --------
 def download_circular_pdf(request):
-    data = request.session.get("circular_data")
-    if not data:
-        return HttpResponse("No circular generated", status=400)
-
-    html = render_to_string("generator/pdf_circular.html", data)
-
-    # Optimize PDF generation with font subsetting and compression
-    pdf = HTML(
-        string=html,
-        base_url=settings.BASE_DIR
-    ).write_pdf(
-        optimize_images=True,
-        jpeg_quality=85,
-        presentational_hints=True
-    )
+    return download_artifact(request, "circular", "pdf")
 
-    response = HttpResponse(pdf, content_type="application/pdf")
-    response["Content-Disposition"] = 'attachment; filename="Circular.pdf"'
-    return response
 
 # -------- CIRCULAR DOCX --------
 def download_circular_docx(request):
-    from docx.shared import Pt, Inches
-    from docx.oxml.ns import qn
-    from docx.oxml import OxmlElement
-    
-    data = request.session.get("circular_data")
-    if not data:
-        return HttpResponse("No circular generated", status=400)
+    return download_artifact(request, "circular", "docx")
 
-    doc = Document()
-    
-    # Set document margins
-    sections = doc.sections
-    for section in sections:
-        section.top_margin = Inches(1)
-        section.bottom_margin = Inches(1)
-        section.left_margin = Inches(1)
-        section.right_margin = Inches(1)
-
-    # Add BISAG Logo
-    logo_path = os.path.join(settings.BASE_DIR, "static", "generator", "bisag_logo.png")
-    if os.path.exists(logo_path):
-        logo_paragraph = doc.add_paragraph()
-        logo_paragraph.alignment = WD_ALIGN_PARAGRAPH.CENTER
-        logo_run = logo_paragraph.add_run()
-        logo_run.add_picture(logo_path, height=Inches(0.9))
-        doc.add_paragraph()  # Add space after logo
-
-    # Header lines
-    for line in data["header"].values():
-        p = doc.add_paragraph(line)
-        p.alignment = WD_ALIGN_PARAGRAPH.CENTER
-        p.runs[0].bold = True
-        p.runs[0].font.size = Pt(14)
-
-    # Circular title
-    lang = data.get("language", "en")
-    title_text = "परिपत्र" if lang == "hi" else "Circular"
-    p = doc.add_paragraph(title_text)
-    p.alignment = WD_ALIGN_PARAGRAPH.CENTER
-    p.runs[0].bold = True
-    p.runs[0].underline = True
-    p.runs[0].font.size = Pt(16)
-    
-    # Date
-    date_label = "दिनांक :" if lang == "hi" else "Date :"
-    p = doc.add_paragraph(f"{date_label} {data['date']}")
-    p.alignment = WD_ALIGN_PARAGRAPH.RIGHT
-    p.runs[0].bold = True
-    p.runs[0].font.size = Pt(12)
-
-    # Subject
-    subject_label = "विषय :" if lang == "hi" else "Subject :"
-    p = doc.add_paragraph(f"{subject_label} {data['subject']}")
-    p.runs[0].bold = True
-    p.runs[0].font.size = Pt(12)
-
-    # Body
-    p = doc.add_paragraph(data["body"])
-    p.alignment = WD_ALIGN_PARAGRAPH.JUSTIFY
-    p.runs[0].font.size = Pt(12)
-
-    # From section
-    p = doc.add_paragraph(data["from"])
-    p.alignment = WD_ALIGN_PARAGRAPH.RIGHT
-    p.runs[0].bold = True
-    p.runs[0].font.size = Pt(12)
-    
-    # Add some space before table
-    doc.add_paragraph()
-    
-    # To section - Table
-    to_people = data.get("to_people", [])
-    if to_people:
-        table = doc.add_table(rows=1, cols=3)
-        table.style = 'Table Grid'
-        
-        # Header row
-        hdr_cells = table.rows[0].cells
-        sr_label = "क्र." if lang == "hi" else "Sr. No."
-        name_label = "नाम" if lang == "hi" else "Name"
-        sign_label = "हस्ताक्षर" if lang == "hi" else "Sign"
-        
-        hdr_cells[0].text = sr_label
-        hdr_cells[1].text = name_label
-        hdr_cells[2].text = sign_label
-        
-        # Make header bold
-        for cell in hdr_cells:
-            cell.paragraphs[0].runs[0].bold = True
-            cell.paragraphs[0].alignment = WD_ALIGN_PARAGRAPH.CENTER
-        
-        # Data rows
-        for idx, person in enumerate(to_people, 1):
-            row_cells = table.add_row().cells
-            row_cells[0].text = str(idx)
-            row_cells[0].paragraphs[0].alignment = WD_ALIGN_PARAGRAPH.CENTER
-            
-            name = person.get("name_hi") if lang == "hi" else person.get("name_en")
-            row_cells[1].text = name or ""
-            row_cells[1].paragraphs[0].alignment = WD_ALIGN_PARAGRAPH.CENTER
-            
-            row_cells[2].text = ""  # Empty for signature
-            row_cells[2].paragraphs[0].alignment = WD_ALIGN_PARAGRAPH.CENTER
-        
-        # Set column widths
-        table.columns[0].width = Inches(1.0)
-        table.columns[1].width = Inches(3.5)
-        table.columns[2].width = Inches(1.5)
-
-    buf = BytesIO()
-    doc.save(buf)
-    buf.seek(0)
-
-    response = HttpResponse(
-        buf,
-        content_type="application/vnd.openxmlformats-officedocument.wordprocessingml.document"
-    )
-    response["Content-Disposition"] = 'attachment; filename="Circular.docx"'
-    return response
 
 # ===============================
 # OFFICE ORDER FORM (MISSING FIX)
 # ===============================
 def office_order_form(request):
     return render(request, "generator/office_order_form.html", {
-        "designations": DESIGNATION_MAP.keys()
+        "designations": registry.current().designation_options
     })
 
 # =====================================================================
@@ -407,116 +297,11 @@ def office_order_form(request):
 # =====================================================================
 
 def download_pdf(request):
-    data = request.session.get("doc_data")
-    if not data:
-        return HttpResponse("No office order generated", status=400)
-
-    html = render_to_string("generator/pdf_office_order.html", data)
-
-    pdf = HTML(
-        string=html,
-        base_url=settings.BASE_DIR
-    ).write_pdf(
-        stylesheets=[
-            CSS(string="""
-                @page { size: A4; margin: 2.5cm; }
-                body { font-family: serif; font-size: 12pt; line-height: 1.6; }
-                .center { text-align: center; }
-                .bold { font-weight: bold; }
-                .ref-date-row { display: table; width: 100%; margin: 20px 0; }
-                .ref-left { display: table-cell; text-align: left; font-weight: bold; width: 50%; }
-                .date-right { display: table-cell; text-align: right; font-weight: bold; width: 50%; }
-                .title { text-align: center; font-weight: bold; text-decoration: underline; margin: 20px 0; }
-                .body { text-align: justify; margin: 20px 0; }
-                .from-section { text-align: right; font-weight: bold; margin: 40px 0 20px; }
-                .to-section { margin-top: 20px; }
-                .to-section div { margin: 5px 0; }
-            """)
-        ]
-    )
-
-    response = HttpResponse(pdf, content_type="application/pdf")
-    response["Content-Disposition"] = 'attachment; filename="Office_Order.pdf"'
-    return response
+    return download_artifact(request, "office_order", "pdf")
 
 
 def download_docx(request):
-    from docx.shared import Pt, Inches
-    
-    data = request.session.get("doc_data")
-    if not data:
-        return HttpResponse("No office order generated", status=400)
-
-    doc = Document()
-    
-    # Set document margins
-    sections = doc.sections
-    for section in sections:
-        section.top_margin = Inches(1)
-        section.bottom_margin = Inches(1)
-        section.left_margin = Inches(1)
-        section.right_margin = Inches(1)
-
-    # Header
-    for line in data["header"]:
-        p = doc.add_paragraph(line)
-        p.alignment = WD_ALIGN_PARAGRAPH.CENTER
-        p.runs[0].bold = True
-        p.runs[0].font.size = Pt(14)
-
-    # Reference & Date
-    lang = data.get("language", "en")
-    ref_label = "सं :" if lang == "hi" else "Ref:"
-    p = doc.add_paragraph(f"{ref_label} {data['reference']}")
-    p.runs[0].bold = True
-    p.runs[0].font.size = Pt(12)
-
-    date_label = "दिनांक :" if lang == "hi" else "Date:"
-    p = doc.add_paragraph(f"{date_label} {data['date']}")
-    p.alignment = WD_ALIGN_PARAGRAPH.RIGHT
-    p.runs[0].bold = True
-    p.runs[0].font.size = Pt(12)
-
-    # Title
-    p = doc.add_paragraph(data["title"])
-    p.alignment = WD_ALIGN_PARAGRAPH.CENTER
-    p.runs[0].bold = True
-    p.runs[0].underline = True
-    p.runs[0].font.size = Pt(16)
-
-    # Body
-    p = doc.add_paragraph(data["body"])
-    p.alignment = WD_ALIGN_PARAGRAPH.JUSTIFY
-    p.runs[0].font.size = Pt(12)
-
-    # From
-    p = doc.add_paragraph(data["from"])
-    p.alignment = WD_ALIGN_PARAGRAPH.RIGHT
-    p.runs[0].bold = True
-    p.runs[0].font.size = Pt(12)
-
-    # To
-    to_label = "प्रति :" if lang == "hi" else "To:"
-    p = doc.add_paragraph(to_label)
-    p.runs[0].bold = True
-    p.runs[0].font.size = Pt(12)
-    
-    for t in data["to"]:
-        p = doc.add_paragraph(t)
-        p.runs[0].bold = True
-        p.runs[0].font.size = Pt(12)
-
-    buffer = BytesIO()
-    doc.save(buffer)
-    buffer.seek(0)
-
-    return HttpResponse(
-        buffer,
-        content_type="application/vnd.openxmlformats-officedocument.wordprocessingml.document",
-        headers={
-            "Content-Disposition": 'attachment; filename="Office_Order.docx"'
-        }
-    )
+    return download_artifact(request, "office_order", "docx")
 
 
 # =====================================================================
@@ -604,7 +389,7 @@ def logout_view(request):
 def policy_form(request):
     """Policy form view"""
     return render(request, 'generator/policy_form.html', {
-        "designations": DESIGNATION_MAP.keys()
+        "designations": registry.current().designation_options
     })
 
 
@@ -613,32 +398,19 @@ def generate_policy_title(request):
     if request.method != "POST":
         return JsonResponse({"error": "Invalid request"}, status=400)
 
-    prompt = request.POST.get("subject_prompt", "").strip()
-    lang = request.POST.get("language", "en")
-
-    if lang == "hi":
-        system_prompt = """
-आप BISAG-N के लिए एक सरकारी नीति दस्तावेज़ का विषय (Subject) लिख रहे हैं।
+    try:
+        prompt = request.POST.get("subject_prompt", "").strip()
+        lang = request.POST.get("language", "en")
 
-नियम:
-- केवल एक पंक्ति का संक्षिप्त विषय लिखें।
-- औपचारिक सरकारी भाषा का प्रयोग करें।
-- 5-12 शब्दों में।
-- केवल विषय लिखें, कुछ और नहीं।
-"""
-    else:
-        system_prompt = """
-You are writing the subject line for an official Government Policy document for BISAG-N.
+        if not prompt:
+            return HttpResponse("Please provide a prompt for AI generation.", status=200)
 
-Rules:
-- Write ONE concise subject line only.
-- Use formal government language.
-- 5-12 words maximum.
-- Return ONLY the subject, nothing else.
-"""
+        return draft(request, "policy", "title", lang, prompt)
 
-    res = gemini_model.generate_content(system_prompt + "\n\nTopic:\n" + prompt)
-    return HttpResponse(res.text.strip())
+    except Exception as e:
+        error_msg = f"AI generation failed: {str(e)}"
+        print(f"[ERROR] Policy Gemini API: {error_msg}")
+        return HttpResponse("Failed to generate content. Please check your internet connection and try again.", status=200)
 
 
 def generate_policy_body(request):
@@ -653,34 +425,7 @@ def generate_policy_body(request):
         if not prompt:
             return HttpResponse("Please provide a prompt for AI generation.", status=200)
 
-        if lang == "hi":
-            system_prompt = """
-आप BISAG-N के लिए एक सरकारी नीति दस्तावेज़ की सामग्री लिख रहे हैं।
-
-नियम:
-- औपचारिक नीति भाषा का प्रयोग करें।
-- उद्देश्य, दायरा, और प्रमुख बिंदुओं को शामिल करें।
-- 3-5 अनुच्छेदों में लिखें।
-- कोई शीर्षक या नीति संख्या न लिखें।
-- सरकारी भाषा का प्रयोग करें।
-- केवल सादा पाठ में उत्तर दें।
-"""
-        else:
-            system_prompt = """
-You are writing the content for an official Government Policy document for BISAG-N.
-
-Rules:
-- Use formal policy language.
-- Include purpose, scope, and key points.
-- Write 3-5 formal paragraphs.
-- Do NOT include title or policy number.
-- Official government tone.
-- Plain text only.
-"""
-
-        res = gemini_model.generate_content(system_prompt + "\n\nTopic:\n" + prompt)
-        generated_text = res.text.strip() if res and res.text else "Unable to generate content. Please try again."
-        return HttpResponse(generated_text, status=200)
+        return draft(request, "policy", "body", lang, prompt)
         
     except Exception as e:
         error_msg = f"AI generation failed: {str(e)}"
@@ -697,131 +442,263 @@ def result_policy(request):
     raw_date = request.POST.get("date")
     date = format_date_ddmmyyyy(raw_date) if raw_date else timezone.now().strftime("%d-%m-%Y")
     
-    # Get header based on language
-    header = POLICY["header"][lang]
-    
-    # Handle multiple recipients
-    to_recipients = request.POST.getlist("to_recipients[]")
-    to_list = [DESIGNATION_MAP[pos][lang] for pos in to_recipients if pos in DESIGNATION_MAP]
-    
-    # Format recipients based on language (for PDF/DOCX download)
-    if lang == "hi":
-        to_str = ", ".join(to_list) if to_list else "सभी संबंधित"
-    else:
-        to_str = ", ".join(to_list) if to_list else "All Concerned"
-    
-    data = {
-        "language": lang,
-        "header": header,
-        "date": date,
-        "subject": request.POST.get("subject"),
-        "body": request.POST.get("body"),
-        "from": DESIGNATION_MAP[request.POST.get("from_position")][lang],
-        "to": to_str,
-        "to_list": to_list,  # Pass list for template to display one per line
-    }
+    current_year = timezone.now().year
+    counter = OfficeOrderCounter.get_next_number(current_year, "policy")
+
+    data = policy_data(
+        lang, date,
+        subject=request.POST.get("subject"),
+        body=request.POST.get("body"),
+        from_position=request.POST.get("from_position"),
+        to_positions=request.POST.getlist("to_recipients[]"),
+        reference=document_reference("policy", lang, current_year, counter),
+    )
 
-    request.session["policy_data"] = data
-    return render(request, "generator/result_policy.html", data)
+    return render(request, "generator/result_policy.html", issue(request, "policy", data))
 
 
 def download_policy_pdf(request):
     """Download policy as PDF"""
-    data = request.session.get("policy_data")
-    if not data:
-        return HttpResponse("No policy generated", status=400)
+    return download_artifact(request, "policy", "pdf")
 
-    html = render_to_string("generator/pdf_policy.html", data)
 
-    pdf = HTML(
-        string=html,
-        base_url=settings.BASE_DIR
-    ).write_pdf(
-        optimize_images=True,
-        jpeg_quality=85,
-        presentational_hints=True
-    )
+def download_policy_docx(request):
+    """Download policy as DOCX"""
+    return download_artifact(request, "policy", "docx")
+
+
+# =====================================================================
+# ====================== ASYNC AI DRAFTING ============================
+# =====================================================================
+# Async variants of the generate_* views for ASGI deployments. The Gemini
+# call is awaited instead of holding a worker thread, abandoned after
+# AI_TIMEOUT seconds, and cancelled when the client disconnects (Django
+# cancels the view task on http.disconnect).
+
+async def draft_async(request, doc_type, field, prompt_field):
+    if request.method != "POST":
+        return JsonResponse({"error": "Invalid request"}, status=400)
+
+    prompt = request.POST.get(prompt_field, "").strip()
+    lang = request.POST.get("language", "en")
+
+    if not prompt:
+        return HttpResponse("Please provide a prompt for AI generation.", status=200)
+
+    if wants_stream(request):
+        chunks, cache_status = await llm.astream_draft(doc_type, field, lang, prompt, wants_regenerate(request))
+        return streaming_text_response(aguard_stream(chunks), cache_status)
+
+    try:
+        text, cache_status = await asyncio.wait_for(
+            llm.adraft(doc_type, field, lang, prompt, wants_regenerate(request)),
+            timeout=settings.AI_TIMEOUT,
+        )
+        return draft_text_response(text, cache_status)
+
+    except asyncio.TimeoutError:
+        print(f"[ERROR] Gemini API: {doc_type} {field} timed out after {settings.AI_TIMEOUT}s")
+        return HttpResponse("AI generation timed out. Please try again.", status=200)
+
+    except asyncio.CancelledError:
+        print(f"[INFO] Gemini API: {doc_type} {field} cancelled, client disconnected")
+        raise
+
+    except Exception as e:
+        print(f"[ERROR] Gemini API: AI generation failed: {str(e)}")
+        return HttpResponse("Failed to generate content. Please check your internet connection and try again.", status=200)
+
+
+async def generate_body_async(request):
+    return await draft_async(request, "office_order", "body", "body_prompt")
+
+
+async def generate_circular_body_async(request):
+    return await draft_async(request, "circular", "body", "body_prompt")
+
+
+async def generate_policy_title_async(request):
+    """Generate policy subject with AI"""
+    return await draft_async(request, "policy", "title", "subject_prompt")
+
+
+async def generate_policy_body_async(request):
+    """Generate policy body with AI"""
+    return await draft_async(request, "policy", "body", "body_prompt")
+
+
+# =====================================================================
+# ===================== BACKGROUND RENDERING ==========================
+# =====================================================================
+
+def render_job_payload(job):
+    return {
+        "job_id": str(job.id),
+        "document_type": job.document_type,
+        "format": job.format,
+        "status": job.status,
+        "error": job.error,
+        "status_url": reverse("render_job_status", args=[job.id]),
+        "download_url": reverse("render_job_download", args=[job.id]),
+    }
+
+
+def enqueue_render(request, public_id, fmt):
+    """
+    Queue a PDF/DOCX render of a stored document, addressed by its public id
+    like download_document (not the latest one in the session, which another
+    tab may have replaced).
+
+    The preview pages call this with speculative=1 as soon as they are
+    shown, so the file is usually ready by the time it is asked for.
+    """
+    if request.method != "POST":
+        return JsonResponse({"error": "Invalid request"}, status=400)
+
+    stored = history.load(public_id) if fmt in renderers.FORMATS else None
+    if stored is None:
+        return JsonResponse({"error": "Document not found"}, status=404)
+
+    doc_type, data = stored
+    owner = None
+    if request.POST.get("speculative") == "1":
+        conf = render_pool.pool_settings()
+        if not (conf["ENABLED"] and conf["PRERENDER"] and request.session.session_key):
+            return HttpResponse(status=204)  # not worth rendering inline on a guess
+        owner = request.session.session_key
+
+    job = render_pool.submit(doc_type, fmt, public_id, data, owner=owner)
+    return JsonResponse(render_job_payload(job), status=202)
+
+
+def render_job_status(request, job_id):
+    """Poll a render job"""
+    job = get_object_or_404(RenderJob, id=job_id)
+    return JsonResponse(render_job_payload(job))
+
 
-    response = HttpResponse(pdf, content_type="application/pdf")
-    response["Content-Disposition"] = 'attachment; filename="Policy.pdf"'
+def render_job_download(request, job_id):
+    """Download the output of a finished render job"""
+    job = get_object_or_404(RenderJob, id=job_id)
+    if job.status != RenderJob.DONE:
+        return JsonResponse(render_job_payload(job), status=409)
+
+    content = render_pool.job_artifact(job)
+    if content is None:
+        return JsonResponse({"error": "Document not found"}, status=404)
+
+    response = HttpResponse(content, content_type=renderers.CONTENT_TYPES[job.format])
+    response["Content-Disposition"] = f'attachment; filename="{renderers.filename(job.document_type, job.format)}"'
     return response
 
 
-def download_policy_docx(request):
-    """Download policy as DOCX"""
-    from docx.shared import Pt, Inches
-    from docx.enum.text import WD_ALIGN_PARAGRAPH
-    
-    data = request.session.get("policy_data")
-    if not data:
-        return HttpResponse("No policy generated", status=400)
+# =====================================================================
+# ============================= METRICS ===============================
+# =====================================================================
+# Per-stage timing histograms (generator/metrics.py) in the Prometheus
+# text format. With METRICS["TOKEN"] set, scrapers must send it as a
+# bearer token.
 
-    doc = Document()
-    
-    # Header
-    for line in data["header"]:
-        p = doc.add_paragraph(line)
-        p.alignment = WD_ALIGN_PARAGRAPH.CENTER
-        p.runs[0].bold = True
-        p.runs[0].font.size = Pt(12)
-    
-    doc.add_paragraph()  # spacing
-    
-    # Title
-    title = "नीति" if data["language"] == "hi" else "POLICY"
-    p = doc.add_paragraph(title)
-    p.alignment = WD_ALIGN_PARAGRAPH.CENTER
-    p.runs[0].bold = True
-    p.runs[0].font.size = Pt(16)
-    p.runs[0].underline = True
-    
-    doc.add_paragraph()  # spacing
-    
-    # Date
-    date_label = "दिनांक:" if data["language"] == "hi" else "Date:"
-    p = doc.add_paragraph(f"{date_label} {data['date']}")
-    p.alignment = WD_ALIGN_PARAGRAPH.RIGHT
-    p.runs[0].bold = True
-    
-    # Subject
-    subject_label = "विषय:" if data["language"] == "hi" else "Subject:"
-    p = doc.add_paragraph(f"{subject_label} {data['subject']}")
-    p.runs[0].bold = True
-    
-    doc.add_paragraph()  # spacing
-    
-    # Body
-    p = doc.add_paragraph(data["body"])
-    p.alignment = WD_ALIGN_PARAGRAPH.JUSTIFY
-    p.runs[0].font.size = Pt(12)
-    
-    doc.add_paragraph()  # spacing
-    
-    # From (no label, right aligned)
-    p = doc.add_paragraph(data['from'])
-    p.alignment = WD_ALIGN_PARAGRAPH.RIGHT
-    p.runs[0].bold = True
-    
-    # To (with recipients one per line)
-    to_label = "प्रति:" if data["language"] == "hi" else "To:"
-    p = doc.add_paragraph(to_label)
-    p.runs[0].bold = True
-    
-    # Add recipients one per line
-    if 'to_list' in data and data['to_list']:
-        for recipient in data['to_list']:
-            p = doc.add_paragraph(f"    {recipient}")  # indented
+def metrics_view(request):
+    conf = metrics.metrics_settings()
+    if not conf["ENABLED"]:
+        return HttpResponse("Metrics are disabled", status=404)
+    if conf["TOKEN"] and request.headers.get("Authorization") != f"Bearer {conf['TOKEN']}":
+        return HttpResponse("Unauthorized", status=401)
+    return HttpResponse(metrics.exposition(), content_type="text/plain; version=0.0.4; charset=utf-8")
+
+
+# =====================================================================
+# ============================ PROFILES ===============================
+# =====================================================================
+# Hottest functions in the request profiles the sampling middleware wrote
+# (generator/profiling.py), per URL name; sort=cumtime to rank by
+# cumulative rather than own time.
+
+@staff_member_required
+def profile_report(request):
+    endpoints = profiling.endpoints()
+    endpoint = request.GET.get("endpoint")
+    if endpoint not in endpoints:
+        endpoint = next(iter(endpoints), None)
+    sort = "cumtime" if request.GET.get("sort") == "cumtime" else "tottime"
+
+    return render(request, "generator/profiles.html", {
+        "enabled": profiling.profiling_settings()["ENABLED"],
+        "endpoints": endpoints,
+        "endpoint": endpoint,
+        "count": endpoints.get(endpoint, 0),
+        "sort": sort,
+        "functions": profiling.hot_functions(endpoint, sort=sort) if endpoint else [],
+    })
+
+
+# =====================================================================
+# ======================= BATCH GENERATION ============================
+# =====================================================================
+# POST a CSV or JSON list of document specs (see generator/batch.py) as the
+# "specs" file or as the request body; format=pdf / format=docx (repeatable)
+# selects the outputs. The ZIP is streamed back as documents finish.
+
+@login_required(login_url='login')
+def batch_generate(request):
+    if request.method != "POST":
+        return JsonResponse({"error": "Invalid request"}, status=400)
+
+    formats = request.POST.getlist("format") or request.GET.getlist("format") or ["pdf"]
+    if any(fmt not in renderers.FORMATS for fmt in formats):
+        return JsonResponse({"error": "Unknown format"}, status=400)
+
+    upload = request.FILES.get("specs")
+    if upload is not None:
+        content = upload.read().decode("utf-8-sig")
+        fmt = "json" if upload.name.lower().endswith(".json") else None
     else:
-        p = doc.add_paragraph(f"    {data['to']}")
-
-    buffer = BytesIO()
-    doc.save(buffer)
-    buffer.seek(0)
-
-    return HttpResponse(
-        buffer,
-        content_type="application/vnd.openxmlformats-officedocument.wordprocessingml.document",
-        headers={
-            "Content-Disposition": 'attachment; filename="Policy.docx"'
-        }
-    )
+        content = request.body.decode("utf-8-sig")
+        fmt = "json" if request.content_type == "application/json" else None
+
+    try:
+        specs = batch.validate(batch.parse_specs(content, fmt))
+    except batch.SpecError as e:
+        return JsonResponse({"errors": e.errors}, status=400)
+
+    documents = batch.build_documents(specs, user=request.user)
+
+    response = StreamingHttpResponse(batch.iter_zip(documents, formats), content_type="application/zip")
+    response["Content-Disposition"] = 'attachment; filename="documents.zip"'
+    return response
+
+
+# =====================================================================
+# ========================= DOCUMENT HISTORY ==========================
+# =====================================================================
+# Issued documents, newest first: the user's own, or everyone's for staff
+# with scope=all. Filters: type, language, q (subject/body words or an exact
+# reference number); "after" is the keyset cursor of the next page.
+
+@login_required(login_url='login')
+def document_history(request):
+    show_all = request.user.is_staff and request.GET.get("scope") == "all"
+    documents = DocumentLog.objects.select_related("user") if show_all else DocumentLog.objects.filter(user=request.user)
+
+    doc_type = request.GET.get("type", "")
+    if doc_type in history.LOG_TYPES:
+        documents = documents.filter(document_type=history.LOG_TYPES[doc_type])
+    lang = request.GET.get("language", "")
+    if lang in batch.LANGUAGES:
+        documents = documents.filter(language=lang)
+    query = request.GET.get("q", "").strip()
+    documents = history.search(documents, query)
+
+    # The list only shows the start of each body
+    documents = documents.defer("body", "to_recipients", "payload").annotate(excerpt=Substr("body", 1, 200))
+    entries, next_cursor = history.page(documents, request.GET.get("after"))
+
+    return render(request, "generator/history.html", {
+        "entries": entries,
+        "next_cursor": next_cursor,
+        "first_page": not request.GET.get("after"),
+        "doc_types": history.LOG_TYPES,
+        "languages": batch.LANGUAGES,
+        "filters": {"type": doc_type, "language": lang, "q": query, "scope": "all" if show_all else ""},
+    })
@@ -0,0 +1,75 @@
+// Background rendering for the preview pages' download buttons.
+// Links with data-render-url queue a render job, poll its status and then
+// fetch the finished file; if anything goes wrong the plain href is used.
+// The jobs are queued speculatively as soon as the page is shown, so the
+// file is usually ready when the button is clicked.
+
+function getCookie(name) {
+    const match = document.cookie.split(';').map(c => c.trim()).find(c => c.startsWith(name + '='));
+    return match ? decodeURIComponent(match.substring(name.length + 1)) : null;
+}
+
+function pollRenderJob(statusUrl, timeoutMs) {
+    const started = Date.now();
+    return new Promise((resolve, reject) => {
+        const tick = () => {
+            fetch(statusUrl)
+                .then(res => res.json())
+                .then(job => {
+                    if (job.status === 'done') {
+                        resolve(job);
+                    } else if (job.status === 'failed') {
+                        reject(new Error(job.error || 'Rendering failed'));
+                    } else if (Date.now() - started > timeoutMs) {
+                        reject(new Error('Rendering timed out'));
+                    } else {
+                        setTimeout(tick, 500);
+                    }
+                })
+                .catch(reject);
+        };
+        tick();
+    });
+}
+
+function queueRenderJob(url, speculative) {
+    return fetch(url, {
+        method: 'POST',
+        headers: { 'X-CSRFToken': getCookie('csrftoken') },
+        body: new URLSearchParams(speculative ? { speculative: '1' } : {})
+    })
+    .then(res => {
+        if (res.status === 204) {
+            return null;  // the server does not render speculatively
+        }
+        if (!res.ok) {
+            throw new Error('Could not queue rendering');
+        }
+        return res.json();
+    });
+}
+
+document.querySelectorAll('a[data-render-url]').forEach(link => {
+    // Resolves to the speculative job, or null when there is none to reuse
+    const speculation = queueRenderJob(link.dataset.renderUrl, true).catch(() => null);
+
+    link.addEventListener('click', event => {
+        event.preventDefault();
+        const label = link.innerHTML;
+        link.classList.add('disabled');
+        link.innerHTML = '⏳ Preparing...';
+
+        speculation
+        .then(job => job && job.status !== 'failed' ? job : queueRenderJob(link.dataset.renderUrl, false))
+        .then(job => job.status === 'done' ? job : pollRenderJob(job.status_url, 120000))
+        .then(job => { window.location = job.download_url; })
+        .catch(err => {
+            console.error('Background rendering failed:', err);
+            window.location = link.href;
+        })
+        .finally(() => {
+            link.classList.remove('disabled');
+            link.innerHTML = label;
+        });
+    });
+});
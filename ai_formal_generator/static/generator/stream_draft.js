@@ -0,0 +1,37 @@
+// Streams an AI draft into a textarea while it is being generated.
+// Posts formData with stream=1 to url and appends each chunk as it arrives,
+// falling back to a single read on browsers without readable streams.
+
+function streamDraft(url, formData, textarea, headers) {
+    formData.append('stream', '1');
+
+    return fetch(url, {
+        method: 'POST',
+        headers: headers || {},
+        body: formData
+    })
+    .then(response => {
+        if (!response.ok) {
+            throw new Error('Network response was not ok');
+        }
+        if (!response.body || !window.TextDecoder) {
+            return response.text().then(text => { textarea.value = text; });
+        }
+
+        const reader = response.body.getReader();
+        const decoder = new TextDecoder('utf-8');
+        let first = true;
+
+        const pump = () => reader.read().then(({ done, value }) => {
+            const text = done ? decoder.decode() : decoder.decode(value, { stream: true });
+            if (first && text) {
+                textarea.value = '';  // replace any "Generating..." placeholder
+                first = false;
+            }
+            textarea.value += text;
+            textarea.scrollTop = textarea.scrollHeight;
+            return done ? undefined : pump();
+        });
+        return pump();
+    });
+}